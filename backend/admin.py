@@ -0,0 +1,26 @@
+"""Доступ к служебным эндпоинтам установки: метрики, статистика кэша и обслуживание всей БД.
+
+Эти эндпоинты относятся ко всей установке, а не к арендатору, поэтому требуют токена
+администратора ADMIN_TOKEN в заголовке Authorization: Bearer <токен> (его же умеет
+передавать Prometheus). Пока ADMIN_TOKEN не задан, служебные эндпоинты закрыты.
+"""
+import os
+import secrets
+from typing import Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+bearer = HTTPBearer(auto_error=False, description="ADMIN_TOKEN")
+
+
+def is_admin(credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer)) -> bool:
+    """Зависимость: передан ли токен администратора"""
+    return bool(ADMIN_TOKEN) and credentials is not None and secrets.compare_digest(credentials.credentials, ADMIN_TOKEN)
+
+
+def require_admin(admin: bool = Depends(is_admin)):
+    if not admin:
+        raise HTTPException(status_code=403, detail="Admin token required")
@@ -0,0 +1,157 @@
+"""Архивация транзакций старше горизонта (таблица transactions_archive).
+
+Транзакции переносятся в архив пачками. Итоги перенесенной части истории
+накапливаются в снимке goal_opening_balances, поэтому баланс цели, его пересчет
+и статистика остаются точными без чтения архива. Дневные итоги не меняются.
+Списки и выгрузка транзакций читают архив, только если запрос уходит за горизонт.
+Архивные транзакции доступны только для чтения.
+
+Запуск из каталога backend:
+    python archive.py run [--days 365] [--batch-size 5000]
+    python archive.py status
+"""
+import argparse
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from models import ArchivedTransaction, Goal, GoalOpeningBalance, Transaction
+
+# Транзакции старше этого числа дней переносятся в архив
+ARCHIVE_HORIZON_DAYS = int(os.getenv("ARCHIVE_HORIZON_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+
+ARCHIVE_COLUMNS = ["id", "tenant_id", "goal_id", "amount", "transaction_type", "description", "created_at"]
+
+
+def archive_horizon(db: Session) -> Optional[datetime]:
+    """Горизонт архивации: все транзакции раньше него лежат в архиве. None - архив пуст.
+
+    Снимки не хранят арендатора: соединение с целями отбирает снимки арендатора сессии.
+    """
+    return db.execute(
+        select(func.max(GoalOpeningBalance.archived_before)).join(Goal, Goal.id == GoalOpeningBalance.goal_id)
+    ).scalar()
+
+
+def reaches_archive(db: Session, date_from: Optional[datetime]) -> bool:
+    """Нужно ли запросу с нижней границей date_from читать архив"""
+    horizon = archive_horizon(db)
+    return horizon is not None and (date_from is None or date_from < horizon)
+
+
+def opening_balance_upsert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(GoalOpeningBalance)
+
+
+def add_to_opening_balances(db: Session, ids: list[int], before: datetime):
+    """Добавляет переносимые транзакции к снимкам начального баланса их целей"""
+    is_deposit = Transaction.transaction_type == "deposit"
+    totals = db.execute(
+        select(
+            Transaction.goal_id,
+            func.coalesce(func.sum(case((is_deposit, Transaction.amount))), 0).label("deposits"),
+            func.coalesce(func.sum(case((~is_deposit, Transaction.amount))), 0).label("withdrawals"),
+            func.count(case((is_deposit, 1))).label("deposit_count"),
+            func.count(case((~is_deposit, 1))).label("withdrawal_count"),
+            func.min(Transaction.created_at).label("first_transaction_at"),
+            func.max(Transaction.created_at).label("last_transaction_at"),
+        )
+        .where(Transaction.id.in_(ids))
+        .group_by(Transaction.goal_id)
+    ).all()
+
+    snapshot = GoalOpeningBalance
+    # Горизонт снимка не уменьшается, если архивацию запустили с более ранней границей
+    greatest = func.greatest if db.get_bind().dialect.name == "postgresql" else func.max
+    for row in totals:
+        statement = opening_balance_upsert(db).values(
+            goal_id=row.goal_id,
+            archived_before=before,
+            balance=row.deposits - row.withdrawals,
+            deposits=row.deposits,
+            withdrawals=row.withdrawals,
+            deposit_count=row.deposit_count,
+            withdrawal_count=row.withdrawal_count,
+            first_transaction_at=row.first_transaction_at,
+            last_transaction_at=row.last_transaction_at,
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[snapshot.goal_id],
+            set_={
+                "archived_before": greatest(snapshot.archived_before, statement.excluded.archived_before),
+                "balance": snapshot.balance + statement.excluded.balance,
+                "deposits": snapshot.deposits + statement.excluded.deposits,
+                "withdrawals": snapshot.withdrawals + statement.excluded.withdrawals,
+                "deposit_count": snapshot.deposit_count + statement.excluded.deposit_count,
+                "withdrawal_count": snapshot.withdrawal_count + statement.excluded.withdrawal_count,
+                "first_transaction_at": func.coalesce(snapshot.first_transaction_at, statement.excluded.first_transaction_at),
+                "last_transaction_at": statement.excluded.last_transaction_at,
+            },
+        ))
+
+
+def archive_batch(db: Session, before: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Переносит в архив до batch_size самых старых транзакций раньше before и фиксирует пачку"""
+    ids = db.scalars(
+        select(Transaction.id)
+        .where(Transaction.created_at < before)
+        .order_by(Transaction.created_at, Transaction.id)
+        .limit(batch_size)
+        .with_for_update()
+    ).all()
+    if not ids:
+        return 0
+
+    add_to_opening_balances(db, ids, before)
+    columns = [Transaction.__table__.c[name] for name in ARCHIVE_COLUMNS]
+    db.execute(insert(ArchivedTransaction).from_select(ARCHIVE_COLUMNS, select(*columns).where(Transaction.id.in_(ids))))
+    db.execute(delete(Transaction).where(Transaction.id.in_(ids)).execution_options(synchronize_session=False))
+    db.commit()
+    return len(ids)
+
+
+def archive_transactions(db: Session, before: Optional[datetime] = None, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Переносит в архив все транзакции раньше before (по умолчанию - старше ARCHIVE_HORIZON_DAYS).
+
+    Каждая пачка - отдельная короткая транзакция БД, чтобы не блокировать запись надолго.
+    """
+    before = before or datetime.utcnow() - timedelta(days=ARCHIVE_HORIZON_DAYS)
+    archived = 0
+    while True:
+        moved = archive_batch(db, before, batch_size)
+        archived += moved
+        if moved < batch_size:
+            return archived
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Архивация старых транзакций")
+    parser.add_argument("command", choices=["run", "status"])
+    parser.add_argument("--days", type=int, default=ARCHIVE_HORIZON_DAYS, help="archive transactions older than N days")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from database import SessionLocal, WriteSessionLocal
+
+    if args.command == "status":
+        with SessionLocal() as db:
+            live = db.execute(select(func.count()).select_from(Transaction)).scalar()
+            archived = db.execute(select(func.count()).select_from(ArchivedTransaction)).scalar()
+            print(f"Horizon: {archive_horizon(db)}, live: {live}, archived: {archived}")
+        return
+
+    with WriteSessionLocal() as db:
+        before = datetime.utcnow() - timedelta(days=args.days)
+        print(f"Archived {archive_transactions(db, before, args.batch_size)} transactions older than {before}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+from sqlalchemy import case, func, update
+from sqlalchemy.orm import Session
+from datetime import datetime
+from decimal import Decimal
+from models import Goal, GoalOpeningBalance, Transaction
+from rollup import apply_transaction_to_rollup
+from events import publish_on_commit
+
+# Допустимые типы транзакций
+TRANSACTION_TYPES = ("deposit", "withdrawal")
+
+
+def signed_amount(amount: Decimal, transaction_type: str) -> Decimal:
+    """Возвращает вклад транзакции в баланс цели со знаком"""
+    return amount if transaction_type == "deposit" else -amount
+
+
+def apply_balance_delta(db: Session, goal_id: int, delta: Decimal):
+    """Атомарно изменяет current_balance цели на delta в текущей транзакции БД.
+
+    Изменение выполняется одним UPDATE без чтения всей истории цели,
+    фиксация остается за вызывающим кодом. Новый баланс возвращается
+    через RETURNING и публикуется подписчикам событий после фиксации.
+    """
+    if not delta:
+        return
+    balance = db.execute(
+        update(Goal)
+        .where(Goal.id == goal_id)
+        .values(current_balance=func.coalesce(Goal.current_balance, 0) + delta)
+        .returning(Goal.current_balance)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    # Загруженный в сессию объект цели должен перечитать баланс из БД
+    goal = db.identity_map.get(db.identity_key(Goal, goal_id))
+    if goal is not None:
+        db.expire(goal, ["current_balance"])
+    if balance is not None:
+        publish_on_commit(
+            db, "goal.balance", {"goal_id": goal_id, "current_balance": balance}, key=("goal.balance", goal_id)
+        )
+
+
+def apply_transaction(db: Session, goal_id: int, amount: Decimal, transaction_type: str, created_at: datetime, sign: int = 1):
+    """Применяет (sign=1) или откатывает (sign=-1) влияние транзакции на баланс цели и ее дневные итоги"""
+    apply_balance_delta(db, goal_id, sign * signed_amount(amount, transaction_type))
+    apply_transaction_to_rollup(db, goal_id, amount, transaction_type, created_at, sign)
+
+
+def calculate_goal_balance(db: Session, goal_id: int) -> Decimal:
+    """Вычисляет баланс цели полной агрегацией по ее транзакциям (точная сумма целых копеек).
+
+    Архивная часть истории берется из снимка начального баланса, архив не читается.
+    """
+    live = db.query(
+        func.coalesce(
+            func.sum(
+                case(
+                    (Transaction.transaction_type == "deposit", Transaction.amount),
+                    else_=-Transaction.amount,
+                )
+            ),
+            0,
+        )
+    ).filter(Transaction.goal_id == goal_id).scalar()
+    opening = db.query(GoalOpeningBalance.balance).filter(GoalOpeningBalance.goal_id == goal_id).scalar()
+    return live + (opening or 0)
+
+
+def verify_goal_balance(db: Session, goal: Goal) -> dict:
+    """Сверяет сохраненный баланс цели с полной агрегацией транзакций"""
+    expected = calculate_goal_balance(db, goal.id)
+    stored = goal.current_balance or 0
+    return {
+        "goal_id": goal.id,
+        "stored_balance": stored,
+        "calculated_balance": expected,
+        "difference": stored - expected,
+        "is_consistent": stored == expected,
+    }
@@ -0,0 +1,105 @@
+"""Нагрузочный бенчмарк синхронного и асинхронного режимов работы с БД.
+
+Для каждого режима (DATABASE_ASYNC=0/1) запускает uvicorn на временной SQLite-базе и
+нагружает его смешанным потоком запросов (чтение целей и создание транзакций) при
+заданном числе одновременных клиентов. Печатает p50/p99 задержки и запросы в секунду.
+
+Запуск из каталога backend:
+    python benchmarks/bench_async.py --clients 50 200 1000 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+
+from common import BACKEND_DIR, create_schema, percentile, use_temp_database
+
+
+def wait_for_server(base_url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/settings/", timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError("Server did not start")
+
+
+async def run_load(base_url: str, goal_id: int, clients: int, duration: float, write_ratio: float):
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def worker():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    if random.random() < write_ratio:
+                        response = await client.post(
+                            "/transactions/",
+                            json={"goal_id": goal_id, "amount": 1.0, "transaction_type": "deposit"},
+                        )
+                    else:
+                        response = await client.get(f"/goals/{goal_id}")
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'mode':>6} {'clients':>8} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode in ("sync", "async"):
+        use_temp_database(f"bench-{mode}.db")
+        create_schema(os.environ["DATABASE_URL"])
+        env = dict(os.environ, DATABASE_ASYNC="1" if mode == "async" else "0")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=BACKEND_DIR,
+            env=env,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            wait_for_server(base_url)
+            goal_id = httpx.post(f"{base_url}/goals/", json={"title": "Нагрузка", "target_amount": 1e9}).json()["id"]
+            for clients in args.clients:
+                result = asyncio.run(run_load(base_url, goal_id, clients, args.duration, args.write_ratio))
+                print(
+                    f"{mode:>6} {clients:>8} {result['requests']:>9} {result['errors']:>7} "
+                    f"{result['rps']:>9.1f} {result['p50']:>9.2f} {result['p99']:>9.2f}"
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Бенчмарк записи транзакций при растущей истории цели.
+
+Показывает, что задержка create/update/delete транзакции не зависит от количества
+транзакций цели, а полный пересчет баланса (recalculate_goal_balance) растет линейно.
+
+Запуск из каталога backend:
+    python benchmarks/bench_balance.py --sizes 10000 100000 1000000 --writes 200
+"""
+import argparse
+import statistics
+
+from common import percentile, seed_transactions, timed, use_temp_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+
+    use_temp_database()
+
+    from fastapi.testclient import TestClient
+    from database import SessionLocal, engine
+    from models import Goal
+    from migrate import run_migrations
+    from main import app
+    from routers.goal import recalculate_goal_balance
+
+    run_migrations(engine)
+    client = TestClient(app)
+    goal_id = client.post("/goals/", json={"title": "Бенчмарк", "target_amount": 1e12}).json()["id"]
+
+    print(f"{'history':>10} {'op':>8} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    seeded = 0
+    for size in sorted(args.sizes):
+        seed_transactions(engine, goal_id, size - seeded)
+        seeded = size
+
+        timings = {"create": [], "update": [], "delete": []}
+        for _ in range(args.writes):
+            response, elapsed = timed(
+                client.post,
+                "/transactions/",
+                json={"goal_id": goal_id, "amount": 10.0, "transaction_type": "deposit"},
+            )
+            timings["create"].append(elapsed)
+            transaction_id = response.json()["id"]
+
+            _, elapsed = timed(client.put, f"/transactions/{transaction_id}", json={"amount": 20.0, "transaction_type": "withdrawal"})
+            timings["update"].append(elapsed)
+
+            _, elapsed = timed(client.delete, f"/transactions/{transaction_id}")
+            timings["delete"].append(elapsed)
+
+        db = SessionLocal()
+        try:
+            _, recalc_ms = timed(recalculate_goal_balance, db, goal_id)
+            consistent = client.get(f"/goals/{goal_id}/verify-balance").json()["is_consistent"]
+        finally:
+            db.close()
+
+        for op, values in timings.items():
+            print(f"{size:>10} {op:>8} {percentile(values, 50):>8.2f} {percentile(values, 95):>8.2f} {statistics.mean(values):>8.2f}")
+        print(f"{size:>10} {'recalc':>8} {recalc_ms:>8.2f} {'':>8} {'':>8}  (полный пересчет, баланс согласован: {consistent})")
+
+
+if __name__ == "__main__":
+    main()
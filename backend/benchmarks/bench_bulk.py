@@ -0,0 +1,71 @@
+"""Бенчмарк пакетной загрузки транзакций.
+
+Сравнивает пропускную способность POST /transactions/ (по одной строке) с
+POST /transactions/bulk (JSON-массив) и POST /transactions/bulk/upload (NDJSON/CSV).
+
+Запуск из каталога backend:
+    python benchmarks/bench_bulk.py --rows 100000
+"""
+import argparse
+import json
+
+from common import timed, use_temp_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--single-rows", type=int, default=1000, help="сколько строк отправить по одной")
+    args = parser.parse_args()
+
+    use_temp_database()
+
+    from fastapi.testclient import TestClient
+    from database import engine
+    from migrate import run_migrations
+    from main import app
+
+    run_migrations(engine)
+    client = TestClient(app)
+    goal_id = client.post("/goals/", json={"title": "Выписка", "target_amount": 1e12}).json()["id"]
+    rows = [
+        {"goal_id": goal_id, "amount": 10.0 + i % 100, "transaction_type": "deposit", "description": f"строка {i}"}
+        for i in range(args.rows)
+    ]
+
+    def report(name, count, elapsed_ms):
+        print(f"{name:<28} {count:>9} строк {elapsed_ms / 1000:>8.2f} с {count / (elapsed_ms / 1000):>12.0f} строк/с")
+
+    def send_single():
+        for row in rows[:args.single_rows]:
+            client.post("/transactions/", json=row)
+
+    _, elapsed = timed(send_single)
+    report("POST /transactions/", args.single_rows, elapsed)
+
+    response, elapsed = timed(client.post, "/transactions/bulk", json=rows)
+    assert response.json()["created"] == args.rows
+    report("POST /transactions/bulk", args.rows, elapsed)
+
+    ndjson = "\n".join(json.dumps(row, ensure_ascii=False) for row in rows).encode()
+    response, elapsed = timed(
+        client.post, "/transactions/bulk/upload", content=ndjson, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.json()["created"] == args.rows
+    report("POST /bulk/upload (NDJSON)", args.rows, elapsed)
+
+    csv_body = "goal_id,amount,transaction_type,description\n" + "\n".join(
+        f"{row['goal_id']},{row['amount']},{row['transaction_type']},{row['description']}" for row in rows
+    )
+    response, elapsed = timed(
+        client.post, "/transactions/bulk/upload", content=csv_body.encode(), headers={"Content-Type": "text/csv"}
+    )
+    assert response.json()["created"] == args.rows
+    report("POST /bulk/upload (CSV)", args.rows, elapsed)
+
+    check = client.get(f"/goals/{goal_id}/verify-balance").json()
+    print(f"Баланс согласован с историей: {check['is_consistent']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Проверка потоковой выгрузки GET /transactions/export на больших историях.
+
+Заполняет временную SQLite-базу, запускает uvicorn отдельным процессом и скачивает
+выгрузку в каждом формате, следя за анонимной памятью (RssAnon) процесса сервера:
+страницы файла БД, отображенные через mmap, в нее не входят. Пиковый прирост памяти
+не должен зависеть от числа строк: при превышении --max-rss-growth-mb скрипт
+завершается с ошибкой.
+
+Запуск из каталога backend:
+    python benchmarks/bench_export.py --rows 100000 1000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+
+from common import BACKEND_DIR, create_schema, seed_transactions, use_temp_database
+from bench_async import wait_for_server
+
+
+def read_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def download(base_url: str, pid: int, format: str, goal_id: int) -> dict:
+    """Скачивает выгрузку, одновременно замеряя пиковый RSS сервера"""
+    peak, done = [read_rss_mb(pid)], threading.Event()
+
+    def sample():
+        while not done.is_set():
+            peak.append(read_rss_mb(pid))
+            time.sleep(0.05)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    baseline = peak[0]
+    size, started = 0, time.perf_counter()
+    sampler.start()
+    try:
+        with httpx.stream(
+            "GET", f"{base_url}/transactions/export", params={"format": format, "goal_id": goal_id}, timeout=None
+        ) as response:
+            response.raise_for_status()
+            for chunk in response.iter_raw():
+                size += len(chunk)
+    finally:
+        done.set()
+        sampler.join()
+    return {
+        "seconds": time.perf_counter() - started,
+        "megabytes": size / 1024 / 1024,
+        "baseline_rss": baseline,
+        "growth_rss": max(peak) - baseline,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--formats", nargs="+", default=["csv", "ndjson", "parquet"])
+    parser.add_argument("--max-rss-growth-mb", type=float, default=100.0)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    use_temp_database("bench-export.db")
+    database_url = os.environ["DATABASE_URL"]
+    create_schema(database_url)
+
+    from database import create_app_engine
+    from models import Goal
+
+    seed_engine = create_app_engine(database_url)
+    with seed_engine.begin() as conn:
+        goal_id = conn.execute(Goal.__table__.insert().values(title="Выгрузка", target_amount=1e12)).inserted_primary_key[0]
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    failed = False
+    try:
+        wait_for_server(base_url)
+        seeded = 0
+        print(f"{'rows':>9} {'format':>8} {'MB':>8} {'seconds':>8} {'rss MB':>8} {'growth MB':>10}")
+        for rows in sorted(args.rows):
+            seed_transactions(seed_engine, goal_id, rows - seeded)
+            seeded = rows
+            for format in args.formats:
+                result = download(base_url, server.pid, format, goal_id)
+                print(
+                    f"{rows:>9} {format:>8} {result['megabytes']:>8.1f} {result['seconds']:>8.2f} "
+                    f"{result['baseline_rss']:>8.1f} {result['growth_rss']:>10.1f}"
+                )
+                failed = failed or result["growth_rss"] > args.max_rss_growth_mb
+    finally:
+        server.terminate()
+        server.wait()
+        seed_engine.dispose()
+
+    if failed:
+        sys.exit(f"RSS growth exceeded {args.max_rss_growth_mb} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Память и время удаления цели и сброса прогресса на больших историях.
+
+Для каждого размера истории создаются две цели с --rows транзакций. Одна удаляется
+через DELETE /goals/{id}, у другой сбрасывается прогресс через POST /goals/{id}/reset-progress.
+Пик памяти Python (tracemalloc) не должен зависеть от числа строк: историю удаляет БД
+(ON DELETE CASCADE и массовый DELETE), ORM-объекты транзакций не создаются. При превышении
+--max-peak-mb скрипт завершается с ошибкой.
+
+Запуск из каталога backend:
+    python benchmarks/bench_goal_delete.py --rows 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+from common import create_schema, seed_transactions, use_temp_database
+
+
+def measure(client, method: str, path: str) -> tuple[float, float]:
+    """Выполняет запрос и возвращает (секунды, пик памяти Python в МБ)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        client.request(method, path).raise_for_status()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--max-peak-mb", type=float, default=10.0)
+    args = parser.parse_args()
+
+    use_temp_database("bench-goal-delete.db")
+    # Заполнение истории пачками по 50 тысяч строк не должно засорять вывод логом медленных запросов
+    os.environ.setdefault("SLOW_QUERY_MS", "60000")
+    create_schema(os.environ["DATABASE_URL"])
+
+    from fastapi.testclient import TestClient
+    from database import engine
+    from main import app
+
+    client = TestClient(app)
+    failed = False
+    print(f"{'rows':>9} {'operation':>14} {'seconds':>8} {'peak MB':>8}")
+    for rows in args.rows:
+        for method, suffix, operation in (("DELETE", "", "delete"), ("POST", "/reset-progress", "reset-progress")):
+            goal_id = client.post("/goals/", json={"title": f"Удаление {rows}", "target_amount": 1e12}).json()["id"]
+            seed_transactions(engine, goal_id, rows)
+            seconds, peak = measure(client, method, f"/goals/{goal_id}{suffix}")
+            print(f"{rows:>9} {operation:>14} {seconds:>8.2f} {peak:>8.2f}")
+            failed = failed or peak > args.max_peak_mb
+
+    if failed:
+        sys.exit(f"Peak memory exceeded {args.max_peak_mb} MB")
+
+
+if __name__ == "__main__":
+    main()
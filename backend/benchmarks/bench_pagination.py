@@ -0,0 +1,54 @@
+"""Бенчмарк постраничного чтения GET /transactions/.
+
+Сравнивает стоимость страницы на глубине N при OFFSET-пагинации и при курсорной
+(keyset) пагинации по (created_at, id).
+
+Запуск из каталога backend:
+    python benchmarks/bench_pagination.py --rows 2000000
+"""
+import argparse
+
+from common import seed_transactions, timed, use_temp_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    use_temp_database()
+
+    from fastapi.testclient import TestClient
+    from database import engine
+    from models import Transaction
+    from migrate import run_migrations
+    from main import app
+    from pagination import encode_cursor
+    from sqlalchemy import select
+
+    run_migrations(engine)
+    client = TestClient(app)
+    goal_id = client.post("/goals/", json={"title": "Пагинация", "target_amount": 1e12}).json()["id"]
+    seed_transactions(engine, goal_id, args.rows)
+
+    print(f"{'depth':>10} {'offset ms':>10} {'cursor ms':>10}")
+    for depth in (0, args.rows // 100, args.rows // 10, args.rows // 2, args.rows - args.limit):
+        _, offset_ms = timed(client.get, "/transactions/", params={"skip": depth, "limit": args.limit})
+
+        with engine.connect() as conn:
+            row = conn.execute(
+                select(Transaction.created_at, Transaction.id)
+                .order_by(Transaction.created_at.desc(), Transaction.id.desc())
+                .offset(max(depth - 1, 0))
+                .limit(1)
+            ).first()
+        params = {"limit": args.limit, "goal_id": goal_id}
+        if depth:
+            params["cursor"] = encode_cursor(row.created_at, row.id)
+        _, cursor_ms = timed(client.get, "/transactions/", params=params)
+        print(f"{depth:>10} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
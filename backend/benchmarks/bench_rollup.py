@@ -0,0 +1,55 @@
+"""Бенчмарк истории цели для графиков.
+
+Сравнивает построение помесячной истории по дневным итогам (goal_daily_balance)
+с агрегацией по всей таблице транзакций при растущей истории цели.
+
+Запуск из каталога backend:
+    python benchmarks/bench_rollup.py --sizes 10000 100000 1000000
+"""
+import argparse
+
+from common import percentile, seed_transactions, timed, use_temp_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    use_temp_database()
+
+    from sqlalchemy import case, func, select
+    from database import SessionLocal, engine
+    from models import Goal, Transaction
+    from migrate import run_migrations
+    from rollup import goal_history, rebuild_rollup
+
+    run_migrations(engine)
+    db = SessionLocal()
+    goal = Goal(title="Графики", target_amount=1e12)
+    db.add(goal)
+    db.commit()
+
+    month = func.strftime("%Y-%m", Transaction.created_at)
+    full_scan = (
+        select(month, func.sum(case((Transaction.transaction_type == "deposit", Transaction.amount), else_=-Transaction.amount)))
+        .where(Transaction.goal_id == goal.id)
+        .group_by(month)
+    )
+
+    print(f"{'history':>10} {'rollup ms':>10} {'scan ms':>10}")
+    seeded = 0
+    for size in sorted(args.sizes):
+        seed_transactions(engine, goal.id, size - seeded)
+        seeded = size
+        rebuild_rollup(db, goal_id=goal.id)
+
+        rollup_ms = [timed(goal_history, db, goal.id, "month")[1] for _ in range(args.repeat)]
+        scan_ms = [timed(lambda: db.execute(full_scan).all())[1] for _ in range(3)]
+        print(f"{size:>10} {percentile(rollup_ms, 50):>10.3f} {percentile(scan_ms, 50):>10.2f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Бенчмарк полнотекстового поиска по описаниям транзакций.
+
+Заполняет историю --rows транзакциями со случайными описаниями из словаря (триггеры
+ставят их в очередь индексации, search.index_pending_rows индексирует) и замеряет время функции поиска для частых и редких
+слов, поиска по началу слова и отбора по цели, в порядке recent и relevance.
+Если медиана для порядка recent превышает --max-ms, скрипт завершается с ошибкой.
+
+Запуск из каталога backend:
+    python benchmarks/bench_search.py --rows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+from common import percentile, timed, use_temp_database
+
+WORDS = (
+    "зарплата премия отпуск подарок ремонт машина кафе продукты такси кино книги спорт "
+    "аптека обучение ноутбук телефон море горы билеты отель кешбэк перевод копилка"
+).split()
+RARE_WORDS = ("юбилей", "свадьба", "велосипед")
+
+QUERIES = (
+    ("частое слово", "отпуск", False),
+    ("форма слова", "отпуском", False),
+    ("по началу", "отп", False),
+    ("два слова", "море отпуск", False),
+    ("редкое слово", "свадьбы", False),
+    ("частое + цель", "отпуск", True),
+)
+
+
+def seed_descriptions(engine, goal_ids: list[int], rows: int, batch_size: int = 50000):
+    from sqlalchemy import insert
+    from models import Transaction
+    from search import index_pending_rows
+
+    random.seed(1)
+    start = datetime.utcnow() - timedelta(days=365)
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch_size):
+            batch = []
+            for number in range(offset, min(rows, offset + batch_size)):
+                words = random.choices(WORDS, k=3)
+                if number % 10000 == 0:
+                    words.append(random.choice(RARE_WORDS))
+                batch.append({
+                    "goal_id": random.choice(goal_ids),
+                    "amount": 100.0,
+                    "transaction_type": random.choice(("deposit", "withdrawal")),
+                    "description": " ".join(words).capitalize(),
+                    "created_at": start + timedelta(seconds=number),
+                })
+            conn.execute(insert(Transaction), batch)
+        index_pending_rows(conn)
+        conn.exec_driver_sql("INSERT INTO transactions_search(transactions_search) VALUES ('optimize')")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--goals", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--max-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    use_temp_database("bench-search.db")
+    os.environ.setdefault("SLOW_QUERY_MS", "60000")
+
+    from sqlalchemy import insert
+    from database import SessionLocal, engine
+    from migrate import run_migrations
+    from models import Goal
+    from search import search_transactions
+
+    run_migrations(engine)
+    with engine.begin() as conn:
+        goal_ids = [
+            conn.execute(insert(Goal).values(title=f"Цель {number}", target_amount=1e12)).inserted_primary_key[0]
+            for number in range(args.goals)
+        ]
+    _, seed_ms = timed(seed_descriptions, engine, goal_ids, args.rows)
+    print(f"Seeded {args.rows} rows with search index in {seed_ms / 1000:.1f} s")
+
+    failed = False
+    print(f"{'query':>16} {'sort':>10} {'found':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    with SessionLocal() as db:
+        for label, query, by_goal in QUERIES:
+            for sort in ("recent", "relevance"):
+                goal_id = goal_ids[0] if by_goal else None
+                durations = []
+                for _ in range(args.repeats):
+                    found, elapsed = timed(search_transactions, db, query, goal_id=goal_id, sort=sort, limit=50)
+                    durations.append(elapsed)
+                p50 = percentile(durations, 50)
+                print(f"{label:>16} {sort:>10} {len(found):>6} {p50:>8.2f} {percentile(durations, 99):>8.2f}")
+                failed = failed or (sort == "recent" and p50 > args.max_ms)
+
+    if failed:
+        sys.exit(f"Median search time in recent order exceeded {args.max_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
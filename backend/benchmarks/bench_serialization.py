@@ -0,0 +1,70 @@
+"""Микробенчмарк сериализации списков транзакций.
+
+Сравнивает стоимость строки ответа на прежнем пути (ORM-объекты, проверка по
+response_model и стандартный json) и на быстром пути (колоночный запрос, словари
+и orjson) для страниц из 100, 1 000 и 10 000 строк.
+
+Запуск из каталога backend:
+    python benchmarks/bench_serialization.py --repeat 20
+"""
+import argparse
+import json
+
+from common import seed_transactions, timed, use_temp_database
+
+SIZES = (100, 1_000, 10_000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    use_temp_database()
+
+    from fastapi.responses import ORJSONResponse
+    from pydantic import TypeAdapter
+    from database import engine, SessionLocal
+    from models import Goal, Transaction
+    from migrate import run_migrations
+    from schemas import TransactionResponse
+    from serialization import response_columns, row_dicts
+
+    run_migrations(engine)
+    with SessionLocal() as db:
+        goal = Goal(title="Сериализация", target_amount=1e12)
+        db.add(goal)
+        db.commit()
+        goal_id = goal.id
+    seed_transactions(engine, goal_id, max(SIZES))
+
+    adapter = TypeAdapter(list[TransactionResponse])
+    columns = response_columns(Transaction, TransactionResponse)
+
+    def orm_path(db, size):
+        # Как FastAPI с response_model: проверка ORM-объектов схемой и json.dumps
+        rows = db.query(Transaction).order_by(Transaction.id).limit(size).all()
+        content = adapter.dump_python(adapter.validate_python(rows, from_attributes=True), mode="json")
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+    def fast_path(db, size):
+        rows = db.query(*columns).order_by(Transaction.id).limit(size)
+        return ORJSONResponse(row_dicts(rows)).body
+
+    print(f"{'rows':>8} {'orm us/row':>11} {'fast us/row':>12} {'speedup':>8}")
+    for size in SIZES:
+        results = {}
+        for name, path in (("orm", orm_path), ("fast", fast_path)):
+            best = float("inf")
+            for _ in range(args.repeat):
+                with SessionLocal() as db:
+                    body, elapsed_ms = timed(path, db, size)
+                best = min(best, elapsed_ms)
+            results[name] = (best * 1000 / size, body)
+        assert json.loads(results["orm"][1]) == json.loads(results["fast"][1])
+        orm_us, fast_us = results["orm"][0], results["fast"][0]
+        print(f"{size:>8} {orm_us:>11.2f} {fast_us:>12.2f} {orm_us / fast_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
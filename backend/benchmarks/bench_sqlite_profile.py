@@ -0,0 +1,96 @@
+"""Бенчмарк конкурентной записи в SQLite для профилей default и production.
+
+Несколько потоков одновременно создают транзакции (вставка + изменение баланса цели,
+как в POST /transactions/), каждый в своей сессии. Печатает число успешных фиксаций
+в секунду и количество ошибок "database is locked".
+
+Запуск из каталога backend:
+    python benchmarks/bench_sqlite_profile.py --threads 16 --duration 10
+"""
+import argparse
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.exc import OperationalError
+
+from common import create_schema, percentile, use_temp_database
+
+
+def run_profile(profile: str, threads: int, duration: float) -> dict:
+    import os
+    from sqlalchemy.orm import sessionmaker
+    from database import create_app_engine
+    from balance import apply_transaction
+    from models import Goal, Transaction
+
+    use_temp_database(f"contention-{profile}.db")
+    url = os.environ["DATABASE_URL"]
+    create_schema(url)
+    engine = create_app_engine(url, profile=profile, pool_size=threads)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    with Session() as db:
+        goal = Goal(title="Конкурентная запись", target_amount=1e9)
+        db.add(goal)
+        db.commit()
+        goal_id = goal.id
+
+    commits, locked, latencies = 0, 0, []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def writer():
+        nonlocal commits, locked
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            with Session() as db:
+                try:
+                    created_at = datetime.utcnow()
+                    db.add(Transaction(goal_id=goal_id, amount=1.0, transaction_type="deposit", created_at=created_at))
+                    apply_transaction(db, goal_id, 1.0, "deposit", created_at)
+                    db.commit()
+                except OperationalError:
+                    db.rollback()
+                    with lock:
+                        locked += 1
+                    continue
+            with lock:
+                commits += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    workers = [threading.Thread(target=writer) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    return {
+        "commits_per_sec": commits / elapsed,
+        "locked_errors": locked,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    use_temp_database()
+    print(f"{'profile':>11} {'commits/s':>10} {'locked':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for profile in ("default", "production"):
+        result = run_profile(profile, args.threads, args.duration)
+        print(
+            f"{profile:>11} {result['commits_per_sec']:>10.1f} {result['locked_errors']:>8} "
+            f"{result['p50']:>8.2f} {result['p99']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Бенчмарк холодного старта приложения.
+
+Каждый прогон выполняется в новом процессе Python, как при запуске воркера
+или serverless-инстанса с нуля. Замеряются этапы:
+    import   - импорт main (FastAPI, SQLAlchemy, модели, схемы, роутеры);
+    startup  - обработчики запуска (проверка версии схемы);
+    first    - первый запрос (соединение с БД, настройка мапперов, компиляция SQL);
+    second   - повторный такой же запрос для сравнения.
+В режиме uvicorn замеряется время от запуска процесса сервера до первого ответа.
+
+Запуск из каталога backend:
+    python benchmarks/bench_startup.py --runs 10 --path /goals/
+    python benchmarks/bench_startup.py --mode uvicorn --runs 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from common import BACKEND_DIR, create_schema, percentile, use_temp_database
+
+# Код, выполняемый в дочернем процессе: клиент импортируется до начала замера
+CHILD = """
+import asyncio, json, sys, time
+import httpx
+
+async def main(path):
+    started = time.perf_counter()
+    import main as application
+    imported = time.perf_counter()
+    await application.app.router.startup()
+    ready = time.perf_counter()
+    transport = httpx.ASGITransport(app=application.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://startup") as client:
+        (await client.get(path)).raise_for_status()
+        first = time.perf_counter()
+        (await client.get(path)).raise_for_status()
+        second = time.perf_counter()
+    print(json.dumps({
+        "import": (imported - started) * 1000,
+        "startup": (ready - imported) * 1000,
+        "first": (first - ready) * 1000,
+        "second": (second - first) * 1000,
+        "total": (first - started) * 1000,
+    }))
+
+asyncio.run(main(sys.argv[1]))
+"""
+
+
+def run_inprocess(path: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, path], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_uvicorn(path: str, port: int) -> dict:
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError("Server exited during startup")
+            try:
+                httpx.get(f"http://127.0.0.1:{port}{path}", timeout=1.0).raise_for_status()
+                break
+            except httpx.HTTPError:
+                time.sleep(0.005)
+        return {"total": (time.perf_counter() - started) * 1000}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/goals/", help="first request path")
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+
+    use_temp_database("startup.db")
+    create_schema(os.environ["DATABASE_URL"])
+
+    samples = [
+        run_inprocess(args.path) if args.mode == "inprocess" else run_uvicorn(args.path, args.port)
+        for _ in range(args.runs)
+    ]
+    print(f"{'phase':>8} {'p50 ms':>8} {'p90 ms':>8} {'max ms':>8}")
+    for phase in samples[0]:
+        values = [sample[phase] for sample in samples]
+        print(f"{phase:>8} {percentile(values, 50):>8.1f} {percentile(values, 90):>8.1f} {max(values):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Бенчмарк изоляции арендаторов: время запросов одного арендатора при росте числа остальных.
+
+Арендатор probe получает --rows транзакций. Затем добавляются другие арендаторы
+(по --rows транзакций у каждого) до каждого значения из --tenants, и после каждого шага
+замеряются запросы probe через API: страница транзакций, отбор по типу, список целей,
+статистика и поиск. С индексами (tenant_id, ...) медианы не должны расти с числом
+арендаторов; если медиана на последнем шаге больше первой в --max-ratio раз (и больше
+1 мс), скрипт завершается с ошибкой.
+
+С --shards каждый арендатор получает свой файл SQLite (TENANT_SHARDS_DIR).
+
+Запуск из каталога backend:
+    python benchmarks/bench_tenants.py --tenants 0,10,50 --rows 20000
+    python benchmarks/bench_tenants.py --shards
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from common import percentile, timed, use_temp_database
+
+QUERIES = (
+    ("transactions", "/transactions/", {"limit": 100}),
+    ("by type", "/transactions/", {"limit": 100, "transaction_type": "withdrawal"}),
+    ("goals", "/goals/", {}),
+    ("stats", "/goals/stats", {}),
+    ("search", "/search/transactions", {"q": "отпуск", "sort": "recent"}),
+)
+
+WORDS = "зарплата премия отпуск подарок ремонт машина кафе продукты такси кино".split()
+
+
+def seed_tenant(tenant: str, rows: int, goals: int = 5, batch_size: int = 50000):
+    """Цели и история арендатора в его БД (основной или файле шарда)"""
+    from sqlalchemy import insert
+    from database import tenant_database
+    from models import Goal, Transaction
+    from search import index_pending_rows
+
+    random.seed(tenant)
+    start = datetime.utcnow() - timedelta(days=365)
+    with tenant_database(tenant).engine.begin() as conn:
+        goal_ids = [
+            conn.execute(insert(Goal).values(tenant_id=tenant, title=f"Цель {number}", target_amount=100000)).inserted_primary_key[0]
+            for number in range(goals)
+        ]
+        for offset in range(0, rows, batch_size):
+            conn.execute(insert(Transaction), [
+                {
+                    "tenant_id": tenant,
+                    "goal_id": random.choice(goal_ids),
+                    "amount": 100.0,
+                    "transaction_type": random.choice(("deposit", "withdrawal")),
+                    "description": " ".join(random.choices(WORDS, k=3)),
+                    "created_at": start + timedelta(seconds=number * 30),
+                }
+                for number in range(offset, min(rows, offset + batch_size))
+            ])
+        index_pending_rows(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", default="0,10,50", help="comma-separated numbers of other tenants")
+    parser.add_argument("--rows", type=int, default=20000, help="transactions per tenant")
+    parser.add_argument("--repeats", type=int, default=30)
+    parser.add_argument("--shards", action="store_true", help="one SQLite file per tenant")
+    parser.add_argument("--max-ratio", type=float, default=2.0)
+    args = parser.parse_args()
+
+    use_temp_database("bench-tenants.db")
+    os.environ["CACHE_ENABLED"] = "false"
+    os.environ.setdefault("SLOW_QUERY_MS", "60000")
+    os.environ.setdefault("TENANT_SECRET", "bench-tenants")
+    if args.shards:
+        os.environ["TENANT_SHARDS_DIR"] = tempfile.mkdtemp(prefix="piggy-shards-")
+
+    from fastapi.testclient import TestClient
+    from database import engine
+    from migrate import run_migrations
+    from main import app
+
+    run_migrations(engine)
+    client = TestClient(app)
+    from tenants import TENANT_SECRET, sign_tenant
+
+    headers = {"X-Tenant-ID": "probe", "X-Tenant-Token": sign_tenant("probe", TENANT_SECRET)}
+    seed_tenant("probe", args.rows)
+
+    steps = [int(value) for value in args.tenants.split(",")]
+    medians = {label: [] for label, _, _ in QUERIES}
+    seeded = 0
+    print(f"mode: {'shards' if args.shards else 'shared'}, {args.rows} transactions per tenant")
+    print(f"{'tenants':>8} " + " ".join(f"{label:>13}" for label, _, _ in QUERIES))
+    for step in steps:
+        for number in range(seeded, step):
+            seed_tenant(f"other{number}", args.rows)
+        seeded = max(seeded, step)
+
+        row = []
+        for label, path, params in QUERIES:
+            durations = []
+            for _ in range(args.repeats):
+                response, elapsed = timed(client.get, path, params=params, headers=headers)
+                assert response.status_code == 200, response.text
+                durations.append(elapsed)
+            medians[label].append(percentile(durations, 50))
+            row.append(f"{medians[label][-1]:>10.2f} ms")
+        print(f"{step:>8} " + " ".join(row))
+
+    slower = [
+        label for label, values in medians.items()
+        if values[-1] > max(values[0] * args.max_ratio, values[0] + 1.0)
+    ]
+    if slower:
+        sys.exit(f"Queries of one tenant slowed down as tenants were added: {', '.join(slower)}")
+
+
+if __name__ == "__main__":
+    main()
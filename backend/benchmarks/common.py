@@ -0,0 +1,78 @@
+"""Общие утилиты для бенчмарков backend-части.
+
+Бенчмарки запускаются из каталога backend, например:
+    python benchmarks/bench_balance.py
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def use_temp_database(name: str = "bench.db") -> str:
+    """Направляет приложение на временную SQLite-базу. Вызывать до импорта модулей backend."""
+    path = os.path.join(tempfile.mkdtemp(prefix="piggy-bench-"), name)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    return path
+
+
+def create_schema(database_url: str):
+    """Применяет миграции к внешней базе (для запуска приложения отдельным процессом)"""
+    from database import create_app_engine
+    from migrate import run_migrations
+
+    schema_engine = create_app_engine(database_url)
+    run_migrations(schema_engine)
+    schema_engine.dispose()
+
+
+def seed_transactions(engine, goal_id: int, count: int, batch_size: int = 50000):
+    """Быстро заполняет историю цели пополнениями через executemany"""
+    from sqlalchemy import insert, select, func, update
+    from models import Goal, Transaction
+
+    start = datetime.utcnow() - timedelta(days=365)
+    with engine.begin() as conn:
+        inserted = 0
+        while inserted < count:
+            size = min(batch_size, count - inserted)
+            conn.execute(
+                insert(Transaction),
+                [
+                    {
+                        "goal_id": goal_id,
+                        "amount": 100.0,
+                        "transaction_type": "deposit",
+                        "description": f"seed {inserted + i}",
+                        "created_at": start + timedelta(seconds=inserted + i),
+                    }
+                    for i in range(size)
+                ],
+            )
+            inserted += size
+        total = conn.execute(
+            select(func.coalesce(func.sum(Transaction.amount), 0)).where(Transaction.goal_id == goal_id)
+        ).scalar()
+        conn.execute(update(Goal).where(Goal.id == goal_id).values(current_balance=total))
+
+
+def percentile(values, pct: float) -> float:
+    """Перцентиль по отсортированной выборке (pct от 0 до 100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def timed(func, *args, **kwargs):
+    """Выполняет функцию и возвращает (результат, время в миллисекундах)"""
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
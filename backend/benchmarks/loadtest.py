@@ -0,0 +1,264 @@
+"""Воспроизводимый нагрузочный тест API со сравнением с базовым прогоном.
+
+Заполняет временную SQLite-базу (goals x transactions), поднимает приложение
+в процессе (httpx.ASGITransport) или отдельным процессом uvicorn и гоняет смешанную
+нагрузку на заданных уровнях конкурентности:
+    deposit  - пополнение с главной страницы: POST /transactions/ и чтение цели;
+    browse   - просмотр истории: первая страница GET /transactions/ и две следующие по курсору;
+    settings - чтение настроек GET /settings/.
+
+Результат (пропускная способность и перцентили задержек) пишется в JSON. С --baseline
+прогон сравнивается с сохраненным результатом и завершается с кодом 1 при регрессии.
+
+Запуск из каталога backend:
+    python benchmarks/loadtest.py run --goals 10 --transactions 10000 --concurrency 1 16 64 --output current.json
+    python benchmarks/loadtest.py run --baseline baseline.json --max-regression 0.2
+    python benchmarks/loadtest.py compare baseline.json current.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from common import BACKEND_DIR, create_schema, percentile, seed_transactions, use_temp_database
+
+# Доли сценариев в смешанной нагрузке по умолчанию
+DEFAULT_MIX = {"deposit": 0.2, "browse": 0.5, "settings": 0.3}
+
+
+def seed_database(database_url: str, goals: int, transactions: int) -> list[int]:
+    """Создает цели с историей транзакций и запись настроек, возвращает id целей"""
+    from sqlalchemy import insert
+    from database import create_app_engine
+    from models import Goal, Settings
+
+    create_schema(database_url)
+    seed_engine = create_app_engine(database_url)
+    with seed_engine.begin() as conn:
+        conn.execute(insert(Settings), [{"theme": "light", "currency": "RUB", "language": "ru"}])
+        goal_ids = [
+            conn.execute(insert(Goal).values(title=f"Цель {number}", target_amount=1e12)).inserted_primary_key[0]
+            for number in range(goals)
+        ]
+    for goal_id in goal_ids:
+        seed_transactions(seed_engine, goal_id, transactions)
+    seed_engine.dispose()
+    return goal_ids
+
+
+async def deposit(client: httpx.AsyncClient, rng: random.Random, goal_ids: list[int], timings):
+    goal_id = rng.choice(goal_ids)
+    await timed_request(timings, "POST /transactions/", client.post(
+        "/transactions/",
+        json={"goal_id": goal_id, "amount": round(rng.uniform(10, 1000), 2), "transaction_type": "deposit"},
+    ))
+    await timed_request(timings, "GET /goals/{goal_id}", client.get(f"/goals/{goal_id}"))
+
+
+async def browse(client: httpx.AsyncClient, rng: random.Random, goal_ids: list[int], timings):
+    params = {"limit": 100}
+    if rng.random() < 0.5:
+        params["goal_id"] = rng.choice(goal_ids)
+    for _ in range(3):
+        response = await timed_request(timings, "GET /transactions/", client.get("/transactions/", params=params))
+        cursor = response.headers.get("x-next-cursor") if response is not None else None
+        if not cursor:
+            break
+        params = {**params, "cursor": cursor}
+
+
+async def read_settings(client: httpx.AsyncClient, rng: random.Random, goal_ids: list[int], timings):
+    await timed_request(timings, "GET /settings/", client.get("/settings/"))
+
+
+SCENARIOS = {"deposit": deposit, "browse": browse, "settings": read_settings}
+
+
+async def timed_request(timings, name: str, request):
+    started = time.perf_counter()
+    try:
+        response = await request
+        failed = response.status_code >= 400
+    except httpx.HTTPError:
+        response, failed = None, True
+    timings[name].append(((time.perf_counter() - started) * 1000, failed))
+    return response
+
+
+def summarize_latencies(samples: list[tuple[float, bool]]) -> dict:
+    latencies = [latency for latency, _ in samples]
+    return {
+        "count": len(samples),
+        "errors": sum(failed for _, failed in samples),
+        "p50": percentile(latencies, 50),
+        "p90": percentile(latencies, 90),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies, default=0.0),
+    }
+
+
+async def run_level(client: httpx.AsyncClient, goal_ids, concurrency: int, duration: float, mix: dict, seed: int) -> dict:
+    timings = defaultdict(list)
+    deadline = time.monotonic() + duration
+    names, weights = list(mix), list(mix.values())
+
+    async def worker(number: int):
+        rng = random.Random(seed * 1000 + number)
+        while time.monotonic() < deadline:
+            scenario = rng.choices(names, weights)[0]
+            await SCENARIOS[scenario](client, rng, goal_ids, timings)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(number) for number in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    total = summarize_latencies([sample for samples in timings.values() for sample in samples])
+    return {
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "throughput_rps": total["count"] / elapsed,
+        **total,
+        "endpoints": {name: summarize_latencies(samples) for name, samples in sorted(timings.items())},
+    }
+
+
+async def run_inprocess(goal_ids, args, mix) -> list[dict]:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits, timeout=60.0) as client:
+        return [await run_level(client, goal_ids, level, args.duration, mix, args.seed) for level in args.concurrency]
+
+
+async def run_uvicorn(goal_ids, args, mix) -> list[dict]:
+    from bench_async import wait_for_server
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        await asyncio.to_thread(wait_for_server, base_url)
+        results = []
+        for level in args.concurrency:
+            limits = httpx.Limits(max_connections=level, max_keepalive_connections=level)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+                results.append(await run_level(client, goal_ids, level, args.duration, mix, args.seed))
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def compare(baseline: dict, current: dict, max_regression: float) -> list[str]:
+    """Сравнивает прогоны по уровням конкурентности и возвращает найденные регрессии"""
+    previous = {level["concurrency"]: level for level in baseline["results"]}
+    problems = []
+    for level in current["results"]:
+        before = previous.get(level["concurrency"])
+        if before is None:
+            continue
+        prefix = f"concurrency {level['concurrency']}"
+        if level["throughput_rps"] < before["throughput_rps"] * (1 - max_regression):
+            problems.append(f"{prefix}: throughput {before['throughput_rps']:.1f} -> {level['throughput_rps']:.1f} rps")
+        for metric in ("p50", "p99"):
+            if level[metric] > before[metric] * (1 + max_regression):
+                problems.append(f"{prefix}: {metric} {before[metric]:.2f} -> {level[metric]:.2f} ms")
+        if level["errors"] > before["errors"]:
+            problems.append(f"{prefix}: errors {before['errors']} -> {level['errors']}")
+    return problems
+
+
+def print_results(report: dict):
+    print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for level in report["results"]:
+        print(
+            f"{level['concurrency']:>8} {level['count']:>9} {level['errors']:>7} {level['throughput_rps']:>9.1f} "
+            f"{level['p50']:>8.2f} {level['p90']:>8.2f} {level['p99']:>8.2f}"
+        )
+
+
+def report_regressions(baseline: dict, current: dict, max_regression: float) -> int:
+    if baseline.get("config") != current.get("config"):
+        print("WARNING: baseline was recorded with a different configuration")
+    problems = compare(baseline, current, max_regression)
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    if not problems:
+        print(f"No regressions above {max_regression:.0%}")
+    return 1 if problems else 0
+
+
+def run(args) -> int:
+    mix = dict(DEFAULT_MIX)
+    for item in args.mix or []:
+        name, weight = item.split("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}'. Use: {', '.join(SCENARIOS)}")
+        mix[name] = float(weight)
+
+    use_temp_database("loadtest.db")
+    goal_ids = seed_database(os.environ["DATABASE_URL"], args.goals, args.transactions)
+    runner = run_inprocess if args.mode == "inprocess" else run_uvicorn
+    report = {
+        "config": {
+            "mode": args.mode,
+            "goals": args.goals,
+            "transactions_per_goal": args.transactions,
+            "duration": args.duration,
+            "mix": mix,
+            "seed": args.seed,
+        },
+        "results": asyncio.run(runner(goal_ids, args, mix)),
+    }
+
+    print_results(report)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            return report_regressions(json.load(baseline), report, args.max_regression)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="seed a database and run the load test")
+    run_parser.add_argument("--mode", choices=("inprocess", "uvicorn"), default="inprocess")
+    run_parser.add_argument("--goals", type=int, default=10)
+    run_parser.add_argument("--transactions", type=int, default=10_000, help="transactions per goal")
+    run_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    run_parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    run_parser.add_argument("--mix", nargs="*", help="scenario weights, e.g. deposit=0.2 browse=0.5 settings=0.3")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--port", type=int, default=8767)
+    run_parser.add_argument("--output", help="write JSON results to this file")
+    run_parser.add_argument("--baseline", help="JSON results to compare against")
+    run_parser.add_argument("--max-regression", type=float, default=0.2)
+
+    compare_parser = commands.add_parser("compare", help="compare two saved JSON results")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--max-regression", type=float, default=0.2)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        sys.exit(run(args))
+    with open(args.baseline) as baseline, open(args.current) as current:
+        sys.exit(report_regressions(json.load(baseline), json.load(current), args.max_regression))
+
+
+if __name__ == "__main__":
+    main()
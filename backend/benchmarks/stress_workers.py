@@ -0,0 +1,145 @@
+"""Стресс-тест записи при нескольких воркерах uvicorn.
+
+Запускает приложение с --workers N на временной файловой SQLite-базе и гоняет
+M конкурентных клиентов: пополнения и снятия, изменение и удаление своих
+транзакций и полный пересчет баланса цели. Ожидаемые балансы считаются на стороне
+клиента по успешным ответам, после нагрузки они сверяются с балансами целей
+и с историей транзакций (verify-balance). При расхождении код выхода 1.
+
+Запуск из каталога backend:
+    python benchmarks/stress_workers.py --workers 1 4 --clients 32 --ops 50
+    DATABASE_ASYNC=1 python benchmarks/stress_workers.py --workers 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+import httpx
+
+from common import BACKEND_DIR, create_schema, use_temp_database
+
+
+def seed_goals(database_url: str, goals: int) -> list[int]:
+    from sqlalchemy import insert
+    from database import create_app_engine
+    from models import Goal
+
+    create_schema(database_url)
+    seed_engine = create_app_engine(database_url)
+    with seed_engine.begin() as conn:
+        goal_ids = [
+            conn.execute(insert(Goal).values(title=f"Стресс {number}", target_amount=1e12, current_balance=0)).inserted_primary_key[0]
+            for number in range(goals)
+        ]
+    seed_engine.dispose()
+    return goal_ids
+
+
+def signed(amount: Decimal, transaction_type: str) -> Decimal:
+    return amount if transaction_type == "deposit" else -amount
+
+
+async def client_worker(client: httpx.AsyncClient, rng: random.Random, goal_ids, ops: int, expected, stats):
+    # Транзакции, созданные этим клиентом: id -> (goal_id, amount, type)
+    own = {}
+    for _ in range(ops):
+        action = rng.choices(("create", "update", "delete", "recalculate"), (0.7, 0.1, 0.1, 0.1))[0]
+        if action in ("update", "delete") and not own:
+            action = "create"
+        if action == "create":
+            goal_id = rng.choice(goal_ids)
+            amount = Decimal(rng.randint(1, 100_000)) / 100
+            transaction_type = rng.choice(("deposit", "deposit", "withdrawal"))
+            response = await client.post("/transactions/", json={
+                "goal_id": goal_id, "amount": float(amount), "transaction_type": transaction_type,
+            })
+            if response.status_code == 200:
+                own[response.json()["id"]] = (goal_id, amount, transaction_type)
+                expected[goal_id] += signed(amount, transaction_type)
+        elif action == "update":
+            transaction_id = rng.choice(list(own))
+            goal_id, amount, transaction_type = own[transaction_id]
+            new_amount = Decimal(rng.randint(1, 100_000)) / 100
+            response = await client.put(f"/transactions/{transaction_id}", json={"amount": float(new_amount)})
+            if response.status_code == 200:
+                own[transaction_id] = (goal_id, new_amount, transaction_type)
+                expected[goal_id] += signed(new_amount, transaction_type) - signed(amount, transaction_type)
+        elif action == "delete":
+            transaction_id = rng.choice(list(own))
+            goal_id, amount, transaction_type = own[transaction_id]
+            response = await client.delete(f"/transactions/{transaction_id}")
+            if response.status_code == 200:
+                del own[transaction_id]
+                expected[goal_id] -= signed(amount, transaction_type)
+        else:
+            response = await client.post(f"/goals/{rng.choice(goal_ids)}/recalculate-balance")
+        stats["requests"] += 1
+        if response.status_code != 200:
+            stats["errors"] += 1
+
+
+async def run_workers(workers: int, args, port: int) -> bool:
+    use_temp_database(f"stress-{workers}.db")
+    goal_ids = seed_goals(os.environ["DATABASE_URL"], args.goals)
+    expected = defaultdict(Decimal)
+    stats = {"requests": 0, "errors": 0}
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        from bench_async import wait_for_server
+        await asyncio.to_thread(wait_for_server, base_url, 30.0)
+        # Соединения не простаивают дольше keep-alive сервера (5 с), иначе запрос может уйти в закрытое соединение
+        limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients, keepalive_expiry=1.0)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                client_worker(client, random.Random(args.seed * 1000 + number), goal_ids, args.ops, expected, stats)
+                for number in range(args.clients)
+            ))
+            elapsed = time.perf_counter() - started
+
+            consistent = True
+            for goal_id in goal_ids:
+                balance = Decimal(str((await client.get(f"/goals/{goal_id}")).json()["current_balance"]))
+                check = (await client.get(f"/goals/{goal_id}/verify-balance")).json()
+                if balance != expected[goal_id] or not check["is_consistent"]:
+                    consistent = False
+                    print(f"  goal {goal_id}: balance {balance}, expected {expected[goal_id]}, check {check}")
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(
+        f"{workers:>8} {args.clients:>8} {stats['requests']:>9} {stats['errors']:>7} "
+        f"{stats['requests'] / elapsed:>9.1f} {'OK' if consistent else 'MISMATCH':>9}"
+    )
+    return consistent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--clients", type=int, default=32, help="concurrent clients")
+    parser.add_argument("--ops", type=int, default=50, help="operations per client")
+    parser.add_argument("--goals", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--port", type=int, default=8769)
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'clients':>8} {'requests':>9} {'errors':>7} {'rps':>9} {'balances':>9}")
+    results = [asyncio.run(run_workers(workers, args, args.port)) for workers in args.workers]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
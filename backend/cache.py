@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from database import after_commit
+
+# Время жизни записи кэша в секундах и максимальное число записей
+CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "1024"))
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Сколько секунд процесс использует прочитанные версии таблиц, не обращаясь к table_versions
+TABLE_VERSIONS_TTL = float(os.getenv("TABLE_VERSIONS_TTL", "1"))
+
+# Признак отсутствия значения в кэше (None может быть закэшированным значением)
+MISSING = object()
+
+
+class TTLCache:
+    """Потокобезопасный LRU-кэш с ограничением времени жизни записей.
+
+    Счетчик generation увеличивается при каждой инвалидации: значение, прочитанное из БД
+    до инвалидации, не попадет в кэш (см. get_or_load).
+    """
+
+    def __init__(self, name: str, maxsize: int = CACHE_MAXSIZE, ttl: float = CACHE_TTL, enabled: bool = CACHE_ENABLED):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, generation: int = None):
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """Возвращает значение из кэша или загружает его через loader() и сохраняет"""
+        value = self.get(key)
+        if value is not MISSING:
+            return value
+        generation = self.generation
+        value = loader()
+        self.set(key, value, generation)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "name": self.name,
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / requests, 4) if requests else 0.0,
+            }
+
+
+# Кэши общие для всех арендаторов: ключ включает арендатора и версии таблиц (versions.versioned_key).
+# Запись в таблицу goals увеличивает ее версию при фиксации (versions.mark_changed и события
+# сессии), после чего записи со старой версией не находятся и вытесняются по TTL и LRU
+# Запись настроек арендатора
+settings_cache = TTLCache("settings")
+# Цели по id
+goal_cache = TTLCache("goals")
+# Страницы списка целей арендатора по (skip, limit)
+goal_list_cache = TTLCache("goal_lists")
+# Версии таблиц по (БД, арендатор, таблицы): попадание в кэш выше и проверка ETag обходятся
+# без запроса к БД. Фиксация изменений в этом процессе очищает его сразу (versions.py),
+# записи других воркеров становятся видны не позже чем через TABLE_VERSIONS_TTL
+table_versions_cache = TTLCache("table_versions", ttl=TABLE_VERSIONS_TTL)
+
+
+def invalidate_settings_on_commit(db):
+    after_commit(db, settings_cache.clear)
+
+
+def cache_stats() -> list[dict]:
+    return [cache.stats() for cache in (settings_cache, goal_cache, goal_list_cache, table_versions_cache)]
@@ -0,0 +1,65 @@
+"""Общая подготовка тестов: временная БД, клиент приложения и помощники.
+
+Модуль загружается pytest раньше тестовых модулей, поэтому DATABASE_URL
+подменяется до импорта database и main.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Добавляем путь к backend для импорта модулей
+sys.path.append(str(Path(__file__).parent))
+# pytest загружает модуль как backend.conftest, а тесты импортируют помощники из conftest:
+# без псевдонима это были бы два модуля с разными приложениями и клиентами
+sys.modules.setdefault("conftest", sys.modules[__name__])
+
+# Тесты работают с временной БД, а не с файлом разработчика: архивация и сверка
+# балансов в тестах обрабатывают все строки базы
+if "piggy-test-" not in os.environ.get("DATABASE_URL", ""):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='piggy-test-'), 'test.db')}"
+
+import pytest
+from fastapi.testclient import TestClient
+from database import engine
+from migrate import run_migrations
+
+# Применяем миграции до импорта приложения
+run_migrations(engine)
+
+from main import app
+
+client = TestClient(app)
+
+# Служебные эндпоинты (метрики, статистика кэша, обслуживание БД) требуют токена администратора
+import admin
+admin.ADMIN_TOKEN = "test-admin"
+ADMIN = {"Authorization": "Bearer test-admin"}
+
+# Арендаторы кроме default доступны только с секретом установки и подписанным токеном
+import tenants
+TENANT_SECRET = "test-tenant-secret"
+
+
+def tenant_headers(tenant):
+    return {"X-Tenant-ID": tenant, "X-Tenant-Token": tenants.sign_tenant(tenant, TENANT_SECRET)}
+
+
+@pytest.fixture
+def tenant_secret(monkeypatch):
+    """Включает проверку токенов арендаторов; общий клиент работает от имени default"""
+    monkeypatch.setattr(tenants, "TENANT_SECRET", TENANT_SECRET)
+    headers = client.headers.copy()
+    client.headers.update(tenant_headers(tenants.DEFAULT_TENANT))
+    yield
+    client.headers = headers
+
+
+def create_goal():
+    response = client.post("/goals/", json={"title": "Тестовая цель", "target_amount": 1000.0})
+    assert response.status_code == 200, f"Expected status 200, got {response.status_code}"
+    return response.json()["id"]
+
+
+def get_balance(goal_id):
+    return client.get(f"/goals/{goal_id}").json()["current_balance"]
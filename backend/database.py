@@ -1,24 +1,313 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from fastapi import Depends
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from starlette.concurrency import run_in_threadpool
+import functools
+import logging
 import os
+import time
+from typing import Optional
+import metrics
+from shards import shards
+from stemmer import stem_text
+from tenants import DEFAULT_TENANT, current_tenant
+from writes import (
+    WRITE_OPTIONS, WriteSession, acquire_write_queue, begin_sqlite_transaction, end_sqlite_transaction,
+    release_write_queue,
+)
 
 # Получаем путь к базе данных из переменной окружения или используем локальный файл
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./smart_piggy_bank.db")
 
+# Асинхронный режим работы с БД (aiosqlite для SQLite, asyncpg для PostgreSQL)
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
+
+# Асинхронные драйверы для поддерживаемых СУБД
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+# Профиль настройки SQLite: production - WAL и прагмы ниже, default - настройки SQLite по умолчанию
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production")
+
+# Прагмы, выполняемые на каждом новом соединении в профиле production
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT", "5000"),  # мс
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),  # отрицательное значение - в КиБ (64 МиБ)
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", "268435456"),  # 256 МиБ
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+# Настройки пула соединений (если переменная не задана, используется значение SQLAlchemy)
+POOL_SETTINGS = {
+    "pool_size": ("DB_POOL_SIZE", int),
+    "max_overflow": ("DB_MAX_OVERFLOW", int),
+    "pool_recycle": ("DB_POOL_RECYCLE", int),
+    "pool_timeout": ("DB_POOL_TIMEOUT", float),
+    "pool_pre_ping": ("DB_POOL_PRE_PING", lambda value: value.lower() in ("1", "true", "yes")),
+}
+
+# Запросы дольше этого порога (в мс) пишутся в лог и считаются в db_slow_queries_total
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+logger = logging.getLogger("smart_piggy_bank.sql")
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def is_sqlite_memory(url: str) -> bool:
+    return is_sqlite(url) and (url.split("://", 1)[1] in ("", "/", "/:memory:") or "mode=memory" in url)
+
+
+def pool_options() -> dict:
+    options = {}
+    for option, (variable, convert) in POOL_SETTINGS.items():
+        value = os.getenv(variable)
+        if value:
+            options[option] = convert(value)
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Настраивает новое соединение SQLite согласно SQLITE_PRAGMAS"""
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def create_app_engine(url: str, profile: str = SQLITE_PROFILE, **options):
+    """Создает движок с настройками пула и, для SQLite, профилем прагм"""
+    if is_sqlite(url):
+        options.setdefault("connect_args", {"check_same_thread": False})
+    if not is_sqlite_memory(url):
+        options = {**pool_options(), **options}
+
+    new_engine = create_engine(url, **options)
+    configure_engine(new_engine, url, profile)
+    return new_engine
+
+
+def disable_driver_autobegin(dbapi_connection, connection_record):
+    # Драйвер SQLite не открывает транзакции сам: BEGIN выполняет begin_sqlite_transaction
+    dbapi_connection.isolation_level = None
+
+
+def enable_foreign_keys(dbapi_connection, connection_record):
+    # SQLite проверяет внешние ключи и выполняет ON DELETE CASCADE только с этой прагмой
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def register_sqlite_functions(dbapi_connection, connection_record):
+    # Основы слов для поисковых таблиц FTS5: их вызывает индексация очереди search_pending
+    dbapi_connection.create_function("ru_stem", 1, stem_text, deterministic=True)
+
+
+def configure_engine(sync_engine, url: str, profile: str = SQLITE_PROFILE):
+    """Подключает к SQLite явное управление транзакциями, внешние ключи и прагмы профиля production"""
+    if not is_sqlite(url):
+        return
+    event.listen(sync_engine, "connect", disable_driver_autobegin)
+    event.listen(sync_engine, "connect", enable_foreign_keys)
+    event.listen(sync_engine, "connect", register_sqlite_functions)
+    event.listen(sync_engine, "begin", begin_sqlite_transaction)
+    event.listen(sync_engine, "commit", end_sqlite_transaction)
+    event.listen(sync_engine, "rollback", end_sqlite_transaction)
+    if not is_sqlite_memory(url) and profile == "production":
+        event.listen(sync_engine, "connect", set_sqlite_pragmas)
+
+
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context.query_started = time.perf_counter()
+
+
+def stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context.query_started
+    metrics.record_query(duration)
+    if duration * 1000 >= SLOW_QUERY_MS:
+        metrics.record_slow_query()
+        logger.warning("Slow query (%.1f ms): %s", duration * 1000, statement)
+
+
+def instrument_engine(sync_engine, name: Optional[str] = None):
+    """Подключает к движку замеры SQL-запросов и ожидания соединения из пула для /metrics"""
+    event.listen(sync_engine, "before_cursor_execute", start_query_timer)
+    event.listen(sync_engine, "after_cursor_execute", stop_query_timer)
+    if name is None:
+        return
+
+    pool = sync_engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            metrics.record_pool_wait(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+    metrics.pools[name] = pool
+
+
 # Создаем движок для SQLite
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_app_engine(DATABASE_URL)
+instrument_engine(engine, "sync")
 
-# Создаем сессию для взаимодействия с БД
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Базовый класс для моделей
+class Database:
+    """Движок и фабрики сессий чтения и записи одной БД"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        # В синхронном режиме очередь записи занимается на время транзакции (см. begin_sqlite_transaction)
+        self.WriteSessionLocal = sessionmaker(
+            autocommit=False, autoflush=False, class_=WriteSession,
+            bind=engine.execution_options(**WRITE_OPTIONS, write_queue=True),
+        )
+
+
+# Основная БД: все арендаторы или, в режиме шардов, только default
+main_database = Database(engine)
+SessionLocal = main_database.SessionLocal
+WriteSessionLocal = main_database.WriteSessionLocal
+
+# Режим шардов (TENANT_SHARDS_DIR, см. shards.py): остальные арендаторы - в своих файлах
+if shards is not None and (DATABASE_ASYNC or not is_sqlite(DATABASE_URL)):
+    raise RuntimeError("TENANT_SHARDS_DIR requires SQLite and DATABASE_ASYNC=false")
+
+
+def tenant_database(tenant: Optional[str] = None) -> Database:
+    """БД арендатора: файл шарда в режиме шардов, иначе основная БД"""
+    if shards is None or tenant is None or tenant == DEFAULT_TENANT:
+        return main_database
+    return shards.get(tenant)
+
+
+def tenant_databases() -> list[tuple[str, Database]]:
+    """Все БД установки с арендатором, по которому они открываются (для фоновых задач)"""
+    databases = [(DEFAULT_TENANT, main_database)]
+    if shards is not None:
+        databases += [(tenant, shards.get(tenant)) for tenant in shards.tenants() if tenant != DEFAULT_TENANT]
+    return databases
+
+
+# Базовый класс для моделей (единственный: models.py наследует модели от него)
 Base = declarative_base()
 
-# Функция для получения сессии БД
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+def make_async_url(url: str) -> str:
+    """Подставляет в URL базы данных асинхронный драйвер"""
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError(f"Async mode is not supported for '{dialect}'")
+    return f"{ASYNC_DRIVERS[dialect]}://{rest}"
+
+
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    # Для файловой SQLite по умолчанию используется NullPool, при котором прагмы
+    # выполнялись бы на каждом запросе, поэтому включаем пул соединений явно
+    async_options = {} if is_sqlite_memory(DATABASE_URL) else {"poolclass": AsyncAdaptedQueuePool, **pool_options()}
+    async_engine = create_async_engine(make_async_url(DATABASE_URL), **async_options)
+    configure_engine(async_engine.sync_engine, DATABASE_URL)
+    instrument_engine(async_engine.sync_engine, "async")
+
+    # expire_on_commit=False: после фиксации атрибуты объектов читаются без обращения к БД
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    AsyncWriteSessionLocal = async_sessionmaker(
+        async_engine.execution_options(**WRITE_OPTIONS),
+        autoflush=False, expire_on_commit=False, sync_session_class=WriteSession,
+    )
+
+    # Функция для получения асинхронной сессии БД арендатора запроса
+    async def get_db(tenant: str = Depends(current_tenant)):
+        async with AsyncSessionLocal(info={"tenant": tenant}) as db:
+            yield db
+
+    # Сессия для эндпоинтов, изменяющих данные. Очередь записи занимается на время запроса
+    # и ожидается в пуле потоков: ожидание в событии begin остановило бы event loop
+    async def get_write_db(tenant: str = Depends(current_tenant)):
+        await run_in_threadpool(acquire_write_queue, DATABASE_URL)
+        try:
+            async with AsyncWriteSessionLocal(info={"tenant": tenant}) as db:
+                yield db
+        finally:
+            release_write_queue(DATABASE_URL)
+else:
+    AsyncSession = None
+
+    # Функция для получения сессии БД арендатора запроса
+    def get_db(tenant: str = Depends(current_tenant)):
+        db = tenant_database(tenant).SessionLocal(info={"tenant": tenant})
+        try:
+            yield db
+        finally:
+            db.close()
+
+    # Сессия для эндпоинтов, изменяющих данные
+    def get_write_db(tenant: str = Depends(current_tenant)):
+        db = tenant_database(tenant).WriteSessionLocal(info={"tenant": tenant})
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+def after_commit(db, callback):
+    """Регистрирует callback, вызываемый после успешной фиксации транзакции сессии.
+
+    При откате транзакции зарегистрированные функции отбрасываются.
+    """
+    sync_session(db).info.setdefault("after_commit", []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def run_after_commit_callbacks(session):
+    for callback in session.info.pop("after_commit", []):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_after_commit_callbacks(session):
+    session.info.pop("after_commit", None)
+
+
+def sync_session(db):
+    """Возвращает синхронную сессию, стоящую за db (для AsyncSession - ее sync_session)"""
+    return db.sync_session if AsyncSession is not None and isinstance(db, AsyncSession) else db
+
+
+async def run_db(db, func, *args, **kwargs):
+    """Выполняет синхронный код работы с БД func(session, ...) без блокировки event loop.
+
+    В асинхронном режиме код выполняется через AsyncSession.run_sync поверх асинхронного
+    драйвера, в синхронном - в пуле потоков Starlette.
+    """
+    if AsyncSession is not None and isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: func(session, *args, **kwargs))
+    return await run_in_threadpool(func, db, *args, **kwargs)
+
+
+def db_endpoint(func):
+    """Превращает обработчик с синхронным кодом работы с БД в async-эндпоинт.
+
+    Обработчик получает сессию в параметре db, сигнатура для FastAPI сохраняется.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, db, **kwargs):
+        return await run_db(db, lambda session: func(*args, db=session, **kwargs))
+
+    return wrapper
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import threading
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import after_commit, sync_session
+from schemas import GoalResponse
+from serialization import dumps
+from tenants import request_tenant
+
+# Размер очереди одного подписчика: при переполнении самые старые события отбрасываются
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+
+# Интервал (в секундах) комментариев-пингов, удерживающих соединение открытым
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+
+
+class EventBroker:
+    """Pub/sub в памяти процесса: событие копируется в очереди подписчиков его арендатора.
+
+    publish можно вызывать из любого потока: запись в очередь выполняется
+    в event loop подписчика.
+    """
+
+    def __init__(self, queue_size: int = EVENTS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.subscribers: dict[asyncio.Queue, tuple[asyncio.AbstractEventLoop, Optional[str]]] = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, tenant: Optional[str] = None) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self.lock:
+            self.subscribers[queue] = (asyncio.get_running_loop(), tenant)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self.lock:
+            self.subscribers.pop(queue, None)
+
+    def publish(self, event: dict, tenant: Optional[str] = None):
+        with self.lock:
+            subscribers = list(self.subscribers.items())
+        for queue, (loop, subscriber_tenant) in subscribers:
+            if subscriber_tenant == tenant and not loop.is_closed():
+                loop.call_soon_threadsafe(self._put, queue, event)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, event: dict):
+        # Медленный клиент не должен задерживать остальных: теряет самые старые события
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+
+broker = EventBroker()
+
+
+def publish_on_commit(db, event_type: str, data: dict, key: Optional[tuple] = None, tenant: Optional[str] = None):
+    """Публикует событие после успешной фиксации транзакции сессии.
+
+    События с одинаковым key в рамках одной транзакции схлопываются: уходит последнее.
+    Событие получают подписчики арендатора tenant, по умолчанию - арендатора сессии.
+    """
+    session = sync_session(db)
+    pending = session.info.get("events")
+    if pending is None:
+        pending = session.info["events"] = {}
+        after_commit(session, lambda: publish_pending(session))
+    pending[key or (event_type, len(pending))] = (tenant or session.info.get("tenant"), {"type": event_type, **data})
+
+
+def publish_goal_on_commit(db, goal):
+    """Публикует актуальное состояние цели (goal.updated) после фиксации"""
+    sync_session(db).flush()
+    publish_on_commit(
+        db, "goal.updated", {"goal": GoalResponse.model_validate(goal).model_dump()}, key=("goal", goal.id), tenant=goal.tenant_id
+    )
+
+
+def publish_pending(session):
+    for tenant, event in session.info.pop("events", {}).values():
+        broker.publish(event, tenant)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_pending_events(session):
+    session.info.pop("events", None)
+
+
+def format_event(event: dict) -> bytes:
+    """Сообщение Server-Sent Events: тип события и данные в JSON"""
+    return b"event: " + event["type"].encode() + b"\ndata: " + dumps(event) + b"\n\n"
+
+
+async def event_stream(request: Request, heartbeat: float = EVENTS_HEARTBEAT) -> AsyncIterator[bytes]:
+    queue = broker.subscribe(request_tenant(request))
+    try:
+        # Клиент переподключается через 3 секунды после обрыва соединения
+        yield b"retry: 3000\n\n"
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(queue)
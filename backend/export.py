@@ -0,0 +1,140 @@
+import csv
+import heapq
+import io
+import itertools
+from datetime import datetime
+from typing import Iterator
+
+from sqlalchemy import select
+
+from database import tenant_database
+from models import Transaction
+from schemas import TransactionResponse
+from serialization import dumps, response_columns
+
+# Количество строк, читаемых с курсора БД за один раз
+EXPORT_BATCH_SIZE = 5000
+
+# Поддерживаемые форматы выгрузки и их типы содержимого
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+EXPORT_COLUMNS = response_columns(Transaction, TransactionResponse)
+
+
+def export_statement(model, filters: list):
+    """Колоночный запрос выгрузки в порядке (created_at, id) с потоковым чтением курсора"""
+    return (
+        select(*response_columns(model, TransactionResponse))
+        .where(*filters)
+        .order_by(model.created_at, model.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+
+def iter_batches(sources: list, tenant: str) -> Iterator[list]:
+    """Читает строки арендатора пачками по EXPORT_BATCH_SIZE через собственную сессию.
+
+    sources - список (model, filters): живая таблица и, если выгрузка уходит за горизонт,
+    архивная. Потоки строк сливаются по (created_at, id).
+    Генератор работает уже после завершения обработчика запроса, поэтому
+    не может использовать сессию из get_db.
+    """
+    with tenant_database(tenant).SessionLocal(info={"tenant": tenant}) as db:
+        if len(sources) == 1:
+            model, filters = sources[0]
+            yield from db.execute(export_statement(model, filters)).partitions()
+            return
+        streams = [db.execute(export_statement(model, filters)) for model, filters in sources]
+        rows = heapq.merge(*streams, key=lambda row: (row.created_at, row.id))
+        while batch := list(itertools.islice(rows, EXPORT_BATCH_SIZE)):
+            yield batch
+
+
+def csv_chunks(batches: Iterator[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(column.name for column in EXPORT_COLUMNS)
+    for rows in batches:
+        for row in rows:
+            writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in row)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(batches: Iterator[list]) -> Iterator[bytes]:
+    for rows in batches:
+        yield b"".join(dumps(row._asdict()) + b"\n" for row in rows)
+
+
+class ChunkSink(io.RawIOBase):
+    """Файлоподобный приемник: накапливает записанные байты до следующей выдачи клиенту"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def parquet_chunks(batches: Iterator[list]) -> Iterator[bytes]:
+    """Пишет каждую пачку отдельной группой строк Parquet"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        "id": pa.int64(),
+        "goal_id": pa.int64(),
+        "amount": pa.decimal128(18, 2),
+        "transaction_type": pa.string(),
+        "description": pa.string(),
+        "created_at": pa.timestamp("us"),
+    }
+    schema = pa.schema([(column.name, types[column.name]) for column in EXPORT_COLUMNS])
+    sink = ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for rows in batches:
+            columns = {name: [getattr(row, name) for row in rows] for name in schema.names}
+            writer.write_table(pa.table(columns, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+EXPORT_WRITERS = {
+    "csv": csv_chunks,
+    "ndjson": ndjson_chunks,
+    "parquet": parquet_chunks,
+}
+
+
+def export_transactions(sources: list, format: str, tenant: str) -> Iterator[bytes]:
+    """Поток байтов выгрузки транзакций арендатора в заданном формате"""
+    return EXPORT_WRITERS[format](iter_batches(sources, tenant))
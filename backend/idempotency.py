@@ -0,0 +1,106 @@
+"""Ключи идемпотентности для эндпоинтов записи.
+
+Клиент передает заголовок Idempotency-Key, одинаковый для всех повторов одной операции.
+Ответ первого успешного запроса сохраняется в таблице idempotency_keys в той же
+транзакции БД, что и сами изменения. Повтор с тем же ключом возвращает сохраненный
+ответ и не изменяет цели и транзакции. Ошибочные ответы не сохраняются: транзакция
+откатывается, данные не меняются, и повтор выполняется заново.
+Ключи принадлежат арендатору сессии: одинаковые ключи разных арендаторов независимы.
+"""
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import Header, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import IdempotencyKey
+from serialization import dumps
+from tenants import DEFAULT_TENANT, tenant_of
+
+# Время хранения ответа в секундах и интервал удаления просроченных ключей процессом
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_EVICT_INTERVAL = float(os.getenv("IDEMPOTENCY_EVICT_INTERVAL", "60"))
+
+# Заголовок, которым помечается повторно отданный сохраненный ответ
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+_last_eviction = 0.0
+
+
+@dataclass
+class IdempotentRequest:
+    key: str
+    fingerprint: str  # хеш метода, пути и тела запроса
+
+
+async def idempotency_key(
+    request: Request, idempotency_key: Optional[str] = Header(None, max_length=255)
+) -> Optional[IdempotentRequest]:
+    """Зависимость эндпоинтов записи: ключ из заголовка Idempotency-Key и отпечаток запроса"""
+    if not idempotency_key:
+        return None
+    body = await request.body()
+    fingerprint = hashlib.sha256(f"{request.method} {request.url.path}\n".encode() + body).hexdigest()
+    return IdempotentRequest(idempotency_key, fingerprint)
+
+
+def replay_response(db: Session, idempotency: Optional[IdempotentRequest]) -> Optional[Response]:
+    """Сохраненный ответ для повторного запроса или None, если ключ новый или просрочен.
+
+    Тот же ключ с другим запросом - ошибка клиента (422).
+    """
+    if idempotency is None:
+        return None
+    stored = db.get(IdempotencyKey, (tenant_of(db) or DEFAULT_TENANT, idempotency.key))
+    if stored is None or stored.expires_at <= datetime.utcnow():
+        return None
+    if stored.fingerprint != idempotency.fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key has already been used with a different request")
+    return Response(
+        stored.response_body,
+        status_code=stored.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def remember_response(db: Session, idempotency: Optional[IdempotentRequest], content, status_code: int = 200):
+    """Сохраняет ответ в текущей транзакции; вызывается перед commit эндпоинта"""
+    if idempotency is None:
+        return
+    now = datetime.utcnow()
+    # Ключ записывается под точкой сохранения: при конфликте откатывается только он,
+    # а не вся транзакция (внутри /batch - изменения всего пакета)
+    try:
+        with db.begin_nested():
+            # merge перезаписывает просроченную запись с тем же ключом
+            db.merge(IdempotencyKey(
+                tenant_id=tenant_of(db) or DEFAULT_TENANT,
+                key=idempotency.key,
+                fingerprint=idempotency.fingerprint,
+                status_code=status_code,
+                response_body=dumps(jsonable_encoder(content)).decode(),
+                created_at=now,
+                expires_at=now + timedelta(seconds=IDEMPOTENCY_TTL),
+            ))
+    except IntegrityError:
+        # В PostgreSQL тот же ключ одновременно записал параллельный запрос
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is already in progress")
+
+    global _last_eviction
+    if time.monotonic() - _last_eviction >= IDEMPOTENCY_EVICT_INTERVAL:
+        _last_eviction = time.monotonic()
+        evict_expired_keys(db, now)
+
+
+def evict_expired_keys(db: Session, now: Optional[datetime] = None) -> int:
+    """Удаляет просроченные ключи по индексу expires_at и возвращает их число"""
+    result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= (now or datetime.utcnow())))
+    return result.rowcount
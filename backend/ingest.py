@@ -0,0 +1,220 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import BinaryIO, Iterable, Iterator, TextIO
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from versions import mark_changed
+from events import publish_on_commit
+from balance import TRANSACTION_TYPES, apply_balance_delta, signed_amount
+from rollup import apply_daily_delta
+from models import Goal, Transaction
+from schemas import TransactionCreate
+from tenants import DEFAULT_TENANT, tenant_of
+
+# Размер пачки для executemany-вставки
+BATCH_SIZE = 5000
+
+CSV_FIELDS = ("goal_id", "amount", "transaction_type", "description")
+
+
+def _error(index: int, message: str) -> dict:
+    return {"index": index, "status": "error", "id": None, "errors": [message]}
+
+
+def validate_rows(rows: Iterable, start: int = 0) -> tuple[list[tuple[int, TransactionCreate]], list[dict]]:
+    """Проверяет строки пачки по схеме TransactionCreate.
+
+    Возвращает валидные строки вместе с их номерами и результаты для ошибочных строк.
+    """
+    valid, failed = [], []
+    for index, row in enumerate(rows, start):
+        if isinstance(row, ValueError):
+            failed.append(_error(index, str(row)))
+            continue
+        try:
+            item = TransactionCreate.model_validate(row)
+        except ValidationError as exc:
+            failed.append({
+                "index": index,
+                "status": "error",
+                "id": None,
+                "errors": [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in exc.errors()],
+            })
+            continue
+        if item.transaction_type not in TRANSACTION_TYPES:
+            failed.append(_error(index, "Invalid transaction type. Use 'deposit' or 'withdrawal'"))
+            continue
+        valid.append((index, item))
+    return valid, failed
+
+
+class TransactionIngestor:
+    """Накапливает пачки транзакций и вставляет их в рамках одной транзакции БД.
+
+    Баланс и дневные итоги каждой затронутой цели обновляются один раз в finish(),
+    фиксация выполняется одним commit. В режиме atomic при любой ошибке ничего не сохраняется.
+    """
+
+    def __init__(self, db: Session, atomic: bool = False, return_ids: bool = False):
+        self.db = db
+        # Вставка через executemany минует flush, поэтому арендатор указывается явно
+        self.tenant = tenant_of(db) or DEFAULT_TENANT
+        self.atomic = atomic
+        self.return_ids = return_ids
+        self.results: list[dict] = []
+        self.deltas: dict[int, Decimal] = defaultdict(Decimal)
+        # Суммы пополнений и снятий по (цель, день) для дневных итогов
+        self.daily: dict[tuple, list[Decimal]] = defaultdict(lambda: [Decimal(0), Decimal(0)])
+        self.known_goals: set[int] = set()
+        self.total = 0
+        self.inserted = 0
+        # В режиме atomic строки вставляются под точкой сохранения: ее откат не затрагивает
+        # остальные изменения транзакции (операции того же пакета /batch)
+        self.savepoint = db.begin_nested() if atomic else None
+
+    def _filter_existing_goals(self, valid):
+        goal_ids = {item.goal_id for _, item in valid} - self.known_goals
+        if goal_ids:
+            self.known_goals.update(self.db.scalars(select(Goal.id).where(Goal.id.in_(goal_ids))))
+        existing, missing = [], []
+        for index, item in valid:
+            if item.goal_id in self.known_goals:
+                existing.append((index, item))
+            else:
+                missing.append(_error(index, "Goal not found"))
+        return existing, missing
+
+    def add_batch(self, rows: list):
+        valid, failed = validate_rows(rows, start=self.total)
+        self.total += len(rows)
+        valid, missing = self._filter_existing_goals(valid)
+        failed.extend(missing)
+
+        batch_results = failed
+        if valid:
+            created_at = datetime.utcnow()
+            params = [
+                {
+                    "tenant_id": self.tenant,
+                    "goal_id": item.goal_id,
+                    "amount": item.amount,
+                    "transaction_type": item.transaction_type,
+                    "description": item.description,
+                    "created_at": created_at,
+                }
+                for _, item in valid
+            ]
+            if self.return_ids:
+                # RETURNING с сохранением порядка строк заметно медленнее executemany
+                ids = self.db.scalars(
+                    insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True), params
+                ).all()
+            else:
+                self.db.connection().execute(insert(Transaction.__table__), params)
+                mark_changed(self.db, Transaction.__tablename__)
+                ids = [None] * len(params)
+            for (index, item), transaction_id in zip(valid, ids):
+                self.deltas[item.goal_id] += signed_amount(item.amount, item.transaction_type)
+                self.daily[item.goal_id, created_at.date()][item.transaction_type == "withdrawal"] += item.amount
+                batch_results.append({"index": index, "status": "created", "id": transaction_id, "errors": []})
+            self.inserted += len(ids)
+        self.results.extend(sorted(batch_results, key=lambda result: result["index"]))
+
+    def finish(self) -> dict:
+        failed = self.total - self.inserted
+        if self.atomic and failed:
+            self.savepoint.rollback()
+            for result in self.results:
+                if result["status"] == "created":
+                    result.update(status="skipped", id=None)
+            self.inserted = 0
+        else:
+            if self.savepoint is not None:
+                self.savepoint.commit()
+            for goal_id, delta in self.deltas.items():
+                apply_balance_delta(self.db, goal_id, delta)
+            for (goal_id, day), (deposits, withdrawals) in self.daily.items():
+                apply_daily_delta(self.db, goal_id, day, deposits, withdrawals)
+            if self.inserted:
+                publish_on_commit(
+                    self.db, "transactions.imported", {"created": self.inserted, "goal_ids": sorted(self.deltas)}
+                )
+            self.db.commit()
+        return {
+            "total": self.total,
+            "created": self.inserted,
+            "failed": failed,
+            "results": self.results,
+        }
+
+
+def ingest_transactions(db: Session, rows: list, atomic: bool = False, return_ids: bool = False) -> dict:
+    """Вставляет список транзакций пачками и возвращает результаты по каждой строке"""
+    ingestor = TransactionIngestor(db, atomic=atomic, return_ids=return_ids)
+    for start in range(0, len(rows), BATCH_SIZE):
+        ingestor.add_batch(rows[start:start + BATCH_SIZE])
+    return ingestor.finish()
+
+
+def parse_ndjson_line(line: str):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as exc:
+        return ValueError(f"Invalid JSON: {exc}")
+
+
+def iter_csv_rows(text: TextIO) -> Iterator[dict]:
+    """Строки CSV: первая строка - заголовок с именами колонок.
+
+    Один csv.reader читает весь поток, поэтому поле в кавычках может содержать
+    перевод строки (многострочные описания в банковских выписках).
+    """
+    reader = csv.reader(text)
+    header = [value.strip() for value in next(reader, [])]
+    for values in reader:
+        if not values or (len(values) == 1 and not values[0].strip()):
+            continue
+        row = dict(zip(header, values))
+        yield {
+            field: (row.get(field) or None) if field == "description" else row.get(field)
+            for field in CSV_FIELDS
+        }
+
+
+def iter_ndjson_rows(text: TextIO) -> Iterator:
+    for line in text:
+        if line.strip():
+            yield parse_ndjson_line(line)
+
+
+def ingest_file(
+    db: Session, file: BinaryIO, format: str, atomic: bool = False, return_ids: bool = False
+) -> dict:
+    """Разбирает NDJSON/CSV из прочитанного тела загрузки и вставляет транзакции пачками по BATCH_SIZE строк.
+
+    Файл читается потоком, в памяти держится не больше одной пачки строк.
+    """
+    ingestor = TransactionIngestor(db, atomic=atomic, return_ids=return_ids)
+    # newline="" оставляет переводы строк внутри полей CSV модулю csv
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        rows = iter_csv_rows(text) if format == "csv" else iter_ndjson_rows(text)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                ingestor.add_batch(batch)
+                batch = []
+        if batch:
+            ingestor.add_batch(batch)
+    finally:
+        # Файл закрывает владелец (зависимость эндпоинта)
+        text.detach()
+    return ingestor.finish()
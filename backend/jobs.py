@@ -0,0 +1,440 @@
+"""Фоновые задачи: сверка балансов и обслуживание БД вне пути запроса.
+
+Планировщик работает в процессе приложения: запускается в startup_event и
+останавливается при завершении приложения. Задачи выполняются ограниченным пулом
+потоков (JOB_WORKERS), упавшая задача повторяется до JOB_RETRIES раз с
+экспоненциальной задержкой (кроме ошибок в параметрах и коде задачи, PERMANENT_ERRORS). Периодические задачи ставятся в очередь по расписанию
+JOB_SCHEDULE, любую задачу можно запустить вручную через POST /jobs/{name}.
+Состояние последних JOB_HISTORY_SIZE задач хранится в памяти процесса.
+
+Планировщик запускается в каждом воркере, но периодические задачи ставит в очередь
+только владелец аренды расписания в основной БД (ScheduleLease): VACUUM, сверка и
+архивация не выполняются в нескольких процессах одновременно.
+
+Параметр tenant ограничивает задачу данными арендатора (сессии с арендатором, см. tenants.py),
+а в режиме шардов (TENANT_SHARDS_DIR) еще и выбирает его файл. POST /jobs/{name} всегда
+передает арендатора запроса. Периодические задачи без tenant обслуживают всех арендаторов
+основной БД и ставятся в очередь отдельно для каждого файла шарда.
+"""
+import inspect
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+from sqlalchemy import and_, case, delete, func, or_, select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import WriteSessionLocal, tenant_database
+from models import Goal, GoalDailyBalance, GoalOpeningBalance, SchedulerLease, Transaction
+from shards import shards
+from tenants import DEFAULT_TENANT
+from writes import acquire_write_queue, release_write_queue
+
+logger = logging.getLogger("smart_piggy_bank.jobs")
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_RETRIES = int(os.getenv("JOB_RETRIES", "3"))
+# Задержка перед первым повтором в секундах, дальше она удваивается
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "5"))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "200"))
+# Срок аренды расписания в секундах: за это время другой процесс подхватывает расписание упавшего
+SCHEDULER_LEASE_TTL = float(os.getenv("SCHEDULER_LEASE_TTL", "60"))
+
+# Интервалы периодических задач в секундах, 0 - только ручной запуск
+JOB_SCHEDULE = {
+    "reconcile_balances": float(os.getenv("JOB_RECONCILE_INTERVAL", "3600")),
+    "refresh_statistics": float(os.getenv("JOB_ANALYZE_INTERVAL", "86400")),
+    "compact_rollup": float(os.getenv("JOB_COMPACT_INTERVAL", "86400")),
+    "evict_idempotency_keys": float(os.getenv("JOB_EVICT_INTERVAL", "3600")),
+    "archive_transactions": float(os.getenv("JOB_ARCHIVE_INTERVAL", "0")),
+    "vacuum": float(os.getenv("JOB_VACUUM_INTERVAL", "0")),
+}
+
+# Задачи обслуживания всей БД: вручную их запускает только администратор (admin.py)
+ADMIN_JOBS = ("refresh_statistics", "vacuum")
+
+# Сколько строк читает ANALYZE в SQLite на каждый индекс (0 - все строки)
+SQLITE_ANALYSIS_LIMIT = int(os.getenv("SQLITE_ANALYSIS_LIMIT", "1000"))
+
+FINISHED = ("succeeded", "failed", "cancelled")
+# Ошибки в коде или параметрах задачи: повтор их не исправит, задача сразу завершается с ошибкой
+PERMANENT_ERRORS = (TypeError, ValueError)
+
+
+def tenant_info(tenant: Optional[str]) -> dict:
+    """info сессии задачи: с арендатором запросы ORM видят только его данные"""
+    return {"tenant": tenant} if tenant is not None else {}
+
+
+def reconcile_balances(goal_id: Optional[int] = None, tenant: Optional[str] = None) -> dict:
+    """Сверяет балансы целей с историей одним сгруппированным запросом и пересчитывает расходящиеся"""
+    from routers.goal import recalculate_goal_balance
+
+    history = (
+        select(
+            Transaction.goal_id,
+            func.sum(case((Transaction.transaction_type == "deposit", Transaction.amount), else_=-Transaction.amount)).label("balance"),
+        )
+        .group_by(Transaction.goal_id)
+        .subquery()
+    )
+    calculated = func.coalesce(history.c.balance, 0) + func.coalesce(GoalOpeningBalance.balance, 0)
+    query = (
+        select(Goal.id)
+        .outerjoin(history, history.c.goal_id == Goal.id)
+        .outerjoin(GoalOpeningBalance, GoalOpeningBalance.goal_id == Goal.id)
+        .where(func.coalesce(Goal.current_balance, 0) != calculated)
+    )
+    database = tenant_database(tenant)
+    with database.SessionLocal(info=tenant_info(tenant)) as db:
+        checked = db.execute(select(func.count()).select_from(Goal).where(*([Goal.id == goal_id] if goal_id is not None else []))).scalar()
+        drifted = db.scalars(query.where(Goal.id == goal_id) if goal_id is not None else query).all()
+
+    # Пересчет блокирует цель и перечитывает историю: запись, успевшая после сверки, не теряется
+    for drifted_id in drifted:
+        with database.WriteSessionLocal(info=tenant_info(tenant)) as db:
+            recalculate_goal_balance(db, drifted_id)
+    if drifted:
+        logger.warning("Recalculated drifted balances of goals %s", drifted)
+    return {"checked": checked, "repaired": drifted}
+
+
+def refresh_statistics(tenant: Optional[str] = None) -> dict:
+    """Обновляет статистику индексов для планировщика запросов (ANALYZE)"""
+    with tenant_database(tenant).WriteSessionLocal() as db:
+        if db.get_bind().dialect.name == "sqlite":
+            # Ограничение выборки делает ANALYZE быстрым на больших таблицах
+            db.execute(text(f"PRAGMA analysis_limit={SQLITE_ANALYSIS_LIMIT}"))
+        db.execute(text("ANALYZE"))
+        db.commit()
+    return {"analyzed": True}
+
+
+def compact_rollup(tenant: Optional[str] = None) -> dict:
+    """Удаляет пустые дневные итоги и перестраивает итоги целей, разошедшиеся с балансом.
+
+    Пустые строки (без пополнений и снятий) остаются после удаления или изменения
+    транзакций, баланс на конец дня у них равен предыдущему, поэтому графики не меняются.
+    """
+    from rollup import rebuild_rollup
+
+    database = tenant_database(tenant)
+    with database.WriteSessionLocal(info=tenant_info(tenant)) as db:
+        # Дневные итоги не хранят арендатора: отбор по нему - через цели
+        removed = db.execute(
+            delete(GoalDailyBalance)
+            .where(
+                GoalDailyBalance.deposits == 0,
+                GoalDailyBalance.withdrawals == 0,
+                *([GoalDailyBalance.goal_id.in_(select(Goal.id))] if tenant is not None else []),
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+
+    latest = (
+        select(GoalDailyBalance.goal_id, func.max(GoalDailyBalance.date).label("date"))
+        .group_by(GoalDailyBalance.goal_id)
+        .subquery()
+    )
+    closing = (
+        select(GoalDailyBalance.goal_id, GoalDailyBalance.closing_balance)
+        .join(latest, and_(latest.c.goal_id == GoalDailyBalance.goal_id, latest.c.date == GoalDailyBalance.date))
+        .subquery()
+    )
+    with database.SessionLocal(info=tenant_info(tenant)) as db:
+        drifted = db.scalars(
+            select(Goal.id)
+            .outerjoin(closing, closing.c.goal_id == Goal.id)
+            .where(func.coalesce(closing.c.closing_balance, 0) != func.coalesce(Goal.current_balance, 0))
+        ).all()
+
+    for goal_id in drifted:
+        with database.WriteSessionLocal(info=tenant_info(tenant)) as db:
+            rebuild_rollup(db, goal_id=goal_id)
+    return {"removed": removed, "rebuilt": drifted}
+
+
+def evict_idempotency_keys(tenant: Optional[str] = None) -> dict:
+    from idempotency import evict_expired_keys
+
+    with tenant_database(tenant).WriteSessionLocal(info=tenant_info(tenant)) as db:
+        evicted = evict_expired_keys(db)
+        db.commit()
+    return {"evicted": evicted}
+
+
+def archive_old_transactions(days: Optional[int] = None, tenant: Optional[str] = None) -> dict:
+    from archive import ARCHIVE_HORIZON_DAYS, archive_transactions
+
+    before = datetime.utcnow() - timedelta(days=days if days is not None else ARCHIVE_HORIZON_DAYS)
+    with tenant_database(tenant).WriteSessionLocal(info=tenant_info(tenant)) as db:
+        return {"archived": archive_transactions(db, before)}
+
+
+def vacuum(tenant: Optional[str] = None) -> dict:
+    """Перестраивает файл БД и возвращает свободные страницы (VACUUM).
+
+    VACUUM не выполняется внутри транзакции. В SQLite он переписывает весь файл
+    и на это время блокирует запись, поэтому по умолчанию запускается только вручную.
+    """
+    engine = tenant_database(tenant).engine
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.execute(text("VACUUM ANALYZE"))
+        return {"vacuumed": True}
+
+    acquire_write_queue(engine.url)
+    try:
+        connection = engine.raw_connection()
+        try:
+            # Соединения SQLite работают без неявных транзакций драйвера (isolation_level=None)
+            connection.driver_connection.execute("VACUUM")
+        finally:
+            connection.close()
+    finally:
+        release_write_queue(engine.url)
+    return {"vacuumed": True}
+
+
+JOBS: dict[str, Callable[..., Any]] = {
+    "reconcile_balances": reconcile_balances,
+    "refresh_statistics": refresh_statistics,
+    "compact_rollup": compact_rollup,
+    "evict_idempotency_keys": evict_idempotency_keys,
+    "archive_transactions": archive_old_transactions,
+    "vacuum": vacuum,
+}
+
+
+def database_params() -> list[dict]:
+    """Параметры периодического запуска: основная БД и, в режиме шардов, каждый файл арендатора"""
+    if shards is None:
+        return [{}]
+    return [{}] + [{"tenant": tenant} for tenant in shards.tenants() if tenant != DEFAULT_TENANT]
+
+
+class ScheduleLease:
+    """Аренда расписания: строка scheduler_leases с владельцем и сроком.
+
+    Владелец продлевает аренду на каждом такте планировщика. Другой процесс захватывает
+    ее, когда срок истек (владелец остановлен или упал), или сразу после release().
+    """
+
+    def __init__(self, name: str = "schedule", ttl: float = SCHEDULER_LEASE_TTL):
+        self.name = name
+        self.ttl = ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire(self) -> bool:
+        """Продлевает или захватывает аренду; True - расписание выполняет этот процесс"""
+        now = datetime.utcnow()
+        try:
+            with WriteSessionLocal() as db:
+                if db.get_bind().dialect.name == "postgresql":
+                    from sqlalchemy.dialects.postgresql import insert as dialect_insert
+                else:
+                    from sqlalchemy.dialects.sqlite import insert as dialect_insert
+                statement = dialect_insert(SchedulerLease).values(
+                    name=self.name, owner=self.owner, expires_at=now + timedelta(seconds=self.ttl)
+                )
+                # Выполняется мимо ORM: служебная запись не меняет версии таблиц
+                db.connection().execute(statement.on_conflict_do_update(
+                    index_elements=[SchedulerLease.name],
+                    set_={"owner": statement.excluded.owner, "expires_at": statement.excluded.expires_at},
+                    where=or_(SchedulerLease.owner == self.owner, SchedulerLease.expires_at < now),
+                ))
+                owner = db.connection().execute(
+                    select(SchedulerLease.owner).where(SchedulerLease.name == self.name)
+                ).scalar()
+                db.commit()
+        except (SQLAlchemyError, TimeoutError) as error:
+            logger.warning("Schedule lease check failed: %s", error)
+            return False
+        return owner == self.owner
+
+    def release(self):
+        try:
+            with WriteSessionLocal() as db:
+                db.connection().execute(
+                    delete(SchedulerLease).where(SchedulerLease.name == self.name, SchedulerLease.owner == self.owner)
+                )
+                db.commit()
+        except (SQLAlchemyError, TimeoutError) as error:
+            logger.warning("Schedule lease release failed: %s", error)
+
+
+class SchedulerUnavailable(Exception):
+    """Планировщик не запущен или очередь задач заполнена"""
+
+
+@dataclass
+class Job:
+    name: str
+    params: dict
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"  # queued, running, retrying, succeeded, failed, cancelled
+    attempts: int = 0
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class JobScheduler:
+    """Очередь фоновых задач с ограниченным пулом потоков, повторами и расписанием"""
+
+    def __init__(
+        self,
+        jobs: dict[str, Callable[..., Any]],
+        workers: int = JOB_WORKERS,
+        retries: int = JOB_RETRIES,
+        retry_delay: float = JOB_RETRY_DELAY,
+        queue_size: int = JOB_QUEUE_SIZE,
+        history_size: int = JOB_HISTORY_SIZE,
+        schedule_params: Callable[[], list[dict]] = lambda: [{}],
+        lease: Optional[ScheduleLease] = None,
+    ):
+        self.jobs = jobs
+        self.lease = lease
+        self.schedule_params = schedule_params
+        self.workers = workers
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.queue_size = queue_size
+        self.history_size = history_size
+        self._history: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._ticker: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._executor is not None and not self._stopping.is_set()
+
+    def start(self, schedule: Optional[dict[str, float]] = None):
+        """Запускает пул потоков и, если задано расписание, поток периодических задач"""
+        if self._executor is not None:
+            return
+        self._stopping.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        periodic = {name: interval for name, interval in (schedule or {}).items() if interval > 0}
+        if periodic:
+            self._ticker = threading.Thread(target=self._tick, args=(periodic,), name="job-scheduler", daemon=True)
+            self._ticker.start()
+
+    def shutdown(self, wait: bool = True):
+        """Останавливает расписание, отменяет задачи в очереди и дожидается выполняемых.
+
+        Задача, ожидающая повтора, прерывает ожидание и завершается с ошибкой.
+        """
+        if self._executor is None:
+            return
+        self._stopping.set()
+        if self._ticker is not None:
+            self._ticker.join()
+            self._ticker = None
+            # Расписание сразу переходит к другому процессу, не дожидаясь конца срока аренды
+            if self.lease is not None:
+                self.lease.release()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._executor = None
+        with self._lock:
+            for job in self._history.values():
+                if job.status == "queued":
+                    job.status, job.finished_at = "cancelled", datetime.utcnow()
+
+    def submit(self, name: str, **params) -> Job:
+        """Ставит задачу в очередь. Такая же задача, еще ожидающая в очереди, не дублируется.
+
+        Параметры проверяются по сигнатуре функции задачи до постановки в очередь:
+        неизвестный или недостающий параметр дает TypeError сразу, а не после всех повторов.
+        """
+        if name not in self.jobs:
+            raise KeyError(name)
+        inspect.signature(self.jobs[name]).bind(**params)
+        with self._lock:
+            if not self.running:
+                raise SchedulerUnavailable("Job scheduler is not running")
+            pending = [job for job in self._history.values() if job.status not in FINISHED]
+            for job in pending:
+                if job.status == "queued" and job.name == name and job.params == params:
+                    return job
+            if len(pending) >= self.queue_size:
+                raise SchedulerUnavailable("Job queue is full")
+
+            job = Job(name, params)
+            self._history[job.id] = job
+            self._trim_history()
+            self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._history.get(job_id)
+
+    def list(self, tenant: Optional[str] = None) -> list[Job]:
+        """Последние задачи, новые первыми; с tenant - только задачи этого арендатора"""
+        with self._lock:
+            return [job for job in reversed(self._history.values()) if tenant is None or job.params.get("tenant") == tenant]
+
+    def _trim_history(self):
+        # Из истории вытесняются самые старые завершенные задачи
+        excess = len(self._history) - self.history_size
+        for job_id in [job_id for job_id, job in self._history.items() if job.status in FINISHED][:max(excess, 0)]:
+            del self._history[job_id]
+
+    def _run(self, job: Job):
+        job.started_at = datetime.utcnow()
+        while True:
+            job.status = "running"
+            job.attempts += 1
+            try:
+                job.result = self.jobs[job.name](**job.params)
+                job.status, job.error = "succeeded", None
+                break
+            except Exception as error:
+                job.error = f"{type(error).__name__}: {error}"
+                if isinstance(error, PERMANENT_ERRORS) or job.attempts > self.retries or self._stopping.is_set():
+                    logger.exception("Job %s (%s) failed after %d attempts", job.name, job.id, job.attempts)
+                    job.status = "failed"
+                    break
+                logger.warning("Job %s (%s) failed, retrying: %s", job.name, job.id, job.error)
+                job.status = "retrying"
+                if self._stopping.wait(self.retry_delay * 2 ** (job.attempts - 1)):
+                    job.status = "failed"
+                    break
+        job.finished_at = datetime.utcnow()
+
+    def _tick(self, schedule: dict[str, float]):
+        due = {name: time.monotonic() + interval for name, interval in schedule.items()}
+        # Аренда продлевается несколько раз за срок, даже если задачи еще не подошли
+        renew = self.lease.ttl / 3 if self.lease is not None else float("inf")
+        while not self._stopping.wait(max(0.0, min(min(due.values()) - time.monotonic(), renew))):
+            leader = self.lease is None or self.lease.acquire()
+            now = time.monotonic()
+            for name, interval in schedule.items():
+                if due[name] <= now:
+                    due[name] = now + interval
+                    if not leader:
+                        continue
+                    for params in self.schedule_params():
+                        try:
+                            self.submit(name, **params)
+                        except SchedulerUnavailable as error:
+                            logger.warning("Scheduled job %s %s skipped: %s", name, params, error)
+
+
+scheduler = JobScheduler(JOBS, schedule_params=database_params, lease=ScheduleLease())
@@ -1,48 +1,112 @@
-from fastapi import FastAPI, Depends
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base, get_db
-from models import Settings
-from routers import goal, transaction, settings
-from sqlalchemy.orm import Session
-
-# Создаем таблицы в БД
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="Smart Piggy Bank API", version="1.0.0")
-
-# Убедимся, что запись настроек по умолчанию существует
-def create_default_settings(db: Session):
-    existing_settings = db.query(Settings).first()
-    if not existing_settings:
-        default_settings = Settings(theme="light", currency="RUB", language="ru")
-        db.add(default_settings)
-        db.commit()
-        db.refresh(default_settings)
-
-@app.on_event("startup")
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from admin import require_admin
+from database import engine
+# Роутеры импортируются сразу: /batch ищет обработчики в app.routes, OpenAPI описывает все маршруты
+from routers import batch, goal, jobs, search, transaction, settings
+from cache import cache_stats
+from events import event_stream
+from jobs import JOB_SCHEDULE, SCHEDULER_ENABLED, scheduler
+from metrics import MetricsMiddleware, render_metrics
+from migrate import check_schema, run_migrations
+from serialization import APIJSONResponse
+from tenants import current_tenant
+import os
+
+# Минимальный размер ответа в байтах, начиная с которого он сжимается
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1000"))
+
+# Применять миграции при старте (удобно для одиночного процесса при разработке).
+# По умолчанию схема обновляется командой `python migrate.py` до запуска воркеров
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+
 def startup_event():
-    # Создаем таблицы и добавляем настройки по умолчанию при запуске
-    Base.metadata.create_all(bind=engine)
-    db = next(get_db())
+    # Только проверка версии схемы одним запросом: таблицы и запись настроек
+    # по умолчанию создаются миграциями, а не при каждом запуске
+    if MIGRATE_ON_STARTUP:
+        run_migrations(engine)
+    else:
+        check_schema(engine)
+    # Фоновые задачи: сверка балансов и обслуживание БД по расписанию JOB_SCHEDULE
+    if SCHEDULER_ENABLED:
+        scheduler.start(JOB_SCHEDULE)
+
+
+def shutdown_event():
+    # Задачи в очереди отменяются, выполняемые завершаются до остановки процесса
+    scheduler.shutdown()
+
+
+def get_cache_stats():
+    # Счетчики попаданий и промахов кэша для проверки под нагрузкой
+    return cache_stats()
+
+
+def get_metrics():
+    # Текстовый формат Prometheus: задержки, размеры ответов, запросы к БД и состояние пула
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+async def stream_events(request: Request, tenant: str = Depends(current_tenant)):
+    # Server-Sent Events: изменения балансов, целей и транзакций арендатора публикуются после фиксации.
+    # Content-Encoding: identity исключает поток из сжатия, которое буферизует события
+    return StreamingResponse(
+        event_stream(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "Content-Encoding": "identity", "X-Accel-Buffering": "no"},
+    )
+
+
+def create_app() -> FastAPI:
+    """Собирает приложение: middleware, роутеры и служебные эндпоинты"""
+    # Ответы сериализуются через orjson вместо стандартного json
+    app = FastAPI(title="Smart Piggy Bank API", version="1.0.0", default_response_class=APIJSONResponse)
+    app.add_event_handler("startup", startup_event)
+    app.add_event_handler("shutdown", shutdown_event)
+
+    # Сжатие ответов: brotli, если установлен пакет brotli-asgi, иначе gzip
     try:
-        create_default_settings(db)
-    finally:
-        db.close()
-
-# Настройка CORS для разработки
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # В продакшене нужно указать конкретные домены
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Подключаем роутеры
-app.include_router(goal.router, prefix="/goals", tags=["goals"])
-app.include_router(transaction.router, prefix="/transactions", tags=["transactions"])
-app.include_router(settings.router, prefix="/settings", tags=["settings"])
+        from brotli_asgi import BrotliMiddleware
+        app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MIN_SIZE, gzip_fallback=True)
+    except ImportError:
+        app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+    # Настройка CORS для разработки
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # В продакшене нужно указать конкретные домены
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "Idempotent-Replayed"],
+    )
+
+    # Метрики запросов: внешний слой, чтобы учитывать время и размер ответа после сжатия
+    app.add_middleware(MetricsMiddleware)
+
+    # Подключаем роутеры
+    app.include_router(goal.router, prefix="/goals", tags=["goals"])
+    app.include_router(transaction.router, prefix="/transactions", tags=["transactions"])
+    app.include_router(settings.router, prefix="/settings", tags=["settings"])
+    app.include_router(batch.router, prefix="/batch", tags=["batch"])
+    app.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+    app.include_router(search.router, prefix="/search", tags=["search"])
+
+    # Служебные эндпоинты описывают всю установку, а не арендатора: только с токеном администратора
+    admin_only = [Depends(require_admin)]
+    app.add_api_route("/cache/stats", get_cache_stats, methods=["GET"], tags=["cache"], dependencies=admin_only)
+    app.add_api_route(
+        "/metrics", get_metrics, methods=["GET"], tags=["metrics"], response_class=PlainTextResponse, dependencies=admin_only
+    )
+    app.add_api_route("/events", stream_events, methods=["GET"], tags=["events"])
+    return app
+
+
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,221 @@
+import bisect
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+# Заголовок Server-Timing с временем SQL и числом запросов к БД (включается явно)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+
+# Границы корзин гистограмм
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # секунды
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)  # байты
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)  # запросов к БД на HTTP-запрос
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Метрика с набором меток, значения по наборам меток хранятся в словаре"""
+
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        with self.lock:
+            values = sorted(self.values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}" for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels):
+        with self.lock:
+            counts, total = self.values.get(labels, (None, 0))
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.values[labels] = (counts, total + value)
+
+    def render(self) -> list[str]:
+        with self.lock:
+            values = sorted((labels, (counts[:], total)) for labels, (counts, total) in self.values.items())
+        lines = self.header()
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+http_requests = Counter("http_requests_total", "HTTP requests", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+http_response_size = Histogram("http_response_size_bytes", "HTTP response body size", ("method", "route"), SIZE_BUCKETS)
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests being processed")
+http_queries = Histogram("http_request_db_queries", "Database queries per HTTP request", ("method", "route"), COUNT_BUCKETS)
+db_queries = Counter("db_queries_total", "Executed SQL statements")
+db_query_duration = Histogram("db_query_duration_seconds", "SQL statement execution time")
+db_slow_queries = Counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS")
+db_pool_wait = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection")
+
+METRICS = [
+    http_requests, http_latency, http_response_size, http_in_flight, http_queries,
+    db_queries, db_query_duration, db_slow_queries, db_pool_wait,
+]
+
+# Пулы соединений, состояние которых выводится на /metrics
+pools = {}
+
+
+class RequestStats:
+    """Счетчики запросов к БД в рамках одного HTTP-запроса"""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.pool_wait = 0.0
+
+
+# Счетчики текущего HTTP-запроса; контекст наследуется потоками пула и async-сессиями
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def record_query(duration: float):
+    db_queries.inc()
+    db_query_duration.observe(duration)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.sql_time += duration
+
+
+def record_slow_query():
+    db_slow_queries.inc()
+
+
+def record_pool_wait(duration: float):
+    db_pool_wait.observe(duration)
+    stats = current_request.get()
+    if stats is not None:
+        stats.pool_wait += duration
+
+
+def render_pools() -> list[str]:
+    lines = []
+    for metric, help, getter in (
+        ("db_pool_size", "Configured pool size", "size"),
+        ("db_pool_checked_out", "Connections currently checked out", "checkedout"),
+        ("db_pool_overflow", "Connections opened above pool size", "overflow"),
+    ):
+        values = [(name, getattr(pool, getter)()) for name, pool in pools.items() if hasattr(pool, getter)]
+        if values:
+            lines += [f"# HELP {metric} {help}", f"# TYPE {metric} gauge"]
+            lines += [f'{metric}{{pool="{name}"}} {value}' for name, value in values]
+    return lines
+
+
+def render_metrics() -> str:
+    """Все метрики в текстовом формате Prometheus"""
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    lines += render_pools()
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(stats: RequestStats, total: float) -> str:
+    return (
+        f'db;dur={stats.sql_time * 1000:.2f};desc="{stats.queries} queries", '
+        f"pool;dur={stats.pool_wait * 1000:.2f}, app;dur={total * 1000:.2f}"
+    )
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: задержка, размер ответа и число запросов к БД по маршрутам.
+
+    Реализовано без BaseHTTPMiddleware, чтобы не буферизовать потоковые ответы.
+    """
+
+    def __init__(self, app, server_timing: Optional[bool] = None):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status, size = 500, 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING if self.server_timing is None else self.server_timing:
+                    timing = server_timing(stats, time.perf_counter() - started).encode()
+                    message["headers"] = [*message.get("headers", []), (b"server-timing", timing)]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            http_in_flight.dec()
+            current_request.reset(token)
+            # Шаблон пути маршрута, а не фактический путь: иначе число серий не ограничено
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests.inc(method, route, str(status))
+            http_latency.observe(time.perf_counter() - started, method, route)
+            http_response_size.observe(size, method, route)
+            http_queries.observe(stats.queries, method, route)
@@ -0,0 +1,120 @@
+"""Применение версионных миграций схемы (каталог migrations).
+
+Примененные версии записываются в таблицу schema_version. Каждая миграция
+выполняется в отдельной транзакции вместе с записью своей версии, поэтому
+прерванный запуск можно просто повторить. Одновременный запуск из нескольких
+процессов безопасен: в SQLite миграция идет под BEGIN IMMEDIATE, в PostgreSQL -
+под транзакционной advisory-блокировкой, а уже примененные версии пропускаются.
+
+Приложение при старте только сверяет версию схемы (check_schema) и не меняет ее.
+
+Запуск из каталога backend:
+    python migrate.py          # применить недостающие миграции
+    python migrate.py status   # текущая и последняя версии
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, insert, select
+
+import migrations
+
+# Ключ advisory-блокировки PostgreSQL для миграций
+ADVISORY_LOCK_KEY = 7_312_001
+
+schema_version = Table(
+    "schema_version", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def current_version(connection) -> int:
+    """Последняя примененная версия схемы, 0 для пустой базы"""
+    if not inspect(connection).has_table(schema_version.name):
+        return 0
+    return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def apply_migration(connection, version: int, name: str, module) -> bool:
+    """Применяет миграцию, если ее еще никто не применил; вызывается внутри транзакции"""
+    schema_version.create(connection, checkfirst=True)
+    if current_version(connection) >= version:
+        return False
+    module.upgrade(connection)
+    connection.execute(insert(schema_version).values(version=version, name=name, applied_at=datetime.utcnow()))
+    return True
+
+
+def run_sqlite_migration(engine, version: int, name: str, module) -> bool:
+    with engine.connect() as connection:
+        # pysqlite не включает DDL в транзакцию сам, поэтому транзакция открывается явно;
+        # BEGIN IMMEDIATE заодно не дает другому процессу мигрировать одновременно.
+        # Внешние ключи отключаются на время перестройки таблиц, legacy_alter_table не дает
+        # RENAME переписать ссылки из других таблиц на временное имя
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        connection.exec_driver_sql("PRAGMA legacy_alter_table=ON")
+        try:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                applied = apply_migration(connection, version, name, module)
+                problems = connection.exec_driver_sql("PRAGMA foreign_key_check").all()
+                if problems:
+                    raise RuntimeError(f"Foreign key check failed after {name}: {problems}")
+            except Exception:
+                connection.exec_driver_sql("ROLLBACK")
+                raise
+            connection.exec_driver_sql("COMMIT")
+            return applied
+        finally:
+            connection.exec_driver_sql("PRAGMA legacy_alter_table=OFF")
+            connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+
+def run_postgresql_migration(engine, version: int, name: str, module) -> bool:
+    with engine.begin() as connection:
+        connection.execute(select(func.pg_advisory_xact_lock(ADVISORY_LOCK_KEY)))
+        return apply_migration(connection, version, name, module)
+
+
+def run_migrations(engine) -> list[str]:
+    """Применяет недостающие миграции по порядку и возвращает имена примененных"""
+    with engine.connect() as connection:
+        version = current_version(connection)
+    runner = run_postgresql_migration if engine.dialect.name == "postgresql" else run_sqlite_migration
+    applied = []
+    for migration_version, name, module in migrations.discover():
+        if migration_version > version and runner(engine, migration_version, name, module):
+            applied.append(name)
+    return applied
+
+
+def check_schema(engine):
+    """Проверка при старте приложения: один запрос версии, без изменения схемы"""
+    with engine.connect() as connection:
+        version = current_version(connection)
+    latest = migrations.latest_version()
+    if version < latest:
+        raise RuntimeError(
+            f"Database schema is at version {version}, expected {latest}. Run `python migrate.py` first."
+        )
+
+
+def main():
+    from database import engine
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    if command == "status":
+        with engine.connect() as connection:
+            print(f"Schema version: {current_version(connection)}, latest: {migrations.latest_version()}")
+    elif command == "upgrade":
+        applied = run_migrations(engine)
+        print(f"Applied: {', '.join(applied)}" if applied else "Schema is up to date")
+    else:
+        raise SystemExit(f"Unknown command '{command}'. Use: upgrade, status")
+
+
+if __name__ == "__main__":
+    main()
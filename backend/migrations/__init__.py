@@ -0,0 +1,35 @@
+"""Версионные миграции схемы БД.
+
+Каждая миграция - модуль vNNNN_<название>.py с функцией upgrade(connection).
+Номер версии берется из имени модуля, миграции применяются по возрастанию
+номера командой `python migrate.py`.
+"""
+import importlib
+import pkgutil
+import re
+
+MODULE_PATTERN = re.compile(r"^v(\d{4})_\w+$")
+
+
+def discover() -> list[tuple[int, str, object]]:
+    """Список миграций (версия, имя модуля, модуль), отсортированный по версии"""
+    migrations = []
+    for module in pkgutil.iter_modules(__path__):
+        match = MODULE_PATTERN.match(module.name)
+        if match:
+            migrations.append((int(match.group(1)), module.name, importlib.import_module(f"{__name__}.{module.name}")))
+    migrations.sort(key=lambda migration: migration[0])
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return migrations
+
+
+def latest_version() -> int:
+    """Последняя версия схемы по именам модулей, без их импорта"""
+    versions = [
+        int(match.group(1))
+        for match in (MODULE_PATTERN.match(module.name) for module in pkgutil.iter_modules(__path__))
+        if match
+    ]
+    return max(versions, default=0)
@@ -0,0 +1,67 @@
+"""Начальная схема: цели, транзакции, дневные итоги, настройки и версии таблиц.
+
+Схема описана отдельно от моделей, чтобы миграция не менялась вместе с ними.
+Таблицы и индексы создаются с checkfirst: в базах, созданных раньше через
+create_all, добавляются только недостающие объекты.
+"""
+from sqlalchemy import BigInteger, Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, MetaData, String, Table
+
+metadata = MetaData()
+
+goals = Table(
+    "goals", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String, nullable=False, index=True),
+    Column("target_amount", BigInteger, nullable=False),
+    Column("current_balance", BigInteger),
+    Column("target_date", DateTime),
+    Column("description", String),
+    Column("image_url", String),
+    Column("is_active", Boolean),
+    Column("created_at", DateTime),
+)
+
+transactions = Table(
+    "transactions", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("goal_id", Integer, ForeignKey("goals.id"), nullable=False),
+    Column("amount", BigInteger, nullable=False),
+    Column("transaction_type", String, nullable=False),
+    Column("description", String),
+    Column("created_at", DateTime),
+    Index("ix_transactions_created_at_id", "created_at", "id"),
+    Index("ix_transactions_goal_id_created_at_id", "goal_id", "created_at", "id"),
+    Index("ix_transactions_type_created_at_id", "transaction_type", "created_at", "id"),
+)
+
+goal_daily_balance = Table(
+    "goal_daily_balance", metadata,
+    Column("goal_id", Integer, ForeignKey("goals.id"), primary_key=True),
+    Column("date", Date, primary_key=True),
+    Column("deposits", BigInteger, nullable=False),
+    Column("withdrawals", BigInteger, nullable=False),
+    Column("closing_balance", BigInteger, nullable=False),
+)
+
+settings = Table(
+    "settings", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("theme", String),
+    Column("currency", String),
+    Column("language", String),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+table_versions = Table(
+    "table_versions", metadata,
+    Column("name", String, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+
+def upgrade(connection):
+    for table in metadata.sorted_tables:
+        table.create(connection, checkfirst=True)
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
@@ -0,0 +1,66 @@
+"""Перевод денежных колонок из Float в целые копейки.
+
+SQLite не умеет менять тип колонки, поэтому таблицы перестраиваются:
+старая таблица переименовывается, создается новая по схеме v0001,
+данные копируются с переводом сумм в копейки, старая таблица удаляется.
+В PostgreSQL тип меняется через ALTER COLUMN ... USING.
+В новых базах колонки уже целые, и миграция ничего не делает.
+"""
+from sqlalchemy import inspect, text
+
+from migrations.v0001_initial import metadata
+
+# Денежные колонки по таблицам
+MONEY_COLUMNS = {
+    "goals": ("target_amount", "current_balance"),
+    "transactions": ("amount",),
+    "goal_daily_balance": ("deposits", "withdrawals", "closing_balance"),
+}
+
+
+def float_money_tables(connection) -> list[str]:
+    """Таблицы, в которых денежные колонки еще хранятся как числа с плавающей точкой"""
+    inspector = inspect(connection)
+    existing = set(inspector.get_table_names())
+    tables = []
+    for table, columns in MONEY_COLUMNS.items():
+        if table not in existing:
+            continue
+        types = {column["name"]: str(column["type"]).upper() for column in inspector.get_columns(table)}
+        if any("INT" not in types.get(column, "INT") for column in columns):
+            tables.append(table)
+    return tables
+
+
+def to_minor_sql(column: str) -> str:
+    return f"CAST(ROUND({column} * 100) AS INTEGER)"
+
+
+def rebuild_sqlite_table(connection, name: str):
+    table = metadata.tables[name]
+    old_name = f"{name}_float"
+    connection.execute(text(f'ALTER TABLE "{name}" RENAME TO "{old_name}"'))
+    # Индексы переименованной таблицы сохраняют имена и мешают создать новые
+    for index in connection.execute(text(f'PRAGMA index_list("{old_name}")')).mappings().all():
+        if not index["name"].startswith("sqlite_autoindex"):
+            connection.execute(text(f'DROP INDEX "{index["name"]}"'))
+    table.create(connection)
+
+    old_columns = {row["name"] for row in connection.execute(text(f'PRAGMA table_info("{old_name}")')).mappings()}
+    columns = [column.name for column in table.columns if column.name in old_columns]
+    values = [to_minor_sql(f'"{column}"') if column in MONEY_COLUMNS[name] else f'"{column}"' for column in columns]
+    quoted = ", ".join(f'"{column}"' for column in columns)
+    connection.execute(text(f'INSERT INTO "{name}" ({quoted}) SELECT {", ".join(values)} FROM "{old_name}"'))
+    connection.execute(text(f'DROP TABLE "{old_name}"'))
+
+
+def upgrade(connection):
+    tables = float_money_tables(connection)
+    for name in tables:
+        if connection.dialect.name == "postgresql":
+            for column in MONEY_COLUMNS[name]:
+                connection.execute(text(
+                    f'ALTER TABLE "{name}" ALTER COLUMN "{column}" TYPE BIGINT USING ROUND("{column}" * 100)::BIGINT'
+                ))
+        else:
+            rebuild_sqlite_table(connection, name)
@@ -0,0 +1,17 @@
+"""Запись настроек по умолчанию.
+
+Раньше запись проверялась и создавалась при каждом запуске приложения,
+теперь она создается один раз при миграции.
+"""
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+
+from migrations.v0001_initial import settings
+
+
+def upgrade(connection):
+    if connection.execute(select(func.count()).select_from(settings)).scalar():
+        return
+    now = datetime.utcnow()
+    connection.execute(insert(settings).values(theme="light", currency="RUB", language="ru", created_at=now, updated_at=now))
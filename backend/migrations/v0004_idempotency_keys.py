@@ -0,0 +1,23 @@
+"""Таблица сохраненных ответов запросов записи с заголовком Idempotency-Key.
+
+Индекс по expires_at нужен для удаления просроченных записей без полного просмотра таблицы.
+"""
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text
+
+metadata = MetaData()
+
+idempotency_keys = Table(
+    "idempotency_keys", metadata,
+    Column("key", String, primary_key=True),
+    Column("fingerprint", String, nullable=False),
+    Column("status_code", Integer, nullable=False),
+    Column("response_body", Text, nullable=False),
+    Column("created_at", DateTime),
+    Column("expires_at", DateTime, nullable=False, index=True),
+)
+
+
+def upgrade(connection):
+    idempotency_keys.create(connection, checkfirst=True)
+    for index in idempotency_keys.indexes:
+        index.create(connection, checkfirst=True)
@@ -0,0 +1,69 @@
+"""ON DELETE CASCADE для транзакций и дневных итогов цели.
+
+Удаление цели удаляет ее историю на стороне БД одним оператором, без загрузки
+дочерних строк в память. Строки, оставшиеся без цели (в SQLite внешние ключи
+раньше не проверялись), удаляются. В SQLite внешний ключ нельзя изменить через
+ALTER TABLE, поэтому таблицы перестраиваются с переносом данных.
+"""
+from sqlalchemy import BigInteger, Column, Date, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, inspect, text
+
+from migrations.v0001_initial import goals as initial_goals
+
+metadata = MetaData()
+
+goals = initial_goals.to_metadata(metadata)
+
+transactions = Table(
+    "transactions", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("goal_id", Integer, ForeignKey("goals.id", ondelete="CASCADE"), nullable=False),
+    Column("amount", BigInteger, nullable=False),
+    Column("transaction_type", String, nullable=False),
+    Column("description", String),
+    Column("created_at", DateTime),
+    Index("ix_transactions_created_at_id", "created_at", "id"),
+    Index("ix_transactions_goal_id_created_at_id", "goal_id", "created_at", "id"),
+    Index("ix_transactions_type_created_at_id", "transaction_type", "created_at", "id"),
+)
+
+goal_daily_balance = Table(
+    "goal_daily_balance", metadata,
+    Column("goal_id", Integer, ForeignKey("goals.id", ondelete="CASCADE"), primary_key=True),
+    Column("date", Date, primary_key=True),
+    Column("deposits", BigInteger, nullable=False),
+    Column("withdrawals", BigInteger, nullable=False),
+    Column("closing_balance", BigInteger, nullable=False),
+)
+
+
+def goal_foreign_key(connection, name: str) -> dict:
+    return next(key for key in inspect(connection).get_foreign_keys(name) if key["referred_table"] == "goals")
+
+
+def rebuild_sqlite_table(connection, table: Table):
+    old_name = f"{table.name}_old"
+    connection.execute(text(f'ALTER TABLE "{table.name}" RENAME TO "{old_name}"'))
+    # Индексы переименованной таблицы сохраняют имена и мешают создать новые
+    for index in connection.execute(text(f'PRAGMA index_list("{old_name}")')).mappings().all():
+        if not index["name"].startswith("sqlite_autoindex"):
+            connection.execute(text(f'DROP INDEX "{index["name"]}"'))
+    table.create(connection)
+
+    quoted = ", ".join(f'"{column.name}"' for column in table.columns)
+    connection.execute(text(f'INSERT INTO "{table.name}" ({quoted}) SELECT {quoted} FROM "{old_name}"'))
+    connection.execute(text(f'DROP TABLE "{old_name}"'))
+
+
+def upgrade(connection):
+    for table in (transactions, goal_daily_balance):
+        connection.execute(text(f'DELETE FROM "{table.name}" WHERE goal_id NOT IN (SELECT id FROM goals)'))
+        foreign_key = goal_foreign_key(connection, table.name)
+        if (foreign_key.get("options") or {}).get("ondelete", "").upper() == "CASCADE":
+            continue
+        if connection.dialect.name == "postgresql":
+            connection.execute(text(
+                f'ALTER TABLE "{table.name}" DROP CONSTRAINT "{foreign_key["name"]}", '
+                f'ADD CONSTRAINT "{foreign_key["name"]}" FOREIGN KEY (goal_id) REFERENCES goals (id) ON DELETE CASCADE'
+            ))
+        else:
+            rebuild_sqlite_table(connection, table)
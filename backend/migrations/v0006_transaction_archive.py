@@ -0,0 +1,46 @@
+"""Архив старых транзакций и снимки начального баланса целей.
+
+transactions_archive повторяет структуру transactions и хранит строки старше
+горизонта архивации. goal_opening_balances - итоги архивной части истории цели
+(баланс, суммы и число пополнений и снятий), чтобы пересчет баланса и статистика
+не читали архив.
+"""
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table
+
+from migrations.v0001_initial import goals as initial_goals
+
+metadata = MetaData()
+
+goals = initial_goals.to_metadata(metadata)
+
+transactions_archive = Table(
+    "transactions_archive", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("goal_id", Integer, ForeignKey("goals.id", ondelete="CASCADE"), nullable=False),
+    Column("amount", BigInteger, nullable=False),
+    Column("transaction_type", String, nullable=False),
+    Column("description", String),
+    Column("created_at", DateTime),
+    Index("ix_transactions_archive_created_at_id", "created_at", "id"),
+    Index("ix_transactions_archive_goal_id_created_at_id", "goal_id", "created_at", "id"),
+)
+
+goal_opening_balances = Table(
+    "goal_opening_balances", metadata,
+    Column("goal_id", Integer, ForeignKey("goals.id", ondelete="CASCADE"), primary_key=True),
+    Column("archived_before", DateTime, nullable=False),
+    Column("balance", BigInteger, nullable=False),
+    Column("deposits", BigInteger, nullable=False),
+    Column("withdrawals", BigInteger, nullable=False),
+    Column("deposit_count", Integer, nullable=False),
+    Column("withdrawal_count", Integer, nullable=False),
+    Column("first_transaction_at", DateTime),
+    Column("last_transaction_at", DateTime),
+)
+
+
+def upgrade(connection):
+    for table in (transactions_archive, goal_opening_balances):
+        table.create(connection, checkfirst=True)
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
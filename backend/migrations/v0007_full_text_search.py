@@ -0,0 +1,81 @@
+"""Полнотекстовый поиск по целям и описаниям транзакций.
+
+SQLite: виртуальные таблицы FTS5 goals_search и transactions_search хранят основы
+слов (функция ru_stem из stemmer.py) с rowid, равным id строки. Индекс поддерживается
+триггерами на goals, transactions и transactions_archive, поэтому в синхронизации
+участвуют все пути записи, включая пакетную загрузку, каскадное удаление и архивацию.
+При архивации строка индекса остается: транзакция лишь переходит в архив.
+Триггеры вызывают ru_stem, поэтому писать в эти таблицы нужно через движок из
+database.create_app_engine (другие клиенты SQLite получают "no such function: ru_stem";
+v0010_search_queue заменяет вызов очередью индексации). Миграции, перестраивающие
+таблицы, должны заново создать триггеры.
+
+PostgreSQL: GIN-индексы по to_tsvector('russian', ...), выражения совпадают с
+запросами search.py. Синхронизацию выполняет сама БД.
+"""
+from sqlalchemy import text
+
+from stemmer import stem_text
+
+SQLITE_STATEMENTS = [
+    # prefix='2 3 4 5 6': поиск по началу слова до шести символов читает готовый список документов
+    """CREATE VIRTUAL TABLE goals_search USING fts5(
+        title, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6'
+    )""",
+    # Цель индексируется токеном g<id>: отбор по цели пересекает списки документов индекса,
+    # а не читает строки. Тип проверяется по сохраненному значению
+    """CREATE VIRTUAL TABLE transactions_search USING fts5(
+        description, goal, transaction_type UNINDEXED,
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6'
+    )""",
+    """CREATE TRIGGER goals_search_insert AFTER INSERT ON goals BEGIN
+        INSERT INTO goals_search(rowid, title, description) VALUES (new.id, ru_stem(new.title), ru_stem(new.description));
+    END""",
+    """CREATE TRIGGER goals_search_update AFTER UPDATE OF title, description ON goals BEGIN
+        INSERT OR REPLACE INTO goals_search(rowid, title, description) VALUES (new.id, ru_stem(new.title), ru_stem(new.description));
+    END""",
+    """CREATE TRIGGER goals_search_delete AFTER DELETE ON goals BEGIN
+        DELETE FROM goals_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER transactions_search_insert AFTER INSERT ON transactions BEGIN
+        INSERT OR REPLACE INTO transactions_search(rowid, description, goal, transaction_type)
+        VALUES (new.id, ru_stem(new.description), 'g' || new.goal_id, new.transaction_type);
+    END""",
+    """CREATE TRIGGER transactions_search_update AFTER UPDATE OF description, goal_id, transaction_type ON transactions BEGIN
+        INSERT OR REPLACE INTO transactions_search(rowid, description, goal, transaction_type)
+        VALUES (new.id, ru_stem(new.description), 'g' || new.goal_id, new.transaction_type);
+    END""",
+    # Архивация сначала копирует строку в архив, затем удаляет ее: такая строка остается в индексе
+    """CREATE TRIGGER transactions_search_delete AFTER DELETE ON transactions
+    WHEN NOT EXISTS (SELECT 1 FROM transactions_archive WHERE id = old.id) BEGIN
+        DELETE FROM transactions_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER transactions_archive_search_delete AFTER DELETE ON transactions_archive BEGIN
+        DELETE FROM transactions_search WHERE rowid = old.id;
+    END""",
+    "INSERT INTO goals_search(rowid, title, description) SELECT id, ru_stem(title), ru_stem(description) FROM goals",
+    """INSERT INTO transactions_search(rowid, description, goal, transaction_type)
+    SELECT id, ru_stem(description), 'g' || goal_id, transaction_type FROM transactions
+    UNION ALL
+    SELECT id, ru_stem(description), 'g' || goal_id, transaction_type FROM transactions_archive""",
+]
+
+POSTGRESQL_STATEMENTS = [
+    """CREATE INDEX IF NOT EXISTS ix_goals_search ON goals
+    USING gin (to_tsvector('russian', coalesce(title, '') || ' ' || coalesce(description, '')))""",
+    """CREATE INDEX IF NOT EXISTS ix_transactions_search ON transactions
+    USING gin (to_tsvector('russian', coalesce(description, '')))""",
+    """CREATE INDEX IF NOT EXISTS ix_transactions_archive_search ON transactions_archive
+    USING gin (to_tsvector('russian', coalesce(description, '')))""",
+]
+
+
+def upgrade(connection):
+    if connection.dialect.name == "postgresql":
+        statements = POSTGRESQL_STATEMENTS
+    else:
+        # Соединения приложения получают ru_stem в database.py; миграцию может выполнять и другой движок
+        connection.connection.dbapi_connection.create_function("ru_stem", 1, stem_text, deterministic=True)
+        statements = SQLITE_STATEMENTS
+    for statement in statements:
+        connection.execute(text(statement))
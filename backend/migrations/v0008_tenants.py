@@ -0,0 +1,121 @@
+"""Арендаторы: колонка tenant_id и составные индексы (tenant_id, ...).
+
+Все существующие данные получают арендатора default. Списки транзакций, целей и
+архива читаются по индексам, начинающимся с tenant_id; глобальный индекс по типу
+транзакции заменяется индексом (tenant_id, transaction_type, created_at, id).
+Настройки - одна запись на арендатора. Ключ идемпотентности становится составным
+(tenant_id, key): в SQLite первичный ключ меняется перестройкой таблицы.
+
+Поисковые таблицы SQLite пересоздаются с токеном арендатора t<tenant_id> (колонки
+tenant у goals_search и scope, вместе с токеном цели g<id>, у transactions_search):
+отбор по арендатору пересекает списки документов индекса, как и отбор по цели.
+transactions_search хранит арендатора и значением (tenant_id UNINDEXED): bm25 считает
+число документов с каждой фразой запроса, и токен крупного арендатора сделал бы
+ранжирование по релевантности пропорциональным объему его истории.
+Триггеры по-прежнему вызывают ru_stem до v0010_search_queue.
+"""
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, text
+
+from migrations.v0005_cascade_deletes import rebuild_sqlite_table
+from stemmer import stem_text
+
+metadata = MetaData()
+
+idempotency_keys = Table(
+    "idempotency_keys", metadata,
+    Column("tenant_id", String(64), primary_key=True),
+    Column("key", String, primary_key=True),
+    Column("fingerprint", String, nullable=False),
+    Column("status_code", Integer, nullable=False),
+    Column("response_body", Text, nullable=False),
+    Column("created_at", DateTime),
+    Column("expires_at", DateTime, nullable=False, index=True),
+)
+
+TENANT_TABLES = ("goals", "transactions", "transactions_archive", "settings", "idempotency_keys")
+
+INDEXES = [
+    "CREATE INDEX ix_goals_tenant_id_id ON goals (tenant_id, id)",
+    "CREATE INDEX ix_transactions_tenant_id_created_at_id ON transactions (tenant_id, created_at, id)",
+    "CREATE INDEX ix_transactions_tenant_id_type_created_at_id ON transactions (tenant_id, transaction_type, created_at, id)",
+    "CREATE INDEX ix_transactions_archive_tenant_id_created_at_id ON transactions_archive (tenant_id, created_at, id)",
+    "CREATE UNIQUE INDEX ux_settings_tenant_id ON settings (tenant_id)",
+]
+
+SEARCH_TRIGGERS = (
+    "goals_search_insert", "goals_search_update", "goals_search_delete", "transactions_search_insert",
+    "transactions_search_update", "transactions_search_delete", "transactions_archive_search_delete",
+)
+
+# Токены поискового индекса: g<id> цели и t<tenant_id> арендатора
+SCOPE = "'g' || {row}.goal_id || ' t' || {row}.tenant_id"
+
+SQLITE_SEARCH_STATEMENTS = [
+    *(f"DROP TRIGGER {trigger}" for trigger in SEARCH_TRIGGERS),
+    "DROP TABLE goals_search",
+    "DROP TABLE transactions_search",
+    """CREATE VIRTUAL TABLE goals_search USING fts5(
+        title, description, tenant, tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6'
+    )""",
+    """CREATE VIRTUAL TABLE transactions_search USING fts5(
+        description, scope, transaction_type UNINDEXED, tenant_id UNINDEXED,
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6'
+    )""",
+    """CREATE TRIGGER goals_search_insert AFTER INSERT ON goals BEGIN
+        INSERT INTO goals_search(rowid, title, description, tenant)
+        VALUES (new.id, ru_stem(new.title), ru_stem(new.description), 't' || new.tenant_id);
+    END""",
+    """CREATE TRIGGER goals_search_update AFTER UPDATE OF title, description ON goals BEGIN
+        INSERT OR REPLACE INTO goals_search(rowid, title, description, tenant)
+        VALUES (new.id, ru_stem(new.title), ru_stem(new.description), 't' || new.tenant_id);
+    END""",
+    """CREATE TRIGGER goals_search_delete AFTER DELETE ON goals BEGIN
+        DELETE FROM goals_search WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER transactions_search_insert AFTER INSERT ON transactions BEGIN
+        INSERT OR REPLACE INTO transactions_search(rowid, description, scope, transaction_type, tenant_id)
+        VALUES (new.id, ru_stem(new.description), {SCOPE.format(row="new")}, new.transaction_type, new.tenant_id);
+    END""",
+    f"""CREATE TRIGGER transactions_search_update AFTER UPDATE OF description, goal_id, transaction_type ON transactions BEGIN
+        INSERT OR REPLACE INTO transactions_search(rowid, description, scope, transaction_type, tenant_id)
+        VALUES (new.id, ru_stem(new.description), {SCOPE.format(row="new")}, new.transaction_type, new.tenant_id);
+    END""",
+    """CREATE TRIGGER transactions_search_delete AFTER DELETE ON transactions
+    WHEN NOT EXISTS (SELECT 1 FROM transactions_archive WHERE id = old.id) BEGIN
+        DELETE FROM transactions_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER transactions_archive_search_delete AFTER DELETE ON transactions_archive BEGIN
+        DELETE FROM transactions_search WHERE rowid = old.id;
+    END""",
+    """INSERT INTO goals_search(rowid, title, description, tenant)
+    SELECT id, ru_stem(title), ru_stem(description), 't' || tenant_id FROM goals""",
+    f"""INSERT INTO transactions_search(rowid, description, scope, transaction_type, tenant_id)
+    SELECT id, ru_stem(description), {SCOPE.format(row="transactions")}, transaction_type, tenant_id FROM transactions
+    UNION ALL
+    SELECT id, ru_stem(description), {SCOPE.format(row="transactions_archive")}, transaction_type, tenant_id
+    FROM transactions_archive""",
+]
+
+
+def upgrade(connection):
+    postgresql = connection.dialect.name == "postgresql"
+    for table in TENANT_TABLES:
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN tenant_id VARCHAR(64) NOT NULL DEFAULT 'default'"))
+
+    # Запись настроек раньше читалась как первая из таблицы: остальные не использовались
+    connection.execute(text("DELETE FROM settings WHERE id NOT IN (SELECT MIN(id) FROM settings)"))
+    connection.execute(text("DROP INDEX IF EXISTS ix_transactions_type_created_at_id"))
+    for statement in INDEXES:
+        connection.execute(text(statement))
+
+    if postgresql:
+        connection.execute(text(
+            "ALTER TABLE idempotency_keys DROP CONSTRAINT idempotency_keys_pkey, ADD PRIMARY KEY (tenant_id, key)"
+        ))
+        return
+
+    rebuild_sqlite_table(connection, idempotency_keys)
+    # Соединения приложения получают ru_stem в database.py; миграцию может выполнять и другой движок
+    connection.connection.dbapi_connection.create_function("ru_stem", 1, stem_text, deterministic=True)
+    for statement in SQLITE_SEARCH_STATEMENTS:
+        connection.execute(text(statement))
@@ -0,0 +1,19 @@
+"""Аренда расписания фоновых задач.
+
+Каждый воркер uvicorn запускает свой планировщик. Периодические задачи ставит в очередь
+только процесс, владеющий строкой аренды (jobs.ScheduleLease), остальные ее ожидают.
+"""
+from sqlalchemy import Column, DateTime, MetaData, String, Table
+
+metadata = MetaData()
+
+scheduler_leases = Table(
+    "scheduler_leases", metadata,
+    Column("name", String, primary_key=True),
+    Column("owner", String, nullable=False),
+    Column("expires_at", DateTime, nullable=False),
+)
+
+
+def upgrade(connection):
+    scheduler_leases.create(connection, checkfirst=True)
@@ -0,0 +1,41 @@
+"""Очередь индексации поиска SQLite вместо вызова ru_stem в триггерах.
+
+Триггеры v0007/v0008 вызывали ru_stem - функцию Python, которая есть только у соединений
+приложения, поэтому запись в goals и transactions из другого клиента SQLite (sqlite3,
+DBeaver, скрипты без регистрации функции) падала с "no such function: ru_stem".
+Теперь триггеры вставки и изменения только записывают (source, id) в search_pending,
+а основы слов вычисляет приложение перед фиксацией своей транзакции записи
+(search.index_pending_rows). Строки, записанные другими клиентами, попадают в поиск
+при следующей записи через приложение или после python search.py rebuild.
+Триггеры удаления ru_stem не вызывали и не меняются.
+
+PostgreSQL: индексы поддерживает сама БД, миграция ничего не делает.
+"""
+from sqlalchemy import text
+
+SQLITE_STATEMENTS = [
+    "CREATE TABLE search_pending (source VARCHAR(32) NOT NULL, id INTEGER NOT NULL, PRIMARY KEY (source, id)) WITHOUT ROWID",
+    "DROP TRIGGER goals_search_insert",
+    "DROP TRIGGER goals_search_update",
+    "DROP TRIGGER transactions_search_insert",
+    "DROP TRIGGER transactions_search_update",
+    """CREATE TRIGGER goals_search_insert AFTER INSERT ON goals BEGIN
+        INSERT OR IGNORE INTO search_pending(source, id) VALUES ('goals', new.id);
+    END""",
+    """CREATE TRIGGER goals_search_update AFTER UPDATE OF title, description ON goals BEGIN
+        INSERT OR IGNORE INTO search_pending(source, id) VALUES ('goals', new.id);
+    END""",
+    """CREATE TRIGGER transactions_search_insert AFTER INSERT ON transactions BEGIN
+        INSERT OR IGNORE INTO search_pending(source, id) VALUES ('transactions', new.id);
+    END""",
+    """CREATE TRIGGER transactions_search_update AFTER UPDATE OF description, goal_id, transaction_type ON transactions BEGIN
+        INSERT OR IGNORE INTO search_pending(source, id) VALUES ('transactions', new.id);
+    END""",
+]
+
+
+def upgrade(connection):
+    if connection.dialect.name == "postgresql":
+        return
+    for statement in SQLITE_STATEMENTS:
+        connection.execute(text(statement))
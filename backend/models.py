@@ -1,40 +1,105 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from database import Base
+from money import MoneyType
+from tenants import TenantScoped
 
-Base = declarative_base()
+# Модели с примесью TenantScoped принадлежат арендатору (см. tenants.py). Индексы
+# под запросы списков начинаются с tenant_id: арендатор читает только свои строки,
+# и время его запросов не растет с числом и объемом данных других арендаторов
 
-class Goal(Base):
+class Goal(TenantScoped, Base):
     __tablename__ = "goals"
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, nullable=False)
-    target_amount = Column(Float, nullable=False)
-    current_balance = Column(Float, default=0.0)
+    # Денежные суммы хранятся целыми копейками (см. money.py)
+    target_amount = Column(MoneyType, nullable=False)
+    current_balance = Column(MoneyType, default=0)
     target_date = Column(DateTime, nullable=True)
     description = Column(String, nullable=True)
     image_url = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    # Связь с транзакциями
-    transactions = relationship("Transaction", back_populates="goal", cascade="all, delete-orphan")
+    # Связь с транзакциями. Историю цели при удалении удаляет БД (ON DELETE CASCADE),
+    # passive_deletes не дает ORM загружать дочерние строки ради их удаления
+    transactions = relationship("Transaction", back_populates="goal", cascade="all, delete-orphan", passive_deletes=True)
+    
+    # Связь с дневными итогами для графиков
+    daily_balances = relationship("GoalDailyBalance", cascade="all, delete-orphan", passive_deletes=True)
+    
+    __table_args__ = (
+        Index("ix_goals_tenant_id_id", "tenant_id", "id"),
+    )
 
-class Transaction(Base):
+class Transaction(TenantScoped, Base):
     __tablename__ = "transactions"
     
     id = Column(Integer, primary_key=True, index=True)
-    goal_id = Column(Integer, ForeignKey("goals.id"), nullable=False)
-    amount = Column(Float, nullable=False)
+    goal_id = Column(Integer, ForeignKey("goals.id", ondelete="CASCADE"), nullable=False)
+    amount = Column(MoneyType, nullable=False)
     transaction_type = Column(String, nullable=False)  # "deposit" или "withdrawal"
     description = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Связь с целью
     goal = relationship("Goal", back_populates="transactions")
+    
+    # Составные индексы под keyset-пагинацию по (created_at, id) с фильтрами.
+    # Цель принадлежит одному арендатору, поэтому индексу по цели tenant_id не нужен;
+    # индекс без арендатора нужен архивации, которая идет по всем арендаторам
+    __table_args__ = (
+        Index("ix_transactions_created_at_id", "created_at", "id"),
+        Index("ix_transactions_goal_id_created_at_id", "goal_id", "created_at", "id"),
+        Index("ix_transactions_tenant_id_created_at_id", "tenant_id", "created_at", "id"),
+        Index("ix_transactions_tenant_id_type_created_at_id", "tenant_id", "transaction_type", "created_at", "id"),
+    )
+
+class ArchivedTransaction(TenantScoped, Base):
+    """Транзакция старше горизонта архивации (см. archive.py), структура как у Transaction"""
+    __tablename__ = "transactions_archive"
+    
+    id = Column(Integer, primary_key=True)
+    goal_id = Column(Integer, ForeignKey("goals.id", ondelete="CASCADE"), nullable=False)
+    amount = Column(MoneyType, nullable=False)
+    transaction_type = Column(String, nullable=False)
+    description = Column(String, nullable=True)
+    created_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index("ix_transactions_archive_created_at_id", "created_at", "id"),
+        Index("ix_transactions_archive_goal_id_created_at_id", "goal_id", "created_at", "id"),
+        Index("ix_transactions_archive_tenant_id_created_at_id", "tenant_id", "created_at", "id"),
+    )
 
-class Settings(Base):
+class GoalOpeningBalance(Base):
+    """Итоги архивной части истории цели: баланс на горизонт архивации, суммы и число операций"""
+    __tablename__ = "goal_opening_balances"
+    
+    goal_id = Column(Integer, ForeignKey("goals.id", ondelete="CASCADE"), primary_key=True)
+    archived_before = Column(DateTime, nullable=False)  # горизонт последней архивации
+    balance = Column(MoneyType, nullable=False, default=0)
+    deposits = Column(MoneyType, nullable=False, default=0)
+    withdrawals = Column(MoneyType, nullable=False, default=0)
+    deposit_count = Column(Integer, nullable=False, default=0)
+    withdrawal_count = Column(Integer, nullable=False, default=0)
+    first_transaction_at = Column(DateTime, nullable=True)
+    last_transaction_at = Column(DateTime, nullable=True)
+
+class GoalDailyBalance(Base):
+    """Дневные итоги цели, поддерживаемые инкрементально при записи транзакций"""
+    __tablename__ = "goal_daily_balance"
+    
+    goal_id = Column(Integer, ForeignKey("goals.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    deposits = Column(MoneyType, nullable=False, default=0)
+    withdrawals = Column(MoneyType, nullable=False, default=0)
+    closing_balance = Column(MoneyType, nullable=False, default=0)  # баланс на конец дня
+
+class Settings(TenantScoped, Base):
+    """Настройки арендатора, одна запись на арендатора"""
     __tablename__ = "settings"
     
     id = Column(Integer, primary_key=True, index=True)
@@ -42,4 +107,36 @@ class Settings(Base):
     currency = Column(String, default="RUB")
     language = Column(String, default="ru")
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ux_settings_tenant_id", "tenant_id", unique=True),
+    )
+
+class TableVersion(Base):
+    """Счетчик изменений таблицы, используется для ETag ответов API"""
+    __tablename__ = "table_versions"
+    
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+class SchedulerLease(Base):
+    """Аренда расписания фоновых задач: периодические задачи запускает только владелец (см. jobs.py)"""
+    __tablename__ = "scheduler_leases"
+    
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)  # хост, pid и случайный суффикс процесса
+    expires_at = Column(DateTime, nullable=False)
+
+class IdempotencyKey(TenantScoped, Base):
+    """Сохраненный ответ запроса записи с заголовком Idempotency-Key (см. idempotency.py)"""
+    __tablename__ = "idempotency_keys"
+    
+    # Ключи разных арендаторов не пересекаются
+    tenant_id = Column(String(64), primary_key=True)
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)  # хеш метода, пути и тела запроса
+    status_code = Column(Integer, nullable=False)
+    response_body = Column(Text, nullable=False)  # JSON ответа
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
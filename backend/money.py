@@ -0,0 +1,52 @@
+"""Денежные суммы в целых минорных единицах (копейках).
+
+В БД суммы хранятся целыми числами, поэтому SUM по ним точен и не накапливает
+ошибку округления. В Python суммы представлены Decimal, в JSON - числами.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Annotated, Optional
+
+from pydantic import PlainSerializer
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+# Число минорных единиц в основной (копеек в рубле)
+MINOR_UNITS = 100
+
+CENT = Decimal(1) / MINOR_UNITS
+
+
+def to_decimal(value) -> Decimal:
+    # float переводится через str, чтобы 2.675 не превратилось в 2.67499999...
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def to_minor(value) -> int:
+    """Сумма в копейках с округлением до копейки по правилу половина вверх"""
+    return int((to_decimal(value) * MINOR_UNITS).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def from_minor(value) -> Decimal:
+    """Сумма из копеек. Дробные значения (например, AVG) сохраняют точность"""
+    return to_decimal(value) / MINOR_UNITS
+
+
+def quantize(value) -> Decimal:
+    return to_decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class MoneyType(TypeDecorator):
+    """Колонка с суммой: BIGINT с копейками в БД, Decimal в Python"""
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect) -> Optional[int]:
+        return None if value is None else to_minor(value)
+
+    def process_result_value(self, value, dialect) -> Optional[Decimal]:
+        return None if value is None else from_minor(value)
+
+
+# Сумма в схемах API: Decimal внутри, число в JSON (формат ответов не меняется)
+Money = Annotated[Decimal, PlainSerializer(float, return_type=float, when_used="json")]
@@ -0,0 +1,72 @@
+import base64
+import heapq
+import itertools
+import json
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Кодирует позицию (created_at, id) последней строки страницы в непрозрачный курсор"""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def to_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Приводит дату к наивному UTC, в котором хранится created_at"""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def keyset_rows(query, created_at_column, id_column, cursor: Optional[str], limit: int, offset: int = 0) -> list:
+    """Строки после курсора в порядке (created_at, id) по убыванию: offset + limit + 1 штук"""
+    if cursor:
+        query = query.filter(tuple_(created_at_column, id_column) < tuple_(*decode_cursor(cursor)))
+    query = query.order_by(created_at_column.desc(), id_column.desc())
+    if offset:
+        query = query.offset(offset)
+    return query.limit(limit + 1).all()
+
+
+def split_page(rows: list, limit: int):
+    """Отделяет от limit + 1 строк страницу и строит курсор следующей страницы"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
+
+def keyset_page(query, created_at_column, id_column, cursor: Optional[str], limit: int, offset: int = 0):
+    """Применяет к запросу сортировку по (created_at, id) по убыванию и условие курсора.
+
+    Возвращает строки страницы и курсор следующей страницы (None, если страниц больше нет).
+    Запрашивается limit + 1 строка, чтобы узнать о наличии следующей страницы без COUNT.
+    """
+    return split_page(keyset_rows(query, created_at_column, id_column, cursor, limit, offset), limit)
+
+
+def merged_keyset_page(sources: list, cursor: Optional[str], limit: int, offset: int = 0):
+    """Страница по нескольким таблицам с одинаковыми колонками (например, живой и архивной).
+
+    sources - список (query, created_at_column, id_column). Из каждого источника читается
+    по индексу не больше offset + limit + 1 строк, потоки сливаются по (created_at, id).
+    Курсор общий для всех источников.
+    """
+    streams = [keyset_rows(query, created_at, row_id, cursor, offset + limit) for query, created_at, row_id in sources]
+    merged = heapq.merge(*streams, key=lambda row: (row.created_at, row.id), reverse=True)
+    return split_page(list(itertools.islice(merged, offset, offset + limit + 1)), limit)
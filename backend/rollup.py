@@ -0,0 +1,162 @@
+"""Дневные итоги целей (таблица goal_daily_balance) для графиков накоплений.
+
+Итоги поддерживаются инкрементально из путей записи транзакций. Для первичного
+заполнения или восстановления используется команда:
+    python rollup.py rebuild [--goal-id ID]
+"""
+import argparse
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import Date, case, cast, delete, func, insert, select, union_all, update
+from sqlalchemy.orm import Session
+
+from models import ArchivedTransaction, GoalDailyBalance, Transaction
+
+BUCKETS = ("day", "week", "month")
+
+
+def upsert_statement(db: Session):
+    """INSERT ... ON CONFLICT в диалекте текущей БД"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(GoalDailyBalance)
+
+
+def apply_daily_delta(db: Session, goal_id: int, day: date, deposits: Decimal, withdrawals: Decimal):
+    """Добавляет к итогам дня суммы пополнений и снятий и сдвигает баланс на конец последующих дней"""
+    net = deposits - withdrawals
+    if net:
+        db.execute(
+            update(GoalDailyBalance)
+            .where(GoalDailyBalance.goal_id == goal_id, GoalDailyBalance.date > day)
+            .values(closing_balance=GoalDailyBalance.closing_balance + net)
+            .execution_options(synchronize_session=False)
+        )
+
+    previous_closing = (
+        select(GoalDailyBalance.closing_balance)
+        .where(GoalDailyBalance.goal_id == goal_id, GoalDailyBalance.date < day)
+        .order_by(GoalDailyBalance.date.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    statement = upsert_statement(db).values(
+        goal_id=goal_id,
+        date=day,
+        deposits=deposits,
+        withdrawals=withdrawals,
+        closing_balance=func.coalesce(previous_closing, 0) + net,
+    )
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[GoalDailyBalance.goal_id, GoalDailyBalance.date],
+            set_={
+                "deposits": GoalDailyBalance.deposits + statement.excluded.deposits,
+                "withdrawals": GoalDailyBalance.withdrawals + statement.excluded.withdrawals,
+                "closing_balance": GoalDailyBalance.closing_balance + net,
+            },
+        )
+    )
+
+
+def apply_transaction_to_rollup(db: Session, goal_id: int, amount: Decimal, transaction_type: str, created_at: datetime, sign: int = 1):
+    """Применяет (sign=1) или откатывает (sign=-1) транзакцию в дневных итогах цели"""
+    if transaction_type == "deposit":
+        apply_daily_delta(db, goal_id, created_at.date(), sign * amount, 0)
+    else:
+        apply_daily_delta(db, goal_id, created_at.date(), 0, sign * amount)
+
+
+def day_expression(db: Session, column):
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(column, Date)
+    return func.date(column)
+
+
+def rebuild_rollup(db: Session, goal_id: Optional[int] = None) -> int:
+    """Полностью перестраивает дневные итоги по истории транзакций (для всех целей или одной)"""
+    cleanup = delete(GoalDailyBalance)
+    if goal_id is not None:
+        cleanup = cleanup.where(GoalDailyBalance.goal_id == goal_id)
+    db.execute(cleanup)
+
+    # Итоги строятся по всей истории: живым и архивным транзакциям
+    history = union_all(*(
+        select(model.goal_id, model.amount, model.transaction_type, model.created_at).where(
+            *([model.goal_id == goal_id] if goal_id is not None else [])
+        )
+        for model in (Transaction, ArchivedTransaction)
+    )).subquery()
+    day = day_expression(db, history.c.created_at).label("day")
+    daily = (
+        select(
+            history.c.goal_id,
+            day,
+            func.coalesce(func.sum(case((history.c.transaction_type == "deposit", history.c.amount))), 0).label("deposits"),
+            func.coalesce(func.sum(case((history.c.transaction_type == "withdrawal", history.c.amount))), 0).label("withdrawals"),
+        )
+        .group_by(history.c.goal_id, day)
+    ).subquery()
+
+    closing = func.sum(daily.c.deposits - daily.c.withdrawals).over(
+        partition_by=daily.c.goal_id, order_by=daily.c.day
+    )
+    result = db.execute(
+        insert(GoalDailyBalance).from_select(
+            ["goal_id", "date", "deposits", "withdrawals", "closing_balance"],
+            select(daily.c.goal_id, daily.c.day, daily.c.deposits, daily.c.withdrawals, closing),
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def goal_history(db: Session, goal_id: int, bucket: str = "day", date_from: Optional[date] = None, date_to: Optional[date] = None) -> list[dict]:
+    """Возвращает историю цели из дневных итогов, сгруппированную по дням, неделям или месяцам"""
+    query = select(GoalDailyBalance).where(GoalDailyBalance.goal_id == goal_id)
+    if date_from is not None:
+        query = query.where(GoalDailyBalance.date >= date_from)
+    if date_to is not None:
+        query = query.where(GoalDailyBalance.date <= date_to)
+
+    buckets = OrderedDict()
+    for row in db.scalars(query.order_by(GoalDailyBalance.date)):
+        start = bucket_start(row.date, bucket)
+        item = buckets.setdefault(start, {"period_start": start, "deposits": 0, "withdrawals": 0, "closing_balance": 0})
+        item["deposits"] += row.deposits
+        item["withdrawals"] += row.withdrawals
+        item["closing_balance"] = row.closing_balance
+    return list(buckets.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Управление дневными итогами целей")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--goal-id", type=int, default=None)
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rows = rebuild_rollup(db, goal_id=args.goal_id)
+        print(f"Rebuilt {rows} daily rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
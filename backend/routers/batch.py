@@ -0,0 +1,151 @@
+import copy
+import inspect
+import json
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, params
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic_core import PydanticUndefined
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import get_write_db, db_endpoint
+from idempotency import IdempotentRequest, idempotency_key, remember_response, replay_response
+from schemas import BatchOperation, BatchRequest, BatchResponse
+
+router = APIRouter()
+logger = logging.getLogger("smart_piggy_bank.batch")
+
+# Роутеры, эндпоинты которых можно вызывать внутри пакета
+BATCH_PREFIXES = ("/goals", "/transactions", "/settings")
+
+
+def find_route(request: Request, operation: BatchOperation) -> tuple[APIRoute, dict]:
+    """Эндпоинт приложения для метода и пути операции и параметры из пути"""
+    method = operation.method.upper()
+    for route in request.app.routes:
+        if not isinstance(route, APIRoute) or not route.path.startswith(BATCH_PREFIXES):
+            continue
+        match = route.path_regex.match(operation.path)
+        if match and method in route.methods:
+            # Внутри пакета вызывается синхронный код обработчика, обернутого db_endpoint
+            if not hasattr(route.endpoint, "__wrapped__"):
+                break
+            return route, match.groupdict()
+    raise HTTPException(status_code=404, detail=f"Operation {method} {operation.path} is not supported in batch")
+
+
+def endpoint_arguments(route: APIRoute, operation: BatchOperation, path_params: dict, db: Session) -> dict:
+    """Аргументы обработчика: параметры пути и запроса, тело, сессия пакета.
+
+    Параметры пути и запроса проверяются по аннотациям, тело - по схеме Pydantic
+    или, для параметров Body(...) (список строк /transactions/bulk), по аннотации.
+    Остальные параметры получают значения по умолчанию.
+    """
+    arguments = {}
+    for name, parameter in inspect.signature(route.endpoint.__wrapped__).parameters.items():
+        annotation = parameter.annotation
+        default = getattr(parameter.default, "default", parameter.default)
+        if name == "db":
+            arguments[name] = db
+        elif annotation is Request:
+            arguments[name] = None
+        elif annotation is Response:
+            arguments[name] = Response()
+        elif name in path_params:
+            arguments[name] = TypeAdapter(annotation).validate_python(path_params[name])
+        elif name in operation.query:
+            arguments[name] = TypeAdapter(annotation).validate_python(operation.query[name])
+        elif isinstance(parameter.default, params.Body):
+            arguments[name] = TypeAdapter(annotation).validate_python(operation.body)
+        elif inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+            arguments[name] = annotation.model_validate(operation.body if operation.body is not None else {})
+        elif name == "idempotency":
+            arguments[name] = None
+        elif default not in (inspect.Parameter.empty, PydanticUndefined, ...):
+            arguments[name] = default
+        else:
+            raise HTTPException(status_code=400, detail=f"Missing parameter '{name}'")
+    return arguments
+
+
+def result_body(route: APIRoute, result):
+    """JSON ответа обработчика, как его отдал бы сам эндпоинт"""
+    if isinstance(result, Response):
+        return json.loads(result.body) if result.body else None
+    if route.response_model is not None:
+        adapter = TypeAdapter(route.response_model)
+        return adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json")
+    return jsonable_encoder(result)
+
+
+def run_operation(request: Request, operation: BatchOperation, db: Session) -> tuple[int, object]:
+    """Выполняет операцию под точкой сохранения: при ошибке откатываются только ее изменения.
+
+    Любая ошибка обработчика становится результатом этой операции: нарушение ограничений БД - 409,
+    непредвиденная ошибка - 500. Остальные операции пакета выполняются как обычно.
+    """
+    info = {key: copy.copy(value) for key, value in db.info.items()}
+    savepoint = db.begin_nested()
+    try:
+        route, path_params = find_route(request, operation)
+        result = route.endpoint.__wrapped__(**endpoint_arguments(route, operation, path_params, db))
+        body = result_body(route, result)
+        savepoint.commit()
+        return (result.status_code if isinstance(result, Response) else route.status_code or 200), body
+    except Exception as error:
+        savepoint.rollback()
+        # Отложенные действия после фиксации (сброс кэша, события) от отмененной операции отбрасываются
+        db.info.clear()
+        db.info.update(info)
+        if isinstance(error, HTTPException):
+            return error.status_code, {"detail": error.detail}
+        if isinstance(error, ValidationError):
+            return 422, {"detail": jsonable_encoder(error.errors(include_url=False))}
+        if isinstance(error, IntegrityError):
+            return 409, {"detail": "Operation conflicts with existing data"}
+        logger.exception("Batch operation %s %s failed", operation.method, operation.path)
+        return 500, {"detail": "Internal Server Error"}
+
+
+@router.post("/", response_model=BatchResponse)
+@db_endpoint
+def run_batch(
+    batch: BatchRequest,
+    request: Request,
+    idempotency: Optional[IdempotentRequest] = Depends(idempotency_key),
+    db: Session = Depends(get_write_db)
+):
+    """Выполняет операции с целями, транзакциями и настройками за один запрос и одну транзакцию БД.
+
+    Операции выполняются по порядку, commit обработчиков откладывается до конца пакета.
+    Без atomic ошибка операции откатывает только ее изменения, с atomic - весь пакет.
+    """
+    replay = replay_response(db, idempotency)
+    if replay:
+        return replay
+
+    results = []
+    failed = False
+    db.info["defer_commit"] = True
+    try:
+        for operation in batch.operations:
+            status, body = run_operation(request, operation, db)
+            results.append({"status": status, "body": body})
+            if status >= 400 and batch.atomic:
+                failed = True
+                break
+    finally:
+        db.info.pop("defer_commit", None)
+
+    if failed:
+        db.rollback()
+        return {"committed": False, "results": results}
+
+    response = {"committed": True, "results": results}
+    remember_response(db, idempotency, response)
+    db.commit()
+    return response
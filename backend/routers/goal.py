@@ -1,57 +1,132 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from models import Goal, Transaction
-from schemas import GoalResponse, GoalCreate, GoalUpdate
-from database import get_db
+from datetime import date
+from typing import Optional
+from models import ArchivedTransaction, Goal, GoalDailyBalance, GoalOpeningBalance, Transaction
+from schemas import GoalResponse, GoalCreate, GoalUpdate, GoalBalanceCheck, GoalStats, GoalsStatsResponse, GoalHistoryBucket
+from balance import calculate_goal_balance, verify_goal_balance
+from stats import collect_goal_stats, summarize
+from rollup import BUCKETS, goal_history
+from database import get_db, get_write_db, db_endpoint
+from cache import goal_cache, goal_list_cache
+from versions import mark_changed, not_modified, versioned_key
+from events import publish_goal_on_commit, publish_on_commit
+from serialization import json_response, response_columns, row_dicts
+from idempotency import IdempotentRequest, idempotency_key, remember_response, replay_response
 
 router = APIRouter()
 
 def recalculate_goal_balance(db: Session, goal_id: int):
-    """Пересчитывает current_balance для цели на основе транзакций"""
-    total_deposits = db.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(
-        Transaction.goal_id == goal_id,
-        Transaction.transaction_type == "deposit"
-    ).scalar()
-    
-    total_withdrawals = db.query(func.coalesce(func.sum(Transaction.amount), 0)).filter(
-        Transaction.goal_id == goal_id,
-        Transaction.transaction_type == "withdrawal"
-    ).scalar()
-    
-    balance = total_deposits - total_withdrawals
-    
-    goal = db.query(Goal).filter(Goal.id == goal_id).first()
+    """Пересчитывает current_balance для цели на основе всех транзакций.
+
+    Используется только для явного восстановления баланса: операции с транзакциями
+    поддерживают баланс инкрементально через balance.apply_transaction.
+    Строка цели блокируется до чтения истории: конкурентная запись транзакции
+    (в том числе из другого воркера) дождется фиксации пересчета и не потеряется.
+    """
+    goal = db.query(Goal).filter(Goal.id == goal_id).with_for_update().first()
     if goal:
-        goal.current_balance = balance
+        goal.current_balance = calculate_goal_balance(db, goal_id)
+        publish_goal_on_commit(db, goal)
         db.commit()
         db.refresh(goal)
     
     return goal
 
 @router.get("/", response_model=list[GoalResponse])
-def get_goals(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    goals = db.query(Goal).offset(skip).limit(limit).all()
-    return goals
+@db_endpoint
+def get_goals(request: Request, response: Response, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    unchanged = not_modified(request, response, db, "goals")
+    if unchanged:
+        return unchanged
+    
+    def load_goals():
+        goals = db.query(*response_columns(Goal, GoalResponse)).order_by(Goal.id).offset(skip).limit(limit)
+        return row_dicts(goals)
+    
+    return json_response(goal_list_cache.get_or_load(versioned_key(request, db, (skip, limit), "goals"), load_goals), response)
 
-@router.get("/{goal_id}", response_model=GoalResponse)
-def get_goal_by_id(goal_id: int, db: Session = Depends(get_db)):
-    db_goal = db.query(Goal).filter(Goal.id == goal_id).first()
-    if not db_goal:
+@router.get("/stats", response_model=GoalsStatsResponse)
+@db_endpoint
+def get_goals_stats(
+    request: Request,
+    response: Response,
+    months: int = Query(12, ge=1, le=120),
+    db: Session = Depends(get_db)
+):
+    unchanged = not_modified(request, response, db, "goals", "transactions")
+    if unchanged:
+        return unchanged
+    
+    # Статистика по всем целям для дашборда за один запрос к API
+    return summarize(collect_goal_stats(db, months=months))
+
+@router.get("/{goal_id}/stats", response_model=GoalStats)
+@db_endpoint
+def get_goal_stats(
+    goal_id: int,
+    request: Request,
+    response: Response,
+    months: int = Query(12, ge=1, le=120),
+    db: Session = Depends(get_db)
+):
+    unchanged = not_modified(request, response, db, "goals", "transactions")
+    if unchanged:
+        return unchanged
+    
+    goal_stats = collect_goal_stats(db, goal_id=goal_id, months=months)
+    if not goal_stats:
         raise HTTPException(status_code=404, detail="Goal not found")
-    return db_goal
+    return goal_stats[0]
+
+@router.get("/{goal_id}", response_model=GoalResponse)
+@db_endpoint
+def get_goal_by_id(goal_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    unchanged = not_modified(request, response, db, "goals")
+    if unchanged:
+        return unchanged
+    
+    def load_goal():
+        db_goal = db.query(Goal).filter(Goal.id == goal_id).first()
+        if not db_goal:
+            raise HTTPException(status_code=404, detail="Goal not found")
+        return GoalResponse.model_validate(db_goal).model_dump()
+    
+    return goal_cache.get_or_load(versioned_key(request, db, goal_id, "goals"), load_goal)
 
 @router.post("/", response_model=GoalResponse)
-def create_goal(goal_create: GoalCreate, db: Session = Depends(get_db)):
+@db_endpoint
+def create_goal(
+    goal_create: GoalCreate,
+    idempotency: Optional[IdempotentRequest] = Depends(idempotency_key),
+    db: Session = Depends(get_write_db)
+):
+    replay = replay_response(db, idempotency)
+    if replay:
+        return replay
+    
     db_goal = Goal(**goal_create.dict())
     db.add(db_goal)
+    db.flush()
+    publish_goal_on_commit(db, db_goal)
+    remember_response(db, idempotency, GoalResponse.model_validate(db_goal))
     db.commit()
     db.refresh(db_goal)
     return db_goal
 
 @router.put("/{goal_id}", response_model=GoalResponse)
-def update_goal(goal_id: int, goal_update: GoalUpdate, db: Session = Depends(get_db)):
-    db_goal = db.query(Goal).filter(Goal.id == goal_id).first()
+@db_endpoint
+def update_goal(
+    goal_id: int,
+    goal_update: GoalUpdate,
+    idempotency: Optional[IdempotentRequest] = Depends(idempotency_key),
+    db: Session = Depends(get_write_db)
+):
+    replay = replay_response(db, idempotency)
+    if replay:
+        return replay
+    
+    db_goal = db.query(Goal).filter(Goal.id == goal_id).with_for_update().first()
     if not db_goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
@@ -59,34 +134,105 @@ def update_goal(goal_id: int, goal_update: GoalUpdate, db: Session = Depends(get
     for field, value in goal_update.dict(exclude_unset=True).items():
         setattr(db_goal, field, value)
     
+    publish_goal_on_commit(db, db_goal)
+    remember_response(db, idempotency, GoalResponse.model_validate(db_goal))
     db.commit()
     db.refresh(db_goal)
     return db_goal
 
 @router.delete("/{goal_id}")
-def delete_goal(goal_id: int, db: Session = Depends(get_db)):
-    db_goal = db.query(Goal).filter(Goal.id == goal_id).first()
+@db_endpoint
+def delete_goal(
+    goal_id: int,
+    idempotency: Optional[IdempotentRequest] = Depends(idempotency_key),
+    db: Session = Depends(get_write_db)
+):
+    replay = replay_response(db, idempotency)
+    if replay:
+        return replay
+    
+    db_goal = db.query(Goal).filter(Goal.id == goal_id).with_for_update().first()
     if not db_goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
+    # Транзакции и дневные итоги цели удаляет БД (ON DELETE CASCADE): ORM не загружает их в память
     db.delete(db_goal)
+    mark_changed(db, "transactions", "transactions_archive", "goal_opening_balances", "goal_daily_balance")
+    publish_on_commit(db, "goal.deleted", {"goal_id": goal_id})
+    result = {"message": "Goal deleted successfully"}
+    remember_response(db, idempotency, result)
     db.commit()
     
-    return {"message": "Goal deleted successfully"}
+    return result
 
 @router.post("/{goal_id}/reset-progress")
-def reset_goal_progress(goal_id: int, db: Session = Depends(get_db)):
+@db_endpoint
+def reset_goal_progress(
+    goal_id: int,
+    idempotency: Optional[IdempotentRequest] = Depends(idempotency_key),
+    db: Session = Depends(get_write_db)
+):
+    replay = replay_response(db, idempotency)
+    if replay:
+        return replay
+    
     # Получаем цель
-    db_goal = db.query(Goal).filter(Goal.id == goal_id).first()
+    db_goal = db.query(Goal).filter(Goal.id == goal_id).with_for_update().first()
     if not db_goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
-    # Удаляем все транзакции, связанные с этой целью
-    db.query(Transaction).filter(Transaction.goal_id == goal_id).delete()
+    # Удаляем все транзакции, связанные с этой целью (в том числе архивные), и их итоги одним оператором на таблицу
+    for model in (Transaction, ArchivedTransaction, GoalOpeningBalance, GoalDailyBalance):
+        db.query(model).filter(model.goal_id == goal_id).delete()
+    # Загруженные ранее коллекции цели больше не соответствуют БД
+    db.expire(db_goal, ["transactions", "daily_balances"])
     
     # Сбрасываем текущий баланс до 0
     db_goal.current_balance = 0
+    publish_goal_on_commit(db, db_goal)
+    remember_response(db, idempotency, {"message": "Goal progress reset successfully", "goal": GoalResponse.model_validate(db_goal)})
     db.commit()
     db.refresh(db_goal)
     
-    return {"message": "Goal progress reset successfully", "goal": db_goal}
\ No newline at end of file
+    return {"message": "Goal progress reset successfully", "goal": db_goal}
+
+@router.get("/{goal_id}/history", response_model=list[GoalHistoryBucket])
+@db_endpoint
+def get_goal_history(
+    goal_id: int,
+    request: Request,
+    response: Response,
+    bucket: str = "day",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail="Invalid bucket. Use 'day', 'week' or 'month'")
+    if not db.query(Goal.id).filter(Goal.id == goal_id).first():
+        raise HTTPException(status_code=404, detail="Goal not found")
+    
+    unchanged = not_modified(request, response, db, "goal_daily_balance")
+    if unchanged:
+        return unchanged
+    
+    # История строится по дневным итогам, без сканирования таблицы транзакций
+    return goal_history(db, goal_id, bucket, date_from, date_to)
+
+@router.get("/{goal_id}/verify-balance", response_model=GoalBalanceCheck)
+@db_endpoint
+def verify_balance(goal_id: int, db: Session = Depends(get_db)):
+    db_goal = db.query(Goal).filter(Goal.id == goal_id).first()
+    if not db_goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    
+    return verify_goal_balance(db, db_goal)
+
+@router.post("/{goal_id}/recalculate-balance", response_model=GoalResponse)
+@db_endpoint
+def repair_balance(goal_id: int, db: Session = Depends(get_write_db)):
+    # Полный пересчет баланса по истории транзакций (восстановление после сбоев)
+    db_goal = recalculate_goal_balance(db, goal_id)
+    if not db_goal:
+        raise HTTPException(status_code=404, detail="Goal not found")
+    return db_goal
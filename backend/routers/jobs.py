@@ -0,0 +1,57 @@
+from typing import Any, Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException
+
+from admin import is_admin
+from jobs import ADMIN_JOBS, SchedulerUnavailable, scheduler
+from schemas import JobResponse
+from tenants import current_tenant
+
+router = APIRouter()
+
+
+def visible_job(job_id: str, tenant: str, admin: bool):
+    # Арендатор видит только свои задачи, администратор - все, включая периодические
+    job = scheduler.get(job_id)
+    if not job or not (admin or job.params.get("tenant") == tenant):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/", response_model=list[JobResponse])
+def list_jobs(tenant: str = Depends(current_tenant), admin: bool = Depends(is_admin)):
+    # Последние задачи процесса, новые первыми
+    return scheduler.list(tenant=None if admin else tenant)
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(job_id: str, tenant: str = Depends(current_tenant), admin: bool = Depends(is_admin)):
+    return visible_job(job_id, tenant, admin)
+
+
+@router.post("/{name}", response_model=JobResponse, status_code=202)
+def run_job(
+    name: str,
+    params: Optional[dict[str, Any]] = Body(None),
+    tenant: str = Depends(current_tenant),
+    admin: bool = Depends(is_admin),
+):
+    """Ставит задачу в очередь и сразу возвращает ее состояние; ход выполнения - GET /jobs/{id}.
+
+    Задача обрабатывает только данные арендатора запроса. Обслуживание всей БД (ADMIN_JOBS)
+    требует токена администратора.
+    """
+    if name not in scheduler.jobs:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{name}'")
+    if name in ADMIN_JOBS and not admin:
+        raise HTTPException(status_code=403, detail=f"Job '{name}' requires the admin token")
+    params = dict(params or {})
+    if "tenant" in params:
+        raise HTTPException(status_code=422, detail="Job tenant is taken from the X-Tenant-ID header")
+    try:
+        return scheduler.submit(name, tenant=tenant, **params)
+    except TypeError as error:
+        # Параметры не подходят к сигнатуре задачи
+        raise HTTPException(status_code=422, detail=f"Invalid parameters for job '{name}': {error}")
+    except SchedulerUnavailable as error:
+        raise HTTPException(status_code=503, detail=str(error))
@@ -0,0 +1,53 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session
+
+from database import get_db, db_endpoint
+from schemas import GoalResponse, TransactionResponse
+from search import SORT_ORDERS, search_goals, search_transactions
+from serialization import json_response
+from versions import not_modified
+
+router = APIRouter()
+
+
+@router.get("/goals", response_model=list[GoalResponse])
+@db_endpoint
+def find_goals(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    # Поиск по названию и описанию целей, лучшие совпадения первыми
+    unchanged = not_modified(request, response, db, "goals")
+    if unchanged:
+        return unchanged
+    return json_response(search_goals(db, q, skip=skip, limit=limit), response)
+
+
+@router.get("/transactions", response_model=list[TransactionResponse])
+@db_endpoint
+def find_transactions(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    goal_id: Optional[int] = None,
+    transaction_type: Optional[str] = None,
+    sort: str = "relevance",
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    # Поиск по описаниям живых и архивных транзакций: лучшие совпадения (relevance) или новые (recent) первыми
+    if sort not in SORT_ORDERS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SORT_ORDERS)}")
+    unchanged = not_modified(request, response, db, "transactions", "transactions_archive")
+    if unchanged:
+        return unchanged
+    return json_response(
+        search_transactions(db, q, goal_id=goal_id, transaction_type=transaction_type, sort=sort, skip=skip, limit=limit), response
+    )
@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 from models import Settings
 from schemas import SettingsResponse, SettingsUpdate
-from database import get_db
+from database import get_db, get_write_db, db_endpoint
+from cache import settings_cache, invalidate_settings_on_commit
+from versions import not_modified, versioned_key
 
 router = APIRouter()
 
 @router.get("/", response_model=SettingsResponse)
-def get_settings(db: Session = Depends(get_db)):
+@db_endpoint
+def get_settings(request: Request, response: Response, db: Session = Depends(get_db)):
+    unchanged = not_modified(request, response, db, "settings")
+    if unchanged:
+        return unchanged
+    
+    # Настройки меняются редко, поэтому отдаются из кэша
+    return settings_cache.get_or_load(versioned_key(request, db, "settings", "settings"), lambda: load_settings(db))
+
+def load_settings(db: Session):
     # Получаем настройки, создаем если не существуют
     settings = db.query(Settings).first()
     if not settings:
@@ -21,10 +32,11 @@ def get_settings(db: Session = Depends(get_db)):
     settings.currency = "RUB"
     settings.language = "ru"
     
-    return settings
+    return SettingsResponse.model_validate(settings).model_dump()
 
 @router.put("/", response_model=SettingsResponse)
-def update_settings(settings_update: SettingsUpdate, db: Session = Depends(get_db)):
+@db_endpoint
+def update_settings(settings_update: SettingsUpdate, db: Session = Depends(get_write_db)):
     # Получаем существующие настройки
     settings = db.query(Settings).first()
     if not settings:
@@ -43,6 +55,7 @@ def update_settings(settings_update: SettingsUpdate, db: Session = Depends(get_d
     settings.currency = "RUB"
     settings.language = "ru"
     
+    invalidate_settings_on_commit(db)
     db.commit()
     db.refresh(settings)
     return settings
\ No newline at end of file
@@ -1,92 +1,283 @@
-from fastapi import APIRouter, Depends, HTTPException
+import os
+import tempfile
+from datetime import datetime
+from typing import Any, BinaryIO, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from models import Transaction, Goal
-from schemas import TransactionResponse, TransactionCreate, TransactionUpdate
-from database import get_db
+from models import ArchivedTransaction, Transaction, Goal
+from schemas import TransactionResponse, TransactionCreate, TransactionUpdate, BulkTransactionResponse
+from database import get_db, get_write_db, db_endpoint, run_db, tenant_database
+from balance import TRANSACTION_TYPES, apply_transaction
+from pagination import keyset_page, merged_keyset_page, to_utc_naive
+from archive import reaches_archive
+from versions import not_modified
+from events import publish_on_commit
+from serialization import json_response, response_columns, row_dicts
+from idempotency import IdempotentRequest, idempotency_key, remember_response, replay_response
+from tenants import current_tenant
 
 router = APIRouter()
 
+# Сколько байт загружаемой выписки держится в памяти, остальное - во временном файле
+UPLOAD_SPOOL_SIZE = int(os.getenv("UPLOAD_SPOOL_SIZE", str(8 * 1024 * 1024)))
+
+def transaction_filters(
+    goal_id: Optional[int] = None,
+    transaction_type: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    model=Transaction,
+) -> list:
+    """Условия отбора транзакций по цели, типу и полуинтервалу дат [date_from, date_to).
+
+    model - Transaction или ArchivedTransaction (колонки у них одинаковые).
+    """
+    filters = []
+    if goal_id is not None:
+        filters.append(model.goal_id == goal_id)
+    if transaction_type is not None:
+        filters.append(model.transaction_type == transaction_type)
+    if date_from is not None:
+        filters.append(model.created_at >= to_utc_naive(date_from))
+    if date_to is not None:
+        filters.append(model.created_at < to_utc_naive(date_to))
+    return filters
+
+def publish_transaction_on_commit(db: Session, event_type: str, db_transaction: Transaction):
+    """Публикует событие с данными транзакции после фиксации"""
+    data = TransactionResponse.model_validate(db_transaction).model_dump()
+    publish_on_commit(db, event_type, {"transaction": data})
+
 @router.get("/", response_model=list[TransactionResponse])
-def get_transactions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    transactions = db.query(Transaction).order_by(Transaction.created_at.desc()).offset(skip).limit(limit).all()
-    return transactions
+@db_endpoint
+def get_transactions(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    goal_id: Optional[int] = None,
+    transaction_type: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    unchanged = not_modified(request, response, db, "transactions", "transactions_archive")
+    if unchanged:
+        return unchanged
+    
+    # Выбираются только колонки ответа: строки сразу переводятся в словари без ORM-объектов
+    def columns_query(model):
+        return db.query(*response_columns(model, TransactionResponse)).filter(
+            *transaction_filters(goal_id, transaction_type, date_from, date_to, model=model)
+        )
+    
+    # skip оставлен для совместимости: глубокие смещения медленные, следует передавать cursor
+    offset = 0 if cursor else skip
+    if reaches_archive(db, to_utc_naive(date_from)):
+        # Запрос уходит за горизонт архивации: страница собирается из живой и архивной таблиц
+        transactions, next_cursor = merged_keyset_page(
+            [(columns_query(model), model.created_at, model.id) for model in (Transaction, ArchivedTransaction)],
+            cursor, limit, offset=offset,
+        )
+    else:
+        transactions, next_cursor = keyset_page(
+            columns_query(Transaction), Transaction.created_at, Transaction.id, cursor, limit, offset=offset
+        )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return json_response(row_dicts(transactions), response)
+
+@router.get("/export")
+def export_transactions_stream(
+    format: str = "csv",
+    goal_id: Optional[int] = None,
+    transaction_type: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    tenant: str = Depends(current_tenant),
+):
+    # Модули выгрузки и загрузки нужны редко и импортируются при первом обращении,
+    # чтобы не замедлять холодный старт приложения
+    from export import EXPORT_FORMATS, export_transactions, parquet_available
+
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format. Use 'csv', 'ndjson' or 'parquet'")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export requires the pyarrow package")
+    
+    # Строки читаются с курсора БД пачками и сразу отдаются клиенту: память не растет с размером истории.
+    # Архив читается, только если выгрузка уходит за горизонт архивации
+    with tenant_database(tenant).SessionLocal() as db:
+        models = (Transaction, ArchivedTransaction) if reaches_archive(db, to_utc_naive(date_from)) else (Transaction,)
+    sources = [(model, transaction_filters(goal_id, transaction_type, date_from, date_to, model=model)) for model in models]
+    return StreamingResponse(
+        export_transactions(sources, format, tenant),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="transactions.{format}"'},
+    )
 
 @router.get("/{transaction_id}", response_model=TransactionResponse)
-def get_transaction_by_id(transaction_id: int, db: Session = Depends(get_db)):
+@db_endpoint
+def get_transaction_by_id(transaction_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    unchanged = not_modified(request, response, db, "transactions", "transactions_archive")
+    if unchanged:
+        return unchanged
+    
     db_transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
+    if not db_transaction:
+        db_transaction = db.query(ArchivedTransaction).filter(ArchivedTransaction.id == transaction_id).first()
     if not db_transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return db_transaction
 
 @router.post("/", response_model=TransactionResponse)
-def create_transaction(transaction_create: TransactionCreate, db: Session = Depends(get_db)):
+@db_endpoint
+def create_transaction(
+    transaction_create: TransactionCreate,
+    idempotency: Optional[IdempotentRequest] = Depends(idempotency_key),
+    db: Session = Depends(get_write_db)
+):
+    # Повтор запроса с тем же Idempotency-Key (например, после таймаута) получает исходный ответ
+    replay = replay_response(db, idempotency)
+    if replay:
+        return replay
+    
     # Проверяем, существует ли цель
     goal = db.query(Goal).filter(Goal.id == transaction_create.goal_id).first()
     if not goal:
         raise HTTPException(status_code=404, detail="Goal not found")
     
     # Проверяем, что тип транзакции допустим
-    if transaction_create.transaction_type not in ["deposit", "withdrawal"]:
+    if transaction_create.transaction_type not in TRANSACTION_TYPES:
         raise HTTPException(status_code=400, detail="Invalid transaction type. Use 'deposit' or 'withdrawal'")
     
     db_transaction = Transaction(**transaction_create.dict())
     db.add(db_transaction)
+    db.flush()
+    
+    # Изменяем баланс цели и дневные итоги в той же транзакции БД, что и вставку
+    apply_transaction(
+        db, db_transaction.goal_id, db_transaction.amount, db_transaction.transaction_type, db_transaction.created_at
+    )
+    publish_transaction_on_commit(db, "transaction.created", db_transaction)
+    remember_response(db, idempotency, TransactionResponse.model_validate(db_transaction))
     db.commit()
     db.refresh(db_transaction)
     
-    # Пересчитываем баланс цели
-    from .goal import recalculate_goal_balance
-    recalculate_goal_balance(db, transaction_create.goal_id)
-    
     return db_transaction
 
+@router.post("/bulk", response_model=BulkTransactionResponse)
+@db_endpoint
+def create_transactions_bulk(
+    rows: list[Any] = Body(...),
+    atomic: bool = False,
+    return_ids: bool = False,
+    db: Session = Depends(get_write_db)
+):
+    from ingest import ingest_transactions
+
+    # Каждая строка проверяется отдельно, ошибки возвращаются построчно
+    return ingest_transactions(db, rows, atomic=atomic, return_ids=return_ids)
+
+async def spool_upload(request: Request):
+    """Зависимость: тело загрузки, прочитанное целиком (в памяти или во временном файле).
+
+    Тело читается до открытия сессии записи, поэтому медленная передача по сети
+    не держит единственного писателя SQLite (BEGIN IMMEDIATE и очередь записи).
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE)
+    try:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        yield spool
+    finally:
+        spool.close()
+
+@router.post("/bulk/upload", response_model=BulkTransactionResponse)
+async def upload_transactions_bulk(
+    request: Request,
+    format: Optional[str] = None,
+    atomic: bool = False,
+    return_ids: bool = False,
+    # Зависимости разрешаются по порядку параметров: тело читается раньше, чем открывается db
+    upload: BinaryIO = Depends(spool_upload),
+    db: Session = Depends(get_write_db)
+):
+    # Формат берется из параметра или из Content-Type: NDJSON (по умолчанию) или CSV
+    upload_format = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if upload_format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Invalid format. Use 'ndjson' or 'csv'")
+    
+    from ingest import ingest_file
+
+    return await run_db(db, ingest_file, upload, upload_format, atomic=atomic, return_ids=return_ids)
+
 @router.put("/{transaction_id}", response_model=TransactionResponse)
+@db_endpoint
 def update_transaction(
     transaction_id: int,
     transaction_update: TransactionUpdate,
-    db: Session = Depends(get_db)
+    idempotency: Optional[IdempotentRequest] = Depends(idempotency_key),
+    db: Session = Depends(get_write_db)
 ):
-    db_transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
+    replay = replay_response(db, idempotency)
+    if replay:
+        return replay
+    
+    db_transaction = db.query(Transaction).filter(Transaction.id == transaction_id).with_for_update().first()
     if not db_transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
     # Проверяем, что тип транзакции допустим (если он обновляется)
-    if transaction_update.transaction_type and transaction_update.transaction_type not in ["deposit", "withdrawal"]:
+    if transaction_update.transaction_type and transaction_update.transaction_type not in TRANSACTION_TYPES:
         raise HTTPException(status_code=400, detail="Invalid transaction type. Use 'deposit' or 'withdrawal'")
     
-    # Сохраняем старое значение для пересчета баланса
-    old_goal_id = db_transaction.goal_id
+    # Откатываем влияние старых значений на баланс цели
+    apply_transaction(
+        db, db_transaction.goal_id, db_transaction.amount, db_transaction.transaction_type, db_transaction.created_at, sign=-1
+    )
     
     # Обновляем поля, которые были переданы
     for field, value in transaction_update.dict(exclude_unset=True).items():
         setattr(db_transaction, field, value)
     
+    # Применяем новые значения (сумма, тип или цель могли измениться)
+    apply_transaction(
+        db, db_transaction.goal_id, db_transaction.amount, db_transaction.transaction_type, db_transaction.created_at
+    )
+    publish_transaction_on_commit(db, "transaction.updated", db_transaction)
+    remember_response(db, idempotency, TransactionResponse.model_validate(db_transaction))
     db.commit()
     db.refresh(db_transaction)
     
-    # Пересчитываем баланс для старой и новой цели
-    from .goal import recalculate_goal_balance
-    recalculate_goal_balance(db, old_goal_id)
-    
-    if old_goal_id != db_transaction.goal_id:
-        recalculate_goal_balance(db, db_transaction.goal_id)
-    
     return db_transaction
 
 @router.delete("/{transaction_id}")
-def delete_transaction(transaction_id: int, db: Session = Depends(get_db)):
-    db_transaction = db.query(Transaction).filter(Transaction.id == transaction_id).first()
+@db_endpoint
+def delete_transaction(
+    transaction_id: int,
+    idempotency: Optional[IdempotentRequest] = Depends(idempotency_key),
+    db: Session = Depends(get_write_db)
+):
+    replay = replay_response(db, idempotency)
+    if replay:
+        return replay
+    
+    db_transaction = db.query(Transaction).filter(Transaction.id == transaction_id).with_for_update().first()
     if not db_transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
-    # Сохраняем ID цели для пересчета баланса
-    goal_id = db_transaction.goal_id
-    
+    # Откатываем влияние транзакции на баланс цели
+    apply_transaction(
+        db, db_transaction.goal_id, db_transaction.amount, db_transaction.transaction_type, db_transaction.created_at, sign=-1
+    )
     db.delete(db_transaction)
+    publish_on_commit(db, "transaction.deleted", {"id": transaction_id, "goal_id": db_transaction.goal_id})
+    result = {"message": "Transaction deleted successfully"}
+    remember_response(db, idempotency, result)
     db.commit()
     
-    # Пересчитываем баланс цели
-    from .goal import recalculate_goal_balance
-    recalculate_goal_balance(db, goal_id)
-    
-    return {"message": "Transaction deleted successfully"}
\ No newline at end of file
+    return result
\ No newline at end of file
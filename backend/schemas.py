@@ -1,12 +1,13 @@
-from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from datetime import date, datetime
+from typing import Any, Optional
+from money import Money
 
 
 # Схемы для целей
 class GoalBase(BaseModel):
     title: str
-    target_amount: float
+    target_amount: Money
     target_date: Optional[datetime] = None
     description: Optional[str] = None
     image_url: Optional[str] = None
@@ -18,7 +19,7 @@ class GoalCreate(GoalBase):
 
 class GoalUpdate(BaseModel):
     title: Optional[str] = None
-    target_amount: Optional[float] = None
+    target_amount: Optional[Money] = None
     target_date: Optional[datetime] = None
     description: Optional[str] = None
     image_url: Optional[str] = None
@@ -27,7 +28,7 @@ class GoalUpdate(BaseModel):
 
 class GoalResponse(GoalBase):
     id: int
-    current_balance: float
+    current_balance: Money
     is_active: bool
     created_at: datetime
 
@@ -35,10 +36,59 @@ class GoalResponse(GoalBase):
         from_attributes = True
 
 
+class GoalBalanceCheck(BaseModel):
+    goal_id: int
+    stored_balance: Money
+    calculated_balance: Money
+    difference: Money
+    is_consistent: bool
+
+
+class MonthlyInflow(BaseModel):
+    month: str # "YYYY-MM"
+    deposits: Money
+    withdrawals: Money
+    net: Money
+
+
+class GoalStats(BaseModel):
+    goal_id: int
+    title: str
+    target_amount: Money
+    current_balance: Money
+    progress: float # процент выполнения
+    total_deposits: Money
+    total_withdrawals: Money
+    deposit_count: int
+    withdrawal_count: int
+    average_deposit: Optional[Money] = None
+    first_transaction_at: Optional[datetime] = None
+    last_transaction_at: Optional[datetime] = None
+    target_date: Optional[datetime] = None
+    projected_completion_date: Optional[datetime] = None
+    on_track: Optional[bool] = None # успевает ли цель к target_date
+    monthly_inflow: list[MonthlyInflow]
+
+
+class GoalsStatsResponse(BaseModel):
+    total_target: Money
+    total_balance: Money
+    total_deposits: Money
+    total_withdrawals: Money
+    goals: list[GoalStats]
+
+
+class GoalHistoryBucket(BaseModel):
+    period_start: date
+    deposits: Money
+    withdrawals: Money
+    closing_balance: Money
+
+
 # Схемы для транзакций
 class TransactionBase(BaseModel):
     goal_id: int
-    amount: float
+    amount: Money
     transaction_type: str # "deposit" или "withdrawal"
     description: Optional[str] = None
 
@@ -48,10 +98,18 @@ class TransactionCreate(TransactionBase):
 
 
 class TransactionUpdate(BaseModel):
-    amount: Optional[float] = None
+    amount: Optional[Money] = None
     transaction_type: Optional[str] = None
     description: Optional[str] = None
 
+    # Поля можно не передавать, но явный null для них недопустим: колонки NOT NULL
+    @field_validator("amount", "transaction_type")
+    @classmethod
+    def reject_null(cls, value):
+        if value is None:
+            raise ValueError("Field may be omitted but not null")
+        return value
+
 
 class TransactionResponse(TransactionBase):
     id: int
@@ -60,6 +118,20 @@ class TransactionResponse(TransactionBase):
     class Config:
         from_attributes = True
 
+
+class BulkTransactionResult(BaseModel):
+    index: int
+    status: str # "created", "error" или "skipped"
+    id: Optional[int] = None
+    errors: list[str] = []
+
+
+class BulkTransactionResponse(BaseModel):
+    total: int
+    created: int
+    failed: int
+    results: list[BulkTransactionResult]
+
 # Схемы для настроек
 class SettingsBase(BaseModel):
     theme: Optional[str] = None
@@ -79,4 +151,44 @@ class SettingsResponse(BaseModel):
 
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+# Схемы для пакетного выполнения операций (/batch)
+class BatchOperation(BaseModel):
+    method: str
+    path: str  # путь эндпоинта, например "/goals/1"
+    query: dict[str, Any] = {}
+    body: Optional[Any] = None
+
+
+class BatchRequest(BaseModel):
+    operations: list[BatchOperation] = Field(..., min_length=1, max_length=100)
+    atomic: bool = False  # все или ничего: при первой ошибке пакет откатывается целиком
+
+
+class BatchResult(BaseModel):
+    status: int
+    body: Any = None
+
+
+class BatchResponse(BaseModel):
+    committed: bool
+    results: list[BatchResult]
+
+
+# Схемы фоновых задач (/jobs)
+class JobResponse(BaseModel):
+    id: str
+    name: str
+    params: dict[str, Any]
+    status: str  # queued, running, retrying, succeeded, failed, cancelled
+    attempts: int
+    result: Any = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
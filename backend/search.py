@@ -0,0 +1,272 @@
+"""Полнотекстовый поиск по целям и описаниям транзакций с учетом морфологии русского языка.
+
+SQLite: таблицы FTS5 goals_search и transactions_search (миграция v0007_full_text_search)
+содержат основы слов. Слова запроса приводятся к основам той же функцией, все они
+должны встретиться, последнее ищется по началу (поиск по мере ввода).
+
+Порядок результатов:
+- relevance - по bm25, среди SEARCH_RANK_WINDOW самых новых совпадений. Полное
+  ранжирование частого слова на миллионах строк стоит сотни миллисекунд, окно
+  ограничивает его стоимость;
+- recent - новые записи первыми, индекс читается только до конца страницы.
+Цели ранжируются полностью, совпадение в названии весит больше, чем в описании.
+
+PostgreSQL: to_tsvector/to_tsquery с конфигурацией russian по GIN-индексам, порядок тот же.
+
+Поиск идет только по данным арендатора сессии (миграция v0008_tenants). В SQLite
+порядок recent и поиск целей пересекают слова с токеном арендатора t<tenant_id>;
+relevance проверяет сохраненное значение tenant_id, чтобы bm25 не считал документы
+токена арендатора (их столько же, сколько у него транзакций). В PostgreSQL - условие по tenant_id.
+
+Триггеры SQLite только ставят вставленные и измененные строки в очередь search_pending
+(миграция v0010_search_queue), основы слов вычисляет приложение перед фиксацией своей
+транзакции записи (index_pending_rows). Поэтому другие клиенты SQLite могут писать
+в таблицы без функции ru_stem, а их строки попадают в поиск при следующей записи через приложение.
+
+Индекс SQLite перестраивается командой (например, после изменения stemmer.py):
+    python search.py rebuild
+"""
+import argparse
+import os
+from typing import Optional
+
+from sqlalchemy import Integer, column, event, func, literal_column, select, table, text, union_all
+from sqlalchemy.orm import Session
+
+from models import ArchivedTransaction, Goal, Transaction
+from schemas import GoalResponse, TransactionResponse
+from serialization import response_columns, row_dicts
+from stemmer import query_words, stem_word
+from tenants import DEFAULT_TENANT, tenant_of
+
+# Сколько самых новых совпадений ранжируется по релевантности
+SEARCH_RANK_WINDOW = int(os.getenv("SEARCH_RANK_WINDOW", "1000"))
+# Самый длинный префикс, для которого у таблиц FTS5 есть индекс (prefix в миграции)
+MAX_PREFIX = 6
+# Вес совпадения в названии цели относительно описания (bm25 в SQLite)
+TITLE_WEIGHT = 10.0
+
+SORT_ORDERS = ("relevance", "recent")
+
+goals_search = table("goals_search", column("rowid", Integer))
+transactions_search = table(
+    "transactions_search", column("rowid", Integer), column("transaction_type"), column("tenant_id")
+)
+
+
+# Таблицы, строки которых триггеры ставят в очередь индексации
+INDEXED_TABLES = {"goals", "transactions"}
+
+INDEX_PENDING_STATEMENTS = (
+    """INSERT OR REPLACE INTO goals_search(rowid, title, description, tenant)
+    SELECT g.id, ru_stem(g.title), ru_stem(g.description), 't' || g.tenant_id
+    FROM search_pending AS p JOIN goals AS g ON g.id = p.id WHERE p.source = 'goals'""",
+    # Транзакция могла уйти в архив в той же транзакции БД, строка индекса у нее остается
+    """INSERT OR REPLACE INTO transactions_search(rowid, description, scope, transaction_type, tenant_id)
+    SELECT t.id, ru_stem(t.description), 'g' || t.goal_id || ' t' || t.tenant_id, t.transaction_type, t.tenant_id
+    FROM search_pending AS p JOIN transactions AS t ON t.id = p.id WHERE p.source = 'transactions'
+    UNION ALL
+    SELECT t.id, ru_stem(t.description), 'g' || t.goal_id || ' t' || t.tenant_id, t.transaction_type, t.tenant_id
+    FROM search_pending AS p JOIN transactions_archive AS t ON t.id = p.id WHERE p.source = 'transactions'""",
+    "DELETE FROM search_pending",
+)
+
+
+def is_postgresql(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def index_pending_rows(db: Session):
+    """Индексирует строки из очереди search_pending основами слов и очищает очередь.
+
+    db - сессия или соединение приложения (с функцией ru_stem), например после вставки
+    строк мимо сессии. Удаленные до индексации строки пропускаются: их строки индекса
+    уже удалили триггеры.
+    """
+    if not db.execute(text("SELECT EXISTS (SELECT 1 FROM search_pending)")).scalar():
+        return
+    for statement in INDEX_PENDING_STATEMENTS:
+        db.execute(text(statement))
+
+
+@event.listens_for(Session, "before_commit", insert=True)
+def index_pending_rows_before_commit(session):
+    # Раньше versions.bump_table_versions, который забирает список измененных таблиц.
+    # Пока транзакция изменила таблицы, она держит блокировку записи SQLite, и очередь
+    # не пополняется другими писателями между чтением и очисткой
+    session.flush()
+    if INDEXED_TABLES & session.info.get("changed_tables", set()) and session.get_bind().dialect.name == "sqlite":
+        index_pending_rows(session)
+
+
+def fts_match(words: list[str], column_name: Optional[str] = None) -> str:
+    """Запрос FTS5: основы слов в кавычках, неявное И, последнее слово - по началу.
+
+    Префикс длиннее MAX_PREFIX без индекса требует слияния списков всех подходящих
+    слов, поэтому он укорачивается: полная основа все равно начинается с него.
+    """
+    stems = [stem_word(word) for word in words]
+    terms = " ".join([f'"{stem}"' for stem in stems[:-1]] + [f'"{stems[-1][:MAX_PREFIX]}"*'])
+    return f"{column_name}: ({terms})" if column_name else terms
+
+
+def session_tenant(db: Session) -> str:
+    return tenant_of(db) or DEFAULT_TENANT
+
+
+def ts_query(words: list[str]):
+    """Запрос PostgreSQL: все слова, последнее - по началу; стемминг выполняет конфигурация russian"""
+    return func.to_tsquery("russian", " & ".join(words[:-1] + [f"{words[-1]}:*"]))
+
+
+def ts_vector(*columns):
+    # Выражение совпадает с выражением GIN-индексов миграции, иначе индекс не используется
+    document = func.coalesce(columns[0], "")
+    for extra in columns[1:]:
+        document = document.op("||")(" ").op("||")(func.coalesce(extra, ""))
+    return func.to_tsvector("russian", document)
+
+
+def rows_in_order(db: Session, model, schema, ids: list[int]) -> list[dict]:
+    """Строки ответа для найденных id в порядке ранжирования"""
+    rows = {row["id"]: row for row in row_dicts(db.execute(select(*response_columns(model, schema)).where(model.id.in_(ids))))}
+    return [rows[row_id] for row_id in ids if row_id in rows]
+
+
+def search_goals(db: Session, query: str, skip: int = 0, limit: int = 50) -> list[dict]:
+    """Цели, в названии или описании которых встречаются все слова запроса"""
+    words = query_words(query)
+    if not words:
+        return []
+
+    if is_postgresql(db):
+        vector = ts_vector(Goal.title, Goal.description)
+        tsquery = ts_query(words)
+        statement = (
+            select(*response_columns(Goal, GoalResponse))
+            .where(vector.op("@@")(tsquery))
+            .order_by(func.ts_rank(vector, tsquery).desc(), Goal.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        return row_dicts(db.execute(statement))
+
+    match = f"{fts_match(words, '{title description}')} AND tenant: t{session_tenant(db)}"
+    ids = db.scalars(
+        select(goals_search.c.rowid)
+        .where(literal_column("goals_search").op("MATCH")(match))
+        .order_by(func.bm25(literal_column("goals_search"), TITLE_WEIGHT, 1.0, 0.0))
+        .offset(skip)
+        .limit(limit)
+    ).all()
+    return rows_in_order(db, Goal, GoalResponse, ids)
+
+
+def search_transactions(
+    db: Session,
+    query: str,
+    goal_id: Optional[int] = None,
+    transaction_type: Optional[str] = None,
+    sort: str = "relevance",
+    skip: int = 0,
+    limit: int = 50,
+) -> list[dict]:
+    """Транзакции, в описании которых встречаются все слова запроса, включая архивные"""
+    words = query_words(query)
+    if not words:
+        return []
+    # Окно ранжирования всегда покрывает запрошенную страницу
+    window = max(SEARCH_RANK_WINDOW, skip + limit)
+
+    if is_postgresql(db):
+        tsquery = ts_query(words)
+        matches = []
+        for model in (Transaction, ArchivedTransaction):
+            vector = ts_vector(model.description)
+            # Отбор по арендатору задается явно: условия сессии не распространяются на UNION
+            filters = [vector.op("@@")(tsquery), model.tenant_id == session_tenant(db)]
+            if goal_id is not None:
+                filters.append(model.goal_id == goal_id)
+            if transaction_type is not None:
+                filters.append(model.transaction_type == transaction_type)
+            matches.append(
+                select(*response_columns(model, TransactionResponse), func.ts_rank(vector, tsquery).label("rank")).where(*filters)
+            )
+        found = union_all(*matches).subquery()
+        if sort == "relevance":
+            found = select(found).order_by(found.c.id.desc()).limit(window).subquery()
+            order = [found.c.rank.desc(), found.c.id.desc()]
+        else:
+            order = [found.c.id.desc()]
+        statement = select(*[found.c[name] for name in TransactionResponse.model_fields]).order_by(*order)
+        return row_dicts(db.execute(statement.offset(skip).limit(limit)))
+
+    # Цель и арендатор - токены колонки scope, их списки документов пересекаются в индексе.
+    # Для relevance арендатор проверяется по значению: bm25 не считает документы его токена
+    tenant = session_tenant(db)
+    match = fts_match(words, "description")
+    if goal_id is not None:
+        match += f" AND scope: g{goal_id}"
+    if sort != "relevance":
+        match += f" AND scope: t{tenant}"
+    statement = select(transactions_search.c.rowid).where(literal_column("transactions_search").op("MATCH")(match))
+    if sort == "relevance":
+        statement = statement.where(transactions_search.c.tenant_id == tenant)
+    if transaction_type is not None:
+        statement = statement.where(transactions_search.c.transaction_type == transaction_type)
+
+    if sort == "relevance":
+        # bm25 считается только по колонке описания и только для окна новых совпадений
+        score = func.bm25(literal_column("transactions_search"), 1.0, 0.0).label("score")
+        newest = statement.add_columns(score).order_by(transactions_search.c.rowid.desc()).limit(window).subquery()
+        statement = select(newest.c.rowid).order_by(newest.c.score, newest.c.rowid.desc())
+    else:
+        statement = statement.order_by(transactions_search.c.rowid.desc())
+    ids = db.scalars(statement.offset(skip).limit(limit)).all()
+
+    # Архив читается, только если часть найденных транзакций не нашлась среди живых
+    rows = {}
+    for model in (Transaction, ArchivedTransaction):
+        missing = [row_id for row_id in ids if row_id not in rows]
+        if missing:
+            rows.update((row["id"], row) for row in rows_in_order(db, model, TransactionResponse, missing))
+    return [rows[row_id] for row_id in ids if row_id in rows]
+
+
+def rebuild_search_index(db: Session):
+    """Заново заполняет поисковые таблицы SQLite из целей, транзакций и архива"""
+    for statement in (
+        "DELETE FROM search_pending",
+        "DELETE FROM goals_search",
+        "DELETE FROM transactions_search",
+        """INSERT INTO goals_search(rowid, title, description, tenant)
+        SELECT id, ru_stem(title), ru_stem(description), 't' || tenant_id FROM goals""",
+        """INSERT INTO transactions_search(rowid, description, scope, transaction_type, tenant_id)
+        SELECT id, ru_stem(description), 'g' || goal_id || ' t' || tenant_id, transaction_type, tenant_id FROM transactions
+        UNION ALL
+        SELECT id, ru_stem(description), 'g' || goal_id || ' t' || tenant_id, transaction_type, tenant_id
+        FROM transactions_archive""",
+        "INSERT INTO goals_search(goals_search) VALUES ('optimize')",
+        "INSERT INTO transactions_search(transactions_search) VALUES ('optimize')",
+    ):
+        db.execute(text(statement))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Поисковый индекс целей и транзакций (SQLite)")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from database import WriteSessionLocal
+
+    with WriteSessionLocal() as db:
+        if is_postgresql(db):
+            print("PostgreSQL keeps full-text indexes up to date itself")
+            return
+        rebuild_search_index(db)
+        print("Search index rebuilt")
+
+
+if __name__ == "__main__":
+    main()
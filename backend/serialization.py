@@ -0,0 +1,49 @@
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def json_default(value):
+    # Денежные суммы (Decimal) отдаются в JSON числами, как и в схемах ответа
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class APIJSONResponse(ORJSONResponse):
+    """ORJSONResponse с поддержкой Decimal"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def response_columns(model, schema: type[BaseModel]) -> list:
+    """Атрибуты модели, соответствующие полям схемы ответа, в порядке полей схемы.
+
+    Берутся атрибуты ORM, а не колонки __table__: только к запросам по ним
+    применяется отбор по арендатору сессии (см. tenants.py).
+    """
+    return [getattr(model, name) for name in schema.model_fields]
+
+
+def row_dicts(rows) -> list[dict]:
+    """Переводит строки колоночного запроса в словари без создания ORM-объектов"""
+    return [row._asdict() for row in rows]
+
+
+def json_response(content, response: Response) -> APIJSONResponse:
+    """Сериализует готовые данные через orjson, минуя повторную проверку по response_model.
+
+    Заголовки, выставленные обработчиком в response (ETag, X-Next-Cursor), переносятся в ответ.
+    """
+    result = APIJSONResponse(content)
+    result.headers.raw.extend(response.headers.raw)
+    return result
@@ -0,0 +1,74 @@
+"""Режим шардов: у каждого арендатора, кроме default, свой файл SQLite <tenant>.db.
+
+Каталог задает TENANT_SHARDS_DIR. Пусто - все арендаторы в одной БД DATABASE_URL
+(арендатор default живет в ней и в режиме шардов). Выбор БД арендатора для сессий
+и фоновых задач - database.tenant_database / tenant_databases.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+from tenants import TENANT_PATTERN
+
+TENANT_SHARDS_DIR = os.getenv("TENANT_SHARDS_DIR", "")
+# Сколько движков файлов арендаторов держать открытыми одновременно
+TENANT_ENGINE_CACHE = int(os.getenv("TENANT_ENGINE_CACHE", "32"))
+
+
+class ShardCache:
+    """Движки файлов арендаторов в режиме шардов, не больше maxsize открытых (LRU).
+
+    Файл арендатора создается и мигрирует при первом обращении. Вытесненный движок
+    закрывает свободные соединения, занятые закрываются при возврате в пул.
+    Каждый файл содержит только одного арендатора, поэтому время запросов арендатора
+    не зависит от объема данных остальных.
+    """
+
+    def __init__(self, directory: str, maxsize: int = TENANT_ENGINE_CACHE):
+        self.directory = directory
+        self.maxsize = maxsize
+        self._databases: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, tenant: str) -> str:
+        return os.path.join(self.directory, f"{tenant}.db")
+
+    def get(self, tenant: str):
+        """Database файла арендатора (см. database.Database)"""
+        # Идентификатор входит в путь файла
+        if not TENANT_PATTERN.match(tenant):
+            raise ValueError(f"Invalid tenant id '{tenant}'")
+        with self._lock:
+            database = self._databases.get(tenant)
+            if database is not None:
+                self._databases.move_to_end(tenant)
+                return database
+
+        # Миграция выполняется вне блокировки, чтобы не задерживать остальных арендаторов:
+        # одновременный запуск безопасен (см. migrate.py), лишний движок закрывается
+        from database import Database, create_app_engine, instrument_engine
+        from migrate import run_migrations
+
+        os.makedirs(self.directory, exist_ok=True)
+        database = Database(create_app_engine(f"sqlite:///{self.path(tenant)}"))
+        instrument_engine(database.engine)
+        run_migrations(database.engine)
+        with self._lock:
+            existing = self._databases.get(tenant)
+            if existing is not None:
+                database.engine.dispose()
+                return existing
+            self._databases[tenant] = database
+            while len(self._databases) > self.maxsize:
+                _, evicted = self._databases.popitem(last=False)
+                evicted.engine.dispose()
+        return database
+
+    def tenants(self) -> list[str]:
+        """Арендаторы, у которых уже есть файл"""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-3] for name in os.listdir(self.directory) if name.endswith(".db"))
+
+
+shards = ShardCache(TENANT_SHARDS_DIR) if TENANT_SHARDS_DIR else None
@@ -0,0 +1,142 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import Float, case, cast, func, select, type_coerce
+from sqlalchemy.orm import Session
+
+from models import Goal, GoalDailyBalance, GoalOpeningBalance, Transaction
+from money import MoneyType, quantize
+
+is_deposit = Transaction.transaction_type == "deposit"
+is_withdrawal = Transaction.transaction_type == "withdrawal"
+
+
+def month_expression(db: Session, column):
+    """Выражение 'YYYY-MM' для группировки по месяцам в диалекте текущей БД"""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime("%Y-%m", column)
+
+
+def project_completion(goal_row, now: datetime) -> tuple[Optional[datetime], Optional[bool]]:
+    """Прогнозирует дату достижения цели по среднему чистому притоку в день"""
+    balance = goal_row.current_balance or 0
+    remaining = goal_row.target_amount - balance
+    if remaining <= 0:
+        projected = goal_row.last_transaction_at or now
+    elif goal_row.first_transaction_at is None:
+        return None, None
+    else:
+        days = max((now - goal_row.first_transaction_at).total_seconds() / 86400, 1)
+        daily_net = float(goal_row.total_deposits - goal_row.total_withdrawals) / days
+        if daily_net <= 0:
+            return None, False if goal_row.target_date else None
+        projected = now + timedelta(days=float(remaining) / daily_net)
+
+    on_track = projected <= goal_row.target_date if goal_row.target_date else None
+    return projected, on_track
+
+
+def collect_goal_stats(db: Session, goal_id: Optional[int] = None, months: int = 12) -> list[dict]:
+    """Собирает статистику целей двумя сгруппированными запросами: итоги и помесячный приток.
+
+    Итоги по архивной части истории берутся из снимка goal_opening_balances (одна строка
+    на цель, поэтому в группировке ее значения читаются через MAX), помесячный приток -
+    из дневных итогов, которые архивация не меняет.
+    """
+    opening = GoalOpeningBalance
+    deposits = func.coalesce(func.sum(case((is_deposit, Transaction.amount))), 0) + func.coalesce(func.max(opening.deposits), 0)
+    deposit_count = func.count(case((is_deposit, 1))) + func.coalesce(func.max(opening.deposit_count), 0)
+    totals = (
+        select(
+            Goal.id,
+            Goal.title,
+            Goal.target_amount,
+            Goal.current_balance,
+            Goal.target_date,
+            type_coerce(deposits, MoneyType).label("total_deposits"),
+            type_coerce(
+                func.coalesce(func.sum(case((is_withdrawal, Transaction.amount))), 0)
+                + func.coalesce(func.max(opening.withdrawals), 0),
+                MoneyType,
+            ).label("total_withdrawals"),
+            deposit_count.label("deposit_count"),
+            (func.count(case((is_withdrawal, 1))) + func.coalesce(func.max(opening.withdrawal_count), 0)).label("withdrawal_count"),
+            # Среднее по копейкам дробное и без явного типа, поэтому приводится к MoneyType
+            type_coerce(cast(deposits, Float) / func.nullif(deposit_count, 0), MoneyType).label("average_deposit"),
+            func.coalesce(func.min(opening.first_transaction_at), func.min(Transaction.created_at)).label("first_transaction_at"),
+            func.coalesce(func.max(Transaction.created_at), func.max(opening.last_transaction_at)).label("last_transaction_at"),
+        )
+        .outerjoin(Transaction, Transaction.goal_id == Goal.id)
+        .outerjoin(opening, opening.goal_id == Goal.id)
+        .group_by(Goal.id)
+        .order_by(Goal.id)
+    )
+
+    month = month_expression(db, GoalDailyBalance.date).label("month")
+    since = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(months - 1):
+        since = (since - timedelta(days=1)).replace(day=1)
+    monthly = (
+        select(
+            GoalDailyBalance.goal_id,
+            month,
+            func.sum(GoalDailyBalance.deposits).label("deposits"),
+            func.sum(GoalDailyBalance.withdrawals).label("withdrawals"),
+        )
+        # Дневные итоги принадлежат арендатору через цель: JOIN получает отбор по арендатору сессии
+        .join(Goal, Goal.id == GoalDailyBalance.goal_id)
+        .where(GoalDailyBalance.date >= since.date())
+        .group_by(GoalDailyBalance.goal_id, month)
+        .order_by(GoalDailyBalance.goal_id, month)
+    )
+
+    if goal_id is not None:
+        totals = totals.where(Goal.id == goal_id)
+        monthly = monthly.where(GoalDailyBalance.goal_id == goal_id)
+
+    monthly_by_goal = defaultdict(list)
+    for row in db.execute(monthly):
+        monthly_by_goal[row.goal_id].append({
+            "month": row.month,
+            "deposits": row.deposits,
+            "withdrawals": row.withdrawals,
+            "net": row.deposits - row.withdrawals,
+        })
+
+    now = datetime.utcnow()
+    result = []
+    for row in db.execute(totals):
+        projected, on_track = project_completion(row, now)
+        balance = row.current_balance or 0
+        result.append({
+            "goal_id": row.id,
+            "title": row.title,
+            "target_amount": row.target_amount,
+            "current_balance": balance,
+            "progress": round(balance / row.target_amount * 100, 2) if row.target_amount else 0.0,
+            "total_deposits": row.total_deposits,
+            "total_withdrawals": row.total_withdrawals,
+            "deposit_count": row.deposit_count,
+            "withdrawal_count": row.withdrawal_count,
+            "average_deposit": None if row.average_deposit is None else quantize(row.average_deposit),
+            "first_transaction_at": row.first_transaction_at,
+            "last_transaction_at": row.last_transaction_at,
+            "target_date": row.target_date,
+            "projected_completion_date": projected,
+            "on_track": on_track,
+            "monthly_inflow": monthly_by_goal[row.id],
+        })
+    return result
+
+
+def summarize(goals: list[dict]) -> dict:
+    """Итоги по всем целям для дашборда"""
+    return {
+        "total_target": sum(goal["target_amount"] for goal in goals),
+        "total_balance": sum(goal["current_balance"] for goal in goals),
+        "total_deposits": sum(goal["total_deposits"] for goal in goals),
+        "total_withdrawals": sum(goal["total_withdrawals"] for goal in goals),
+        "goals": goals,
+    }
@@ -0,0 +1,76 @@
+"""Стемминг русского текста для полнотекстового поиска (алгоритм Snowball/Портера для русского языка).
+
+В SQLite функция stem_text регистрируется на каждом соединении приложения как ru_stem:
+поисковые таблицы FTS5 хранят основы слов (search.index_pending_rows), а запрос
+приводится к тем же основам.
+Поэтому «отпуск», «отпуска» и «отпуском» находят друг друга. PostgreSQL использует
+собственную конфигурацию russian и эту функцию не вызывает.
+"""
+import re
+from functools import lru_cache
+from typing import Optional
+
+WORD = re.compile(r"\w+")
+CYRILLIC = re.compile(r"[а-я]")
+
+RV = re.compile(r"^(.*?[аеиоуыэюя])(.*)$")
+PERFECTIVE_GERUND = re.compile(r"((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$")
+REFLEXIVE = re.compile(r"(с[яь])$")
+ADJECTIVE = re.compile(r"(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|ую|юю|ая|яя|ою|ею)$")
+PARTICIPLE = re.compile(r"((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$")
+VERB = re.compile(
+    r"((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)"
+    r"|((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$"
+)
+NOUN = re.compile(
+    r"(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$"
+)
+DERIVATIONAL_R2 = re.compile(r".*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$")
+DERIVATIONAL = re.compile(r"ость?$")
+SUPERLATIVE = re.compile(r"(ейше|ейш)$")
+
+
+@lru_cache(maxsize=65536)
+def stem_word(word: str) -> str:
+    """Основа слова. Слова не на кириллице только приводятся к нижнему регистру"""
+    word = word.lower().replace("ё", "е")
+    match = RV.match(word)
+    if not match or not CYRILLIC.search(word):
+        return word
+
+    prefix, rv = match.groups()
+    # Шаг 1: деепричастие или возвратная частица и окончание прилагательного, глагола, существительного
+    stripped = PERFECTIVE_GERUND.sub("", rv, 1)
+    if stripped == rv:
+        rv = REFLEXIVE.sub("", rv, 1)
+        stripped = ADJECTIVE.sub("", rv, 1)
+        if stripped != rv:
+            rv = PARTICIPLE.sub("", stripped, 1)
+        else:
+            stripped = VERB.sub("", rv, 1)
+            rv = NOUN.sub("", rv, 1) if stripped == rv else stripped
+    else:
+        rv = stripped
+
+    # Шаги 2-4: «и» на конце, словообразовательный суффикс «ость», «нн», превосходная степень и «ь»
+    rv = re.sub("и$", "", rv)
+    if DERIVATIONAL_R2.match(rv):
+        rv = DERIVATIONAL.sub("", rv, 1)
+    stripped = re.sub("ь$", "", rv)
+    if stripped == rv:
+        rv = re.sub("нн$", "н", SUPERLATIVE.sub("", rv, 1))
+    else:
+        rv = stripped
+    return prefix + rv
+
+
+def stem_text(text: Optional[str]) -> Optional[str]:
+    """Текст из основ слов через пробел (None для пустого значения)"""
+    if text is None:
+        return None
+    return " ".join(stem_word(word) for word in WORD.findall(text))
+
+
+def query_words(query: str) -> list[str]:
+    """Слова поискового запроса: знаки препинания и операторы отбрасываются"""
+    return [word.lower() for word in WORD.findall(query)]
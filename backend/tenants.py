@@ -0,0 +1,126 @@
+"""Арендаторы (tenants): несколько пользователей или семей в одной установке.
+
+Арендатор запроса передается заголовком X-Tenant-ID и подтверждается заголовком
+X-Tenant-Token - подписью идентификатора секретом установки TENANT_SECRET (EventSource
+заголовки не передает, поэтому для него есть параметры запроса tenant и tenant_token).
+Токены выдает администратор командой python tenants.py token <tenant>.
+Без TENANT_SECRET установка однопользовательская: все запросы относятся к арендатору
+default, которому миграция v0008_tenants отдала все существовавшие данные, а другие
+арендаторы отклоняются. Сам X-Tenant-ID без токена ничего не удостоверяет.
+
+Арендатор записывается в info сессии запроса (database.get_db / get_write_db).
+Для таких сессий каждый ORM-запрос к моделям с примесью TenantScoped получает
+условие tenant_id = арендатор, а новые объекты - его tenant_id, поэтому эндпоинты,
+пакеты /batch и загрузка не передают арендатора явно. Сессии без арендатора
+(фоновые задачи, архивация, CLI) видят данные всех арендаторов.
+Запросы мимо ORM (text, таблицы FTS5, __table__) должны отбирать арендатора сами.
+"""
+import argparse
+import hashlib
+import hmac
+import os
+import re
+from typing import Optional
+
+from fastapi import Header, HTTPException, Query, Request
+from sqlalchemy import Column, String, event
+from sqlalchemy.orm import Session, with_loader_criteria
+
+TENANT_HEADER = "X-Tenant-ID"
+TENANT_TOKEN_HEADER = "X-Tenant-Token"
+DEFAULT_TENANT = "default"
+# Секрет подписи токенов арендаторов; пусто - доступен только арендатор default
+TENANT_SECRET = os.getenv("TENANT_SECRET", "")
+# Только строчные латинские буквы и цифры: идентификатор входит в имя файла шарда
+# и в токен поискового индекса, где другие символы разделяют слова
+TENANT_PATTERN = re.compile(r"^[a-z0-9]{1,64}$")
+
+
+class TenantScoped:
+    """Примесь моделей с данными арендатора: колонка tenant_id и автоматический отбор по ней"""
+
+    tenant_id = Column(String(64), nullable=False, default=DEFAULT_TENANT)
+
+
+def validate_tenant(tenant: str) -> str:
+    if not TENANT_PATTERN.match(tenant):
+        raise HTTPException(status_code=400, detail="Invalid tenant id. Use 1-64 lowercase latin letters and digits")
+    return tenant
+
+
+def sign_tenant(tenant: str, secret: str) -> str:
+    """Токен арендатора: HMAC-SHA256 идентификатора на секрете установки"""
+    return hmac.new(secret.encode(), tenant.encode(), hashlib.sha256).hexdigest()
+
+
+async def current_tenant(
+    request: Request,
+    x_tenant_id: Optional[str] = Header(None),
+    x_tenant_token: Optional[str] = Header(None),
+    tenant: Optional[str] = Query(None, include_in_schema=False),
+    tenant_token: Optional[str] = Query(None, include_in_schema=False),
+) -> str:
+    """Зависимость: арендатор запроса из X-Tenant-ID (или tenant), подтвержденный токеном.
+
+    С TENANT_SECRET токен обязателен для любого арендатора, включая default (401).
+    Без него принимается только default (403 для остальных).
+    """
+    resolved = validate_tenant(x_tenant_id or tenant or DEFAULT_TENANT)
+    if not TENANT_SECRET:
+        if resolved != DEFAULT_TENANT:
+            raise HTTPException(status_code=403, detail="Tenants other than default require TENANT_SECRET on the server")
+    else:
+        token = x_tenant_token or tenant_token
+        if not token or not hmac.compare_digest(token, sign_tenant(resolved, TENANT_SECRET)):
+            raise HTTPException(status_code=401, detail="Valid X-Tenant-ID and X-Tenant-Token required")
+    request.state.tenant = resolved
+    return resolved
+
+
+def tenant_of(db) -> Optional[str]:
+    """Арендатор сессии (для AsyncSession - ее синхронной сессии), None - сессия без арендатора"""
+    return getattr(db, "sync_session", db).info.get("tenant")
+
+
+def request_tenant(request: Optional[Request]) -> Optional[str]:
+    return getattr(request.state, "tenant", None) if request is not None else None
+
+
+@event.listens_for(Session, "do_orm_execute")
+def scope_statement_to_tenant(orm_execute_state):
+    # Условие добавляется и в JOIN, и в массовые UPDATE/DELETE; догрузка колонок
+    # и связей относится к уже отобранным объектам
+    tenant = orm_execute_state.session.info.get("tenant")
+    if tenant is None or orm_execute_state.is_column_load or orm_execute_state.is_relationship_load:
+        return
+    if orm_execute_state.is_select or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.statement = orm_execute_state.statement.options(
+            with_loader_criteria(TenantScoped, lambda cls: cls.tenant_id == tenant, include_aliases=True)
+        )
+
+
+@event.listens_for(Session, "before_flush")
+def assign_tenant(session, flush_context, instances):
+    tenant = session.info.get("tenant")
+    if tenant is None:
+        return
+    for obj in session.new:
+        if isinstance(obj, TenantScoped) and obj.tenant_id is None:
+            obj.tenant_id = tenant
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Токены арендаторов (подпись секретом TENANT_SECRET)")
+    parser.add_argument("command", choices=["token"])
+    parser.add_argument("tenant")
+    args = parser.parse_args()
+
+    if not TENANT_SECRET:
+        parser.error("TENANT_SECRET is not set")
+    if not TENANT_PATTERN.match(args.tenant):
+        parser.error("tenant id must be 1-64 lowercase latin letters and digits")
+    print(sign_tenant(args.tenant, TENANT_SECRET))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,23 @@
+import os
 import sys
+import tempfile
 from pathlib import Path
 
 # Добавляем путь к backend для импорта модулей
 sys.path.append(str(Path(__file__).parent))
 
+# Тесты работают с временной БД, а не с файлом разработчика: архивация и сверка
+# балансов в тестах обрабатывают все строки базы
+if "piggy-test-" not in os.environ.get("DATABASE_URL", ""):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='piggy-test-'), 'test.db')}"
+
 from fastapi.testclient import TestClient
-from database import Base, engine
+from database import engine
 from models import Settings
+from migrate import run_migrations
 
-# Создаем таблицы до импорта приложения
-Base.metadata.create_all(bind=engine)
+# Применяем миграции до импорта приложения
+run_migrations(engine)
 
 # Импортируем приложение после инициализации базы
 from main import app
@@ -20,8 +28,9 @@ client = TestClient(app)
 def test_create_and_get_settings():
     """Тестирование создания и получения настроек"""
     # Удаляем существующую таблицу и создаем заново
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    # (только таблицу настроек: остальные таблицы и поисковые триггеры нужны другим тестам)
+    Settings.__table__.drop(bind=engine)
+    Settings.__table__.create(bind=engine)
     
     # Получаем настройки (должны создаться автоматически)
     response = client.get("/settings/")
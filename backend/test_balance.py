@@ -0,0 +1,84 @@
+import pytest
+from conftest import client, create_goal, engine, get_balance
+
+
+def test_balance_follows_transaction_writes():
+    """Баланс цели изменяется инкрементально при создании, изменении и удалении транзакций"""
+    goal_id = create_goal()
+
+    response = client.post("/transactions/", json={"goal_id": goal_id, "amount": 300.0, "transaction_type": "deposit"})
+    transaction_id = response.json()["id"]
+    client.post("/transactions/", json={"goal_id": goal_id, "amount": 50.0, "transaction_type": "withdrawal"})
+    assert get_balance(goal_id) == 250.0
+
+    # Изменение суммы и типа транзакции
+    client.put(f"/transactions/{transaction_id}", json={"amount": 100.0})
+    assert get_balance(goal_id) == 50.0
+    client.put(f"/transactions/{transaction_id}", json={"transaction_type": "withdrawal"})
+    assert get_balance(goal_id) == -150.0
+
+    client.delete(f"/transactions/{transaction_id}")
+    assert get_balance(goal_id) == -50.0
+
+    check = client.get(f"/goals/{goal_id}/verify-balance").json()
+    assert check["is_consistent"], f"Balance drift detected: {check}"
+
+
+def test_recalculate_balance_repairs_drift():
+    """Явный пересчет восстанавливает баланс, разошедшийся с историей транзакций"""
+    goal_id = create_goal()
+    client.post("/transactions/", json={"goal_id": goal_id, "amount": 120.0, "transaction_type": "deposit"})
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE goals SET current_balance = 999 WHERE id = ?", (goal_id,))
+    assert not client.get(f"/goals/{goal_id}/verify-balance").json()["is_consistent"]
+
+    response = client.post(f"/goals/{goal_id}/recalculate-balance")
+    assert response.status_code == 200
+    assert response.json()["current_balance"] == 120.0
+
+
+def test_concurrent_writes_keep_balance_consistent():
+    """Конкурентные пополнения, пересчеты и повторное удаление не теряют изменений баланса"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    goal_id = create_goal()
+    transaction_id = client.post(
+        "/transactions/", json={"goal_id": goal_id, "amount": 5.0, "transaction_type": "deposit"}
+    ).json()["id"]
+    # Удаляемая транзакция не последняя: SQLite может переиспользовать максимальный rowid
+    client.post("/transactions/", json={"goal_id": goal_id, "amount": 2.0, "transaction_type": "deposit"})
+
+    def write(number):
+        if number % 10 == 0:
+            return client.post(f"/goals/{goal_id}/recalculate-balance").status_code
+        if number in (1, 2):
+            return client.delete(f"/transactions/{transaction_id}").status_code
+        return client.post(
+            "/transactions/", json={"goal_id": goal_id, "amount": 1.01, "transaction_type": "deposit"}
+        ).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        statuses = list(pool.map(write, range(40)))
+
+    # Транзакция удаляется ровно один раз, остальные запросы записи успешны
+    assert sorted(statuses[1:3]) == [200, 404]
+    assert all(status == 200 for number, status in enumerate(statuses) if number not in (1, 2))
+    assert get_balance(goal_id) == pytest.approx(2 + 34 * 1.01)
+    assert client.get(f"/goals/{goal_id}/verify-balance").json()["is_consistent"]
+
+
+def test_money_is_exact_in_minor_units():
+    """Суммы хранятся в копейках: тысяча пополнений по 0.10 дают ровно 100"""
+    goal_id = create_goal()
+    client.post("/transactions/bulk", json=[{"goal_id": goal_id, "amount": 0.1, "transaction_type": "deposit"}] * 1000)
+    client.post("/transactions/", json={"goal_id": goal_id, "amount": 2.675, "transaction_type": "deposit"})
+    assert get_balance(goal_id) == 102.68
+
+    check = client.get(f"/goals/{goal_id}/verify-balance").json()
+    assert check["is_consistent"] and check["difference"] == 0
+    assert client.get(f"/goals/{goal_id}/stats").json()["total_deposits"] == 102.68
+
+    with engine.connect() as conn:
+        raw = conn.exec_driver_sql("SELECT amount, typeof(amount) FROM transactions WHERE goal_id = ? LIMIT 1", (goal_id,)).one()
+    assert tuple(raw) == (10, "integer")
@@ -0,0 +1,75 @@
+import pytest
+from conftest import client, create_goal, get_balance
+
+
+def test_batch_runs_operations_in_one_transaction():
+    """Пакет операций: результаты по каждой операции, откат ошибочной или всего пакета (atomic)"""
+    goal_id = create_goal()
+    deposit = {"method": "POST", "path": "/transactions/", "body": {"goal_id": goal_id, "amount": 5.0, "transaction_type": "deposit"}}
+    missing = {"method": "DELETE", "path": "/transactions/999999999"}
+
+    data = client.post("/batch/", json={"operations": [
+        {"method": "GET", "path": "/settings/"},
+        deposit,
+        missing,
+        {"method": "PUT", "path": f"/goals/{goal_id}", "body": {"title": "Из пакета"}},
+    ]}).json()
+    assert data["committed"]
+    assert [result["status"] for result in data["results"]] == [200, 200, 404, 200]
+    assert data["results"][0]["body"]["currency"] == "RUB"
+    assert data["results"][3]["body"]["current_balance"] == 5.0
+    assert client.get(f"/goals/{goal_id}").json()["title"] == "Из пакета"
+
+    # С atomic ошибка одной операции откатывает весь пакет
+    data = client.post("/batch/", json={"atomic": True, "operations": [deposit, missing, deposit]}).json()
+    assert not data["committed"]
+    assert [result["status"] for result in data["results"]] == [200, 404]
+    assert get_balance(goal_id) == pytest.approx(5.0)
+
+
+def test_batch_operation_errors_stay_in_their_result(monkeypatch):
+    """Ошибка БД или кода обработчика откатывает только свою операцию, пакет фиксируется"""
+    from fastapi.routing import APIRoute
+    from conftest import app
+    from models import Goal
+
+    goal_id = create_goal()
+    reset = next(
+        route for route in app.routes
+        if isinstance(route, APIRoute) and route.path == "/goals/{goal_id}/reset-progress"
+    )
+
+    def duplicate_goal(db):
+        db.add(Goal(id=goal_id, title="Дубликат", target_amount=1))
+        db.flush()
+
+    def broken(db):
+        raise RuntimeError("boom")
+
+    deposit = {"method": "POST", "path": "/transactions/", "body": {"goal_id": goal_id, "amount": 7.0, "transaction_type": "deposit"}}
+    reset_operation = {"method": "POST", "path": f"/goals/{goal_id}/reset-progress"}
+    for handler, status in ((duplicate_goal, 409), (broken, 500)):
+        monkeypatch.setattr(reset.endpoint, "__wrapped__", handler)
+        data = client.post("/batch/", json={"operations": [deposit, reset_operation, deposit]}).json()
+        assert data["committed"]
+        assert [result["status"] for result in data["results"]] == [200, status, 200]
+    assert get_balance(goal_id) == pytest.approx(28.0)
+
+
+def test_batch_bulk_ingestion_with_list_body():
+    """POST /transactions/bulk в пакете принимает список строк; откат atomic-загрузки не трогает пакет"""
+    goal_id = create_goal()
+    deposit = {"method": "POST", "path": "/transactions/", "body": {"goal_id": goal_id, "amount": 5.0, "transaction_type": "deposit"}}
+    rows = [{"goal_id": goal_id, "amount": 1.0, "transaction_type": "deposit"}] * 3
+
+    data = client.post("/batch/", json={"operations": [
+        deposit,
+        {"method": "POST", "path": "/transactions/bulk", "body": rows},
+        {"method": "POST", "path": "/transactions/bulk", "query": {"atomic": True}, "body": rows + [{"goal_id": goal_id}]},
+        {"method": "POST", "path": "/transactions/bulk", "body": {"goal_id": goal_id}},
+    ]}).json()
+    assert data["committed"]
+    assert [result["status"] for result in data["results"]] == [200, 200, 200, 422]
+    assert data["results"][1]["body"]["created"] == 3
+    assert data["results"][2]["body"]["created"] == 0
+    assert get_balance(goal_id) == pytest.approx(8.0)
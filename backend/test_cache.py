@@ -0,0 +1,68 @@
+from conftest import ADMIN, client, create_goal, get_balance
+
+
+def test_goal_cache_invalidated_by_writes():
+    """Повторное чтение цели обслуживается из кэша, запись транзакции меняет версию в ключе кэша"""
+    from cache import goal_cache
+
+    goal_id = create_goal()
+    get_balance(goal_id)
+    hits = goal_cache.hits
+    assert get_balance(goal_id) == 0.0
+    assert goal_cache.hits == hits + 1
+
+    client.post("/transactions/", json={"goal_id": goal_id, "amount": 25.0, "transaction_type": "deposit"})
+    assert get_balance(goal_id) == 25.0
+    client.put(f"/goals/{goal_id}", json={"title": "Новое название"})
+    assert client.get(f"/goals/{goal_id}").json()["title"] == "Новое название"
+    assert client.get("/cache/stats").status_code == 403
+    assert any(item["name"] == "goals" for item in client.get("/cache/stats", headers=ADMIN).json())
+
+
+def test_conditional_requests():
+    """Неизмененные данные возвращаются как 304 по If-None-Match, запись меняет ETag"""
+    goal_id = create_goal()
+    response = client.get(f"/goals/{goal_id}")
+    etag = response.headers["ETag"]
+    assert client.get(f"/goals/{goal_id}", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/transactions/", json={"goal_id": goal_id, "amount": 5.0, "transaction_type": "deposit"})
+    response = client.get(f"/goals/{goal_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    etag = client.get("/transactions/").headers["ETag"]
+    assert client.get("/transactions/", headers={"If-None-Match": etag}).status_code == 304
+    client.post("/transactions/bulk", json=[{"goal_id": goal_id, "amount": 1.0, "transaction_type": "deposit"}])
+    assert client.get("/transactions/", headers={"If-None-Match": etag}).status_code == 200
+
+    etag = client.get("/settings/").headers["ETag"]
+    client.put("/settings/", json={"theme": "dark"})
+    assert client.get("/settings/", headers={"If-None-Match": etag}).status_code == 200
+    client.put("/settings/", json={"theme": "light"})
+
+
+def test_cache_hit_does_not_query_database():
+    """Повторное чтение цели не обращается к БД: версии таблиц берутся из кэша процесса"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    goal_id = create_goal()
+    get_balance(goal_id)
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", count_statement)
+    try:
+        assert get_balance(goal_id) == 0.0
+        assert statements == []
+
+        # Запись в этом процессе сразу дает новые версии
+        client.post("/transactions/", json={"goal_id": goal_id, "amount": 10.0, "transaction_type": "deposit"})
+        statements.clear()
+        assert get_balance(goal_id) == 10.0
+        assert any("table_versions" in statement for statement in statements)
+    finally:
+        event.remove(Engine, "before_cursor_execute", count_statement)
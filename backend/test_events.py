@@ -0,0 +1,31 @@
+from conftest import client, create_goal
+
+
+def test_write_events_are_published_after_commit():
+    import asyncio
+    from events import broker
+    from tenants import DEFAULT_TENANT
+
+    goal_id = create_goal()
+
+    async def collect_events():
+        queue = broker.subscribe(DEFAULT_TENANT)
+        try:
+            await asyncio.to_thread(
+                client.post, "/transactions/", json={"goal_id": goal_id, "amount": 7.0, "transaction_type": "deposit"}
+            )
+            # Ошибочная запись откатывается и ничего не публикует
+            await asyncio.to_thread(
+                client.post, "/transactions/", json={"goal_id": goal_id, "amount": 1.0, "transaction_type": "bonus"}
+            )
+            await asyncio.to_thread(client.put, f"/goals/{goal_id}", json={"title": "Новое название"})
+            return [await asyncio.wait_for(queue.get(), 5) for _ in range(3)], queue.empty()
+        finally:
+            broker.unsubscribe(queue)
+
+    events, drained = asyncio.run(collect_events())
+    assert drained
+    assert [event["type"] for event in events] == ["goal.balance", "transaction.created", "goal.updated"]
+    assert events[0] == {"type": "goal.balance", "goal_id": goal_id, "current_balance": 7.0}
+    assert events[1]["transaction"]["amount"] == 7.0
+    assert events[2]["goal"]["title"] == "Новое название"
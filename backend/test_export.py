@@ -0,0 +1,41 @@
+import pytest
+from conftest import client, create_goal
+
+
+def test_export_streams_filtered_history():
+    import csv
+    import io
+    import json
+
+    goal_id = create_goal()
+    other_goal_id = create_goal()
+    client.post("/transactions/bulk", json=[
+        {"goal_id": goal_id, "amount": float(amount), "transaction_type": "deposit", "description": f"№{amount}"}
+        for amount in range(1, 6)
+    ] + [{"goal_id": other_goal_id, "amount": 1.0, "transaction_type": "deposit"}])
+
+    response = client.get("/transactions/export", params={"format": "ndjson", "goal_id": goal_id})
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["amount"] for row in rows] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert rows[0] == client.get(f"/transactions/{rows[0]['id']}").json()
+
+    response = client.get("/transactions/export", params={"format": "csv", "goal_id": goal_id})
+    assert response.headers["content-type"].startswith("text/csv")
+    csv_rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["description"] for row in csv_rows] == ["№1", "№2", "№3", "№4", "№5"]
+
+    response = client.get("/transactions/export", params={"goal_id": goal_id, "date_to": "2000-01-01T00:00:00"})
+    assert response.text.splitlines() == ["goal_id,amount,transaction_type,description,id,created_at"]
+    assert client.get("/transactions/export", params={"format": "xml"}).status_code == 400
+
+
+def test_export_parquet():
+    pq = pytest.importorskip("pyarrow.parquet")
+    import io
+
+    goal_id = create_goal()
+    client.post("/transactions/bulk", json=[{"goal_id": goal_id, "amount": 3.0, "transaction_type": "deposit"}] * 3)
+    response = client.get("/transactions/export", params={"format": "parquet", "goal_id": goal_id})
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column("amount").to_pylist() == [3.0, 3.0, 3.0]
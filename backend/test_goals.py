@@ -0,0 +1,78 @@
+from conftest import client, create_goal, engine
+
+
+def test_goal_stats():
+    """Статистика цели считается на сервере по истории транзакций"""
+    goal_id = create_goal()
+    client.post("/transactions/bulk", json=[
+        {"goal_id": goal_id, "amount": 200.0, "transaction_type": "deposit"},
+        {"goal_id": goal_id, "amount": 100.0, "transaction_type": "deposit"},
+        {"goal_id": goal_id, "amount": 50.0, "transaction_type": "withdrawal"},
+    ])
+
+    stats = client.get(f"/goals/{goal_id}/stats").json()
+    assert (stats["total_deposits"], stats["total_withdrawals"]) == (300.0, 50.0)
+    assert (stats["deposit_count"], stats["average_deposit"]) == (2, 150.0)
+    assert stats["progress"] == 25.0
+    assert stats["monthly_inflow"][0]["net"] == 250.0
+    assert stats["projected_completion_date"] is not None
+
+    summary = client.get("/goals/stats").json()
+    assert goal_id in [goal["goal_id"] for goal in summary["goals"]]
+    assert client.get("/goals/999999999/stats").status_code == 404
+
+
+def test_goal_history_rollup():
+    """Дневные итоги обновляются при записи транзакций и совпадают с полной перестройкой"""
+    from database import SessionLocal
+    from rollup import rebuild_rollup
+
+    goal_id = create_goal()
+    response = client.post("/transactions/", json={"goal_id": goal_id, "amount": 100.0, "transaction_type": "deposit"})
+    transaction_id = response.json()["id"]
+    client.post("/transactions/bulk", json=[{"goal_id": goal_id, "amount": 40.0, "transaction_type": "withdrawal"}])
+    client.put(f"/transactions/{transaction_id}", json={"amount": 150.0})
+
+    history = client.get(f"/goals/{goal_id}/history").json()
+    assert len(history) == 1
+    assert (history[0]["deposits"], history[0]["withdrawals"], history[0]["closing_balance"]) == (150.0, 40.0, 110.0)
+
+    db = SessionLocal()
+    try:
+        rebuild_rollup(db, goal_id=goal_id)
+    finally:
+        db.close()
+    assert client.get(f"/goals/{goal_id}/history?bucket=month").json() == [
+        {**history[0], "period_start": history[0]["period_start"][:8] + "01"}
+    ]
+    assert client.get(f"/goals/{goal_id}/history?bucket=year").status_code == 400
+
+
+def test_goal_delete_cascades_in_database():
+    """Удаление цели не загружает ее историю в память: транзакции и итоги удаляет ON DELETE CASCADE"""
+    import tracemalloc
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert, select, func
+    from models import Transaction, GoalDailyBalance
+
+    goal_id = create_goal()
+    client.post("/transactions/", json={"goal_id": goal_id, "amount": 1.0, "transaction_type": "deposit"})
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Transaction), [
+            {"goal_id": goal_id, "amount": 1, "transaction_type": "deposit", "created_at": start + timedelta(seconds=number)}
+            for number in range(50_000)
+        ])
+
+    tracemalloc.start()
+    try:
+        assert client.delete(f"/goals/{goal_id}").status_code == 200
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Загрузка 50 тысяч объектов Transaction заняла бы десятки мегабайт
+    assert peak < 5 * 1024 * 1024
+
+    with engine.connect() as conn:
+        for model in (Transaction, GoalDailyBalance):
+            assert conn.execute(select(func.count()).select_from(model).where(model.goal_id == goal_id)).scalar() == 0
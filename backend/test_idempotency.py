@@ -0,0 +1,48 @@
+import pytest
+from conftest import client, create_goal, get_balance
+
+
+def test_idempotency_key_replays_original_response():
+    """Повтор записи с тем же Idempotency-Key не меняет баланс и возвращает исходный ответ"""
+    goal_id = create_goal()
+    body = {"goal_id": goal_id, "amount": 10.0, "transaction_type": "deposit"}
+    headers = {"Idempotency-Key": f"deposit-{goal_id}"}
+
+    first = client.post("/transactions/", json=body, headers=headers)
+    retry = client.post("/transactions/", json=body, headers=headers)
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert get_balance(goal_id) == pytest.approx(10.0)
+
+    # Тот же ключ с другим запросом отклоняется, без ключа запросы не дедуплицируются
+    assert client.post("/transactions/", json={**body, "amount": 20.0}, headers=headers).status_code == 422
+    client.post("/transactions/", json=body)
+    assert get_balance(goal_id) == pytest.approx(20.0)
+
+    headers = {"Idempotency-Key": f"delete-goal-{goal_id}"}
+    assert client.delete(f"/goals/{goal_id}", headers=headers).status_code == 200
+    assert client.delete(f"/goals/{goal_id}", headers=headers).status_code == 200
+    assert client.get(f"/goals/{goal_id}").status_code == 404
+
+
+def test_idempotency_conflict_keeps_outer_transaction():
+    """Конфликт ключа с параллельным запросом откатывает только запись ключа"""
+    from fastapi import HTTPException
+    from database import WriteSessionLocal
+    from idempotency import IdempotentRequest, remember_response
+    from models import Goal
+
+    goal_id = create_goal()
+    headers = {"Idempotency-Key": f"race-{goal_id}"}
+    client.post("/transactions/", json={"goal_id": goal_id, "amount": 1.0, "transaction_type": "deposit"}, headers=headers)
+
+    with WriteSessionLocal(info={"tenant": "default"}) as db:
+        # Ключ появился в БД уже после проверки replay_response: merge его не видит и вставляет
+        db.merge = db.add
+        db.get(Goal, goal_id).title = "После конфликта"
+        with pytest.raises(HTTPException) as error:
+            remember_response(db, IdempotentRequest(headers["Idempotency-Key"], "other"), {})
+        assert error.value.status_code == 409
+        db.commit()
+    assert client.get(f"/goals/{goal_id}").json()["title"] == "После конфликта"
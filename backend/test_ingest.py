@@ -0,0 +1,41 @@
+from conftest import client, create_goal, get_balance
+
+
+def test_bulk_ingestion_updates_balance_once():
+    """Пакетная вставка возвращает результаты по строкам и обновляет баланс цели"""
+    goal_id = create_goal()
+    rows = [
+        {"goal_id": goal_id, "amount": 100.0, "transaction_type": "deposit"},
+        {"goal_id": goal_id, "amount": 30.0, "transaction_type": "withdrawal"},
+        {"goal_id": goal_id, "amount": "oops", "transaction_type": "deposit"},
+        {"goal_id": 10**9, "amount": 5.0, "transaction_type": "deposit"},
+    ]
+    data = client.post("/transactions/bulk?return_ids=true", json=rows).json()
+    assert (data["total"], data["created"], data["failed"]) == (4, 2, 2)
+    assert [result["status"] for result in data["results"]] == ["created", "created", "error", "error"]
+    assert all(result["id"] for result in data["results"][:2])
+    assert get_balance(goal_id) == 70.0
+
+    # В режиме atomic ошибка в одной строке отменяет всю пачку
+    data = client.post("/transactions/bulk?atomic=true", json=rows).json()
+    assert data["created"] == 0
+    assert get_balance(goal_id) == 70.0
+
+
+def test_bulk_upload_csv_and_ndjson():
+    """Потоковая загрузка в форматах CSV и NDJSON"""
+    goal_id = create_goal()
+    csv_body = f"goal_id,amount,transaction_type,description\n{goal_id},10.5,deposit,Выписка\n{goal_id},0.5,withdrawal,\n"
+    data = client.post("/transactions/bulk/upload", content=csv_body.encode(), headers={"Content-Type": "text/csv"}).json()
+    assert data["created"] == 2
+
+    # Поле в кавычках может содержать перевод строки
+    csv_body = f'goal_id,amount,transaction_type,description\r\n{goal_id},1,withdrawal,"Оплата\r\nпо карте, кафе"\r\n'
+    data = client.post("/transactions/bulk/upload?return_ids=true&format=csv", content=csv_body.encode()).json()
+    assert (data["created"], data["failed"]) == (1, 0)
+    assert client.get("/transactions/", params={"goal_id": goal_id}).json()[0]["description"] == "Оплата\r\nпо карте, кафе"
+
+    ndjson_body = f'{{"goal_id": {goal_id}, "amount": 5, "transaction_type": "deposit"}}\nnot json\n'
+    data = client.post("/transactions/bulk/upload?format=ndjson", content=ndjson_body.encode()).json()
+    assert (data["created"], data["failed"]) == (1, 1)
+    assert get_balance(goal_id) == 14.0
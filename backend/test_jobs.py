@@ -0,0 +1,86 @@
+from fastapi.testclient import TestClient
+from conftest import ADMIN, app, client, create_goal, engine, get_balance, tenant_headers
+
+
+def test_background_jobs_reconcile_and_retry(tenant_secret):
+    """Фоновые задачи выполняются вне запроса: сверка исправляет баланс, сбои повторяются"""
+    import time
+    from sqlalchemy import update
+    from jobs import FINISHED, JobScheduler
+    from models import Goal
+
+    def wait_for(get_job):
+        for _ in range(200):
+            job = get_job()
+            if job["status"] in FINISHED:
+                return job
+            time.sleep(0.05)
+        raise AssertionError("job did not finish")
+
+    goal_id = create_goal()
+    client.post("/transactions/", json={"goal_id": goal_id, "amount": 40.0, "transaction_type": "deposit"})
+    with engine.begin() as conn:
+        conn.execute(update(Goal).where(Goal.id == goal_id).values(current_balance=1))
+
+    # Без запущенного планировщика задачи не принимаются
+    assert client.post("/jobs/reconcile_balances").status_code == 503
+    with TestClient(app, headers=tenant_headers("default")) as started:
+        assert started.post("/jobs/unknown").status_code == 404
+        assert started.post("/jobs/reconcile_balances", json={"goal": goal_id}).status_code == 422
+        response = started.post("/jobs/reconcile_balances", json={"goal_id": goal_id})
+        assert response.status_code == 202
+        job = wait_for(lambda: started.get(f"/jobs/{response.json()['id']}").json())
+        assert (job["status"], job["result"]) == ("succeeded", {"checked": 1, "repaired": [goal_id]})
+        assert started.get("/jobs/").json()[0]["id"] == job["id"]
+        # Задачи принадлежат арендатору запроса, обслуживание всей БД - только администратору
+        assert started.get(f"/jobs/{job['id']}", headers=tenant_headers("bob")).status_code == 404
+        assert started.get("/jobs/", headers=tenant_headers("bob")).json() == []
+        assert started.post("/jobs/reconcile_balances", json={"tenant": "bob"}).status_code == 422
+        assert started.post("/jobs/vacuum").status_code == 403
+        assert started.post("/jobs/refresh_statistics", headers=ADMIN).status_code == 202
+    assert get_balance(goal_id) == 40.0
+
+    attempts = []
+
+    def flaky():
+        attempts.append(len(attempts))
+        if len(attempts) < 3:
+            raise RuntimeError("database is locked")
+        return "ok"
+
+    def broken():
+        raise RuntimeError("broken")
+
+    def invalid():
+        raise ValueError("invalid")
+
+    local = JobScheduler({"flaky": flaky, "broken": broken, "invalid": invalid}, retries=2, retry_delay=0)
+    local.start()
+    try:
+        flaky_job, broken_job, invalid_job = local.submit("flaky"), local.submit("broken"), local.submit("invalid")
+        for job in (flaky_job, broken_job, invalid_job):
+            wait_for(lambda: {"status": job.status})
+    finally:
+        local.shutdown()
+    assert (flaky_job.status, flaky_job.attempts, flaky_job.result) == ("succeeded", 3, "ok")
+    assert (broken_job.status, broken_job.attempts, broken_job.error) == ("failed", 3, "RuntimeError: broken")
+    # Ошибки в параметрах и коде задачи не повторяются
+    assert (invalid_job.status, invalid_job.attempts) == ("failed", 1)
+
+
+def test_schedule_lease_elects_one_runner():
+    """Периодические задачи ставит в очередь только один процесс - владелец аренды расписания"""
+    import time
+    from jobs import ScheduleLease
+
+    first, second = ScheduleLease("test"), ScheduleLease("test")
+    assert first.acquire() and first.acquire()
+    assert not second.acquire()
+    first.release()
+    assert second.acquire() and not first.acquire()
+
+    # Аренду остановившегося владельца захватывают после истечения срока
+    expiring, waiting = ScheduleLease("expiring", ttl=0.01), ScheduleLease("expiring")
+    assert expiring.acquire() and not waiting.acquire()
+    time.sleep(0.05)
+    assert waiting.acquire()
@@ -0,0 +1,19 @@
+from conftest import ADMIN, client, create_goal
+
+
+def test_metrics_and_server_timing(monkeypatch):
+    import metrics
+
+    goal_id = create_goal()
+    monkeypatch.setattr(metrics, "SERVER_TIMING", True)
+    response = client.post(f"/goals/{goal_id}/recalculate-balance")
+    assert 'desc="' in response.headers["Server-Timing"]
+    monkeypatch.setattr(metrics, "SERVER_TIMING", False)
+    assert "Server-Timing" not in client.get(f"/goals/{goal_id}").headers
+
+    assert client.get("/metrics", headers={"X-Tenant-ID": "alice"}).status_code == 403
+    body = client.get("/metrics", headers=ADMIN).text
+    assert 'http_requests_total{method="POST",route="/goals/{goal_id}/recalculate-balance",status="200"}' in body
+    assert 'http_request_db_queries_count{method="POST",route="/goals/{goal_id}/recalculate-balance"}' in body
+    assert "db_queries_total " in body
+    assert "db_pool_checkout_wait_seconds_count " in body
@@ -0,0 +1,44 @@
+import pytest
+from migrate import run_migrations
+
+
+def test_migrations_upgrade_legacy_database(tmp_path):
+    from sqlalchemy import create_engine
+    from migrate import check_schema
+
+    old_engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with old_engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE goals (id INTEGER PRIMARY KEY, title VARCHAR NOT NULL, target_amount FLOAT NOT NULL, "
+            "current_balance FLOAT, target_date DATETIME, description VARCHAR, image_url VARCHAR, "
+            "is_active BOOLEAN, created_at DATETIME)"
+        )
+        conn.exec_driver_sql(
+            "CREATE TABLE transactions (id INTEGER PRIMARY KEY, goal_id INTEGER NOT NULL REFERENCES goals (id), "
+            "amount FLOAT NOT NULL, transaction_type VARCHAR NOT NULL, description VARCHAR, created_at DATETIME)"
+        )
+        conn.exec_driver_sql("CREATE INDEX ix_transactions_id ON transactions (id)")
+        conn.exec_driver_sql("INSERT INTO goals VALUES (1, 'Старая', 1000.5, 10.3, NULL, NULL, NULL, 1, '2024-01-01 00:00:00')")
+        conn.exec_driver_sql("INSERT INTO transactions VALUES (1, 1, 10.1, 'deposit', NULL, '2024-01-01 00:00:00')")
+        conn.exec_driver_sql("INSERT INTO transactions VALUES (2, 1, 0.2, 'deposit', NULL, '2024-01-02 00:00:00')")
+
+    with pytest.raises(RuntimeError, match="migrate.py"):
+        check_schema(old_engine)
+    assert run_migrations(old_engine) == [
+        "v0001_initial", "v0002_money_minor_units", "v0003_default_settings", "v0004_idempotency_keys",
+        "v0005_cascade_deletes", "v0006_transaction_archive", "v0007_full_text_search", "v0008_tenants",
+        "v0009_scheduler_lease", "v0010_search_queue",
+    ]
+    assert run_migrations(old_engine) == []
+    check_schema(old_engine)
+    with old_engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT target_amount, current_balance FROM goals").one() == (100050, 1030)
+        assert conn.exec_driver_sql("SELECT SUM(amount), typeof(SUM(amount)) FROM transactions").one() == (1030, "integer")
+        assert "goals" in conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'transactions'").scalar()
+        indexes = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"ix_transactions_id", "ix_transactions_goal_id_created_at_id", "ix_goals_title"} <= indexes
+        assert conn.exec_driver_sql("SELECT version FROM schema_version ORDER BY version").scalars().all() == [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+        assert conn.exec_driver_sql("SELECT theme, currency, tenant_id FROM settings").all() == [("light", "RUB", "default")]
+        assert conn.exec_driver_sql("SELECT DISTINCT tenant_id FROM transactions").all() == [("default",)]
+        assert conn.exec_driver_sql("SELECT rowid, title, tenant FROM goals_search").all() == [(1, "стар", "tdefault")]
+    old_engine.dispose()
@@ -0,0 +1,29 @@
+from conftest import client, create_goal
+
+
+def test_large_responses_are_compressed():
+    goal_id = create_goal()
+    client.post("/transactions/bulk", json=[{"goal_id": goal_id, "amount": 1.0, "transaction_type": "deposit"}] * 50)
+    response = client.get("/transactions/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers.get("Content-Encoding") == "gzip"
+
+
+def test_list_endpoints_match_response_schemas():
+    """Быстрый путь сериализации списков отдает те же данные, что и схемы ответа"""
+    from schemas import GoalResponse, TransactionResponse
+
+    goal_id = create_goal()
+    client.post("/transactions/", json={"goal_id": goal_id, "amount": 12.5, "transaction_type": "deposit"})
+    client.post("/transactions/", json={"goal_id": goal_id, "amount": 2.5, "transaction_type": "withdrawal", "description": "кофе"})
+
+    transactions = client.get("/transactions/", params={"goal_id": goal_id}).json()
+    assert [item["amount"] for item in transactions] == [2.5, 12.5]
+    for item in transactions:
+        single = client.get(f"/transactions/{item['id']}").json()
+        assert item == single
+        assert TransactionResponse.model_validate(item).model_dump(mode="json") == item
+
+    goals = client.get("/goals/", params={"limit": 1000}).json()
+    goal = next(item for item in goals if item["id"] == goal_id)
+    assert goal == client.get(f"/goals/{goal_id}").json()
+    assert GoalResponse.model_validate(goal).model_dump(mode="json") == goal
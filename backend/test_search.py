@@ -0,0 +1,67 @@
+from conftest import client, engine
+
+
+def test_search_finds_word_forms_and_stays_in_sync():
+    """Поиск находит другие формы слов и следует за записью, архивацией и удалением"""
+    from datetime import datetime
+    from sqlalchemy import update
+    from archive import archive_transactions
+    from database import WriteSessionLocal
+    from models import Transaction
+
+    goal_id = client.post("/goals/", json={"title": "Летний отпуск", "target_amount": 1000.0, "description": "Море и горы"}).json()["id"]
+    created = [
+        client.post("/transactions/", json={"goal_id": goal_id, "amount": amount, "transaction_type": kind, "description": text}).json()["id"]
+        for amount, kind, text in (
+            (100.0, "deposit", "Отложил на отпуск"),
+            (50.0, "deposit", "Премия для отпуска и подарков"),
+            (20.0, "withdrawal", "Билеты в отпуске"),
+            (10.0, "deposit", "Зарплата"),
+        )
+    ]
+
+    def found(params):
+        return [item["id"] for item in client.get("/search/transactions", params={"goal_id": goal_id, **params}).json()]
+
+    assert sorted(found({"q": "отпуском"})) == created[:3]
+    assert sorted(found({"q": "отпуск", "transaction_type": "deposit"})) == created[:2]
+    assert found({"q": "подарки отп"}) == [created[1]]
+    assert found({"q": "отпуск", "sort": "recent"}) == created[2::-1]
+    assert found({"q": "отпуск", "limit": 2}) + found({"q": "отпуск", "skip": 2}) == found({"q": "отпуск"})
+    assert goal_id in [item["id"] for item in client.get("/search/goals", params={"q": "отпуска моря"}).json()]
+    assert client.get("/search/transactions", params={"q": ""}).status_code == 422
+
+    client.put(f"/transactions/{created[3]}", json={"description": "Зарплата на отпуск"})
+    client.delete(f"/transactions/{created[2]}")
+    assert sorted(found({"q": "отпуск"})) == [created[0], created[1], created[3]]
+
+    # Архивная транзакция остается в поиске
+    with engine.begin() as conn:
+        conn.execute(update(Transaction).where(Transaction.id == created[0]).values(created_at=datetime(2019, 1, 1)))
+    with WriteSessionLocal() as db:
+        archive_transactions(db, before=datetime(2019, 6, 1))
+    assert client.get("/search/transactions", params={"q": "отложил", "goal_id": goal_id}).json()[0]["amount"] == 100.0
+
+    # Удаление цели каскадно удаляет ее транзакции и из индекса
+    client.delete(f"/goals/{goal_id}")
+    assert found({"q": "отпуск"}) == []
+    assert goal_id not in [item["id"] for item in client.get("/search/goals", params={"q": "отпуск"}).json()]
+
+
+def test_other_sqlite_clients_can_write_without_ru_stem():
+    """Запись другим клиентом SQLite без ru_stem проходит, строка попадает в поиск при записи приложения"""
+    import sqlite3
+
+    goal_id = client.post("/goals/", json={"title": "Ремонт кухни", "target_amount": 1000.0}).json()["id"]
+    connection = sqlite3.connect(engine.url.database)
+    with connection:
+        connection.execute(
+            "INSERT INTO transactions (goal_id, amount, transaction_type, description, created_at, tenant_id)"
+            " VALUES (?, 100, 'deposit', 'Плитка для кухни', '2024-01-01 00:00:00', 'default')",
+            (goal_id,),
+        )
+    connection.close()
+
+    client.post("/transactions/", json={"goal_id": goal_id, "amount": 1.0, "transaction_type": "deposit", "description": "Краска"})
+    results = client.get("/search/transactions", params={"q": "плитку", "goal_id": goal_id}).json()
+    assert [item["description"] for item in results] == ["Плитка для кухни"]
@@ -0,0 +1,96 @@
+import pytest
+from conftest import client, engine, tenant_headers
+
+
+def test_tenants_see_only_their_data(tenant_secret):
+    """Арендаторы не видят целей, транзакций, настроек, поиска и ключей идемпотентности друг друга"""
+    import csv
+    import io
+
+    alice, bob = tenant_headers("alice"), tenant_headers("bob")
+    goal_id = client.post("/goals/", json={"title": "Дача", "target_amount": 500.0}, headers=alice).json()["id"]
+    transaction = {"goal_id": goal_id, "amount": 40.0, "transaction_type": "deposit", "description": "Забор"}
+    assert client.post("/transactions/", json=transaction, headers=alice).status_code == 200
+
+    assert [goal["id"] for goal in client.get("/goals/", headers=alice).json()] == [goal_id]
+    assert goal_id not in [goal["id"] for goal in client.get("/goals/").json()]
+    assert client.get("/goals/", headers=bob).json() == []
+    assert client.get(f"/goals/{goal_id}", headers=bob).status_code == 404
+    assert client.post("/transactions/", json=transaction, headers=bob).status_code == 404
+    assert client.get("/goals/stats", headers=bob).json()["goals"] == []
+    assert client.get("/transactions/", headers=bob).json() == []
+    assert len(client.get("/transactions/", params={"goal_id": goal_id}, headers=alice).json()) == 1
+    assert client.get("/search/transactions", params={"q": "забор"}, headers=bob).json() == []
+    assert len(client.get("/search/transactions", params={"q": "забор"}, headers=alice).json()) == 1
+    assert client.get("/search/goals", params={"q": "дача"}, headers=bob).json() == []
+    exported = client.get("/transactions/export", headers=bob).text
+    assert list(csv.DictReader(io.StringIO(exported))) == []
+
+    # Пакет операций выполняется от имени арендатора запроса
+    batch = {"operations": [{"method": "POST", "path": "/goals/", "body": {"title": "Велосипед", "target_amount": 90.0}}]}
+    bob_goal = client.post("/batch/", json=batch, headers=bob).json()["results"][0]["body"]["id"]
+    assert [goal["id"] for goal in client.get("/goals/", headers=bob).json()] == [bob_goal]
+
+    # Настройки у каждого арендатора свои
+    client.put("/settings/", json={"theme": "dark"}, headers=bob)
+    assert client.get("/settings/", headers=bob).json()["theme"] == "dark"
+    assert client.get("/settings/", headers=alice).json()["theme"] == "light"
+
+    # Одинаковый ключ идемпотентности у разных арендаторов - разные запросы
+    body = {"title": "Отпуск", "target_amount": 100.0}
+    first = client.post("/goals/", json=body, headers={**alice, "Idempotency-Key": "same"}).json()["id"]
+    second = client.post("/goals/", json=body, headers={**bob, "Idempotency-Key": "same"}).json()["id"]
+    assert first != second
+
+    # ETag зависит от арендатора
+    etag = client.get("/goals/", headers=alice).headers["etag"]
+    assert client.get("/goals/", headers={**bob, "If-None-Match": etag}).status_code == 200
+    assert client.get("/goals/", headers={"X-Tenant-ID": "../other"}).status_code == 400
+
+    # Арендатор подтверждается токеном, в том числе default и поток событий
+    assert client.get("/goals/", headers={"X-Tenant-ID": "alice", "X-Tenant-Token": bob["X-Tenant-Token"]}).status_code == 401
+    assert client.get("/goals/", headers={"X-Tenant-ID": "alice", "X-Tenant-Token": ""}).status_code == 401
+    assert client.get("/goals/", headers={"X-Tenant-Token": ""}).status_code == 401
+    assert client.get("/events", params={"tenant": "bob"}, headers={"X-Tenant-Token": ""}).status_code == 401
+
+    # Задача арендатора исправляет только его балансы
+    from sqlalchemy import update
+    from jobs import reconcile_balances
+    from models import Goal
+
+    with engine.begin() as conn:
+        conn.execute(update(Goal).where(Goal.id.in_([goal_id, bob_goal])).values(current_balance=7))
+    assert reconcile_balances(tenant="alice")["repaired"] == [goal_id]
+    assert client.get(f"/goals/{bob_goal}", headers=bob).json()["current_balance"] == 7.0
+
+
+def test_tenant_shards_keep_bounded_engine_cache(tmp_path):
+    """В режиме шардов файл арендатора создается и мигрирует при первом обращении, кэш движков ограничен"""
+    from sqlalchemy import select
+    from shards import ShardCache
+    from models import Goal
+
+    shards = ShardCache(str(tmp_path), maxsize=2)
+    first = shards.get("first")
+    with first.WriteSessionLocal(info={"tenant": "first"}) as db:
+        db.add(Goal(title="Шард", target_amount=10))
+        db.commit()
+    assert shards.get("first") is first
+    shards.get("second")
+    shards.get("third")
+    assert shards.tenants() == ["first", "second", "third"]
+    assert list(shards._databases) == ["second", "third"]
+
+    # Вытесненный файл открывается заново с теми же данными
+    with shards.get("first").SessionLocal(info={"tenant": "first"}) as db:
+        assert db.scalars(select(Goal.title)).all() == ["Шард"]
+    with pytest.raises(ValueError):
+        shards.get("../first")
+
+
+def test_without_tenant_secret_only_default_is_served():
+    """Без TENANT_SECRET установка однопользовательская: другой арендатор отклоняется, а не подменяется default"""
+    assert client.get("/goals/").status_code == 200
+    assert client.get("/goals/", headers={"X-Tenant-ID": "default"}).status_code == 200
+    assert client.get("/goals/", headers={"X-Tenant-ID": "alice"}).status_code == 403
+    assert client.get("/events", params={"tenant": "alice"}).status_code == 403
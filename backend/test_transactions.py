@@ -0,0 +1,83 @@
+from conftest import client, create_goal, engine, get_balance
+
+
+def test_transactions_keyset_pagination():
+    """Курсорная пагинация проходит все транзакции цели без пропусков и повторов"""
+    goal_id = create_goal()
+    rows = [{"goal_id": goal_id, "amount": 1.0, "transaction_type": "deposit"} for _ in range(25)]
+    client.post("/transactions/bulk", json=rows)
+
+    seen, cursor = [], None
+    while True:
+        params = {"goal_id": goal_id, "limit": 10}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/transactions/", params=params)
+        seen += [transaction["id"] for transaction in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 25
+
+    response = client.get("/transactions/", params={"cursor": "broken"})
+    assert response.status_code == 400
+
+
+def test_archived_transactions_keep_balance_and_read_through():
+    """Архивация старых транзакций сохраняет баланс и статистику, списки и выгрузка читают архив"""
+    import csv
+    import io
+    from datetime import datetime
+    from sqlalchemy import update
+    from archive import archive_transactions
+    from database import WriteSessionLocal
+    from models import Transaction
+
+    goal_id = create_goal()
+    old_ids = [
+        client.post("/transactions/", json={"goal_id": goal_id, "amount": amount, "transaction_type": kind}).json()["id"]
+        for amount, kind in ((100.0, "deposit"), (30.0, "withdrawal"))
+    ]
+    with engine.begin() as conn:
+        for number, transaction_id in enumerate(old_ids):
+            conn.execute(update(Transaction).where(Transaction.id == transaction_id).values(created_at=datetime(2020, 1, 1 + number)))
+    new_id = client.post("/transactions/", json={"goal_id": goal_id, "amount": 5.0, "transaction_type": "deposit"}).json()["id"]
+
+    with WriteSessionLocal() as db:
+        assert archive_transactions(db, before=datetime(2021, 1, 1), batch_size=1) == 2
+
+    assert client.post(f"/goals/{goal_id}/recalculate-balance").json()["current_balance"] == 75.0
+    assert client.get(f"/goals/{goal_id}/verify-balance").json()["is_consistent"]
+    stats = client.get(f"/goals/{goal_id}/stats").json()
+    assert (stats["total_deposits"], stats["deposit_count"], stats["withdrawal_count"]) == (105.0, 2, 1)
+
+    # Страницы по одной строке проходят через горизонт архивации
+    ids, cursor = [], None
+    while True:
+        page = client.get("/transactions/", params={"goal_id": goal_id, "limit": 1, "cursor": cursor})
+        ids += [item["id"] for item in page.json()]
+        cursor = page.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert ids == [new_id, *reversed(old_ids)]
+    assert [item["id"] for item in client.get("/transactions/", params={"goal_id": goal_id, "date_from": "2022-01-01"}).json()] == [new_id]
+    assert client.get(f"/transactions/{old_ids[0]}").json()["amount"] == 100.0
+
+    export = client.get("/transactions/export", params={"format": "csv", "goal_id": goal_id}).text
+    assert [int(row["id"]) for row in csv.DictReader(io.StringIO(export))] == [*old_ids, new_id]
+
+
+def test_update_transaction_rejects_null_fields():
+    """Явный null в обязательных полях обновления дает 422, а не ошибку БД"""
+    goal_id = create_goal()
+    transaction = client.post(
+        "/transactions/", json={"goal_id": goal_id, "amount": 100.0, "transaction_type": "deposit"}
+    ).json()
+
+    for field in ("amount", "transaction_type"):
+        response = client.put(f"/transactions/{transaction['id']}", json={field: None})
+        assert response.status_code == 422
+
+    response = client.put(f"/transactions/{transaction['id']}", json={"description": None, "amount": 50.0})
+    assert response.status_code == 200
+    assert get_balance(goal_id) == 50.0
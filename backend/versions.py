@@ -0,0 +1,128 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from cache import table_versions_cache
+from database import after_commit, sync_session
+from models import TableVersion
+from tenants import request_tenant, tenant_of
+
+
+def version_names(tenant: Optional[str], tables) -> list[str]:
+    """Имена счетчиков таблиц: у сессии арендатора - собственные, <tenant>:<table>.
+
+    Запись одного арендатора не сбрасывает ETag и кэш остальных. Сессии без арендатора
+    (фоновые задачи, архивация) увеличивают общие счетчики, которые учитываются у всех.
+    """
+    return [f"{tenant}:{table}" if tenant is not None else table for table in tables]
+
+
+def mark_changed(db, *tables: str):
+    """Отмечает таблицы, измененные в текущей транзакции, для увеличения их версий при фиксации"""
+    sync_session(db).info.setdefault("changed_tables", set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def mark_flushed_tables(session, flush_context):
+    tables = {obj.__table__.name for obj in (*session.new, *session.dirty, *session.deleted)}
+    if tables:
+        mark_changed(session, *tables)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def mark_bulk_statement_tables(orm_execute_state):
+    # Массовые UPDATE/DELETE/INSERT через ORM минуют flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None and table.name != TableVersion.__tablename__:
+            mark_changed(orm_execute_state.session, table.name)
+
+
+@event.listens_for(Session, "before_commit")
+def bump_table_versions(session):
+    session.flush()
+    tables = session.info.pop("changed_tables", None)
+    tables = tables - {TableVersion.__tablename__} if tables else None
+    if not tables:
+        return
+
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    names = version_names(session.info.get("tenant"), sorted(tables))
+    statement = dialect_insert(TableVersion).values([{"name": name, "version": 1} for name in names])
+    session.connection().execute(
+        statement.on_conflict_do_update(
+            index_elements=[TableVersion.name],
+            set_={"version": TableVersion.version + 1},
+        )
+    )
+    after_commit(session, table_versions_cache.clear)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_changed_tables(session):
+    session.info.pop("changed_tables", None)
+
+
+def read_versions(db: Session, *tables: str) -> dict:
+    """Версии таблиц для арендатора сессии: сумма общего счетчика и счетчика арендатора.
+
+    Оба счетчика только растут, поэтому сумма меняется при любом изменении.
+    Прочитанные версии процесс использует еще TABLE_VERSIONS_TTL секунд (cache.table_versions_cache).
+    """
+    tenant = tenant_of(db)
+    key = (str(sync_session(db).get_bind().url), tenant, tables)
+    return dict(table_versions_cache.get_or_load(key, lambda: load_versions(db, tenant, tables)))
+
+
+def load_versions(db: Session, tenant: Optional[str], tables: tuple) -> dict:
+    names = dict(zip(version_names(tenant, tables), tables)) if tenant is not None else {}
+    rows = db.execute(select(TableVersion.name, TableVersion.version).where(TableVersion.name.in_([*tables, *names])))
+    versions = dict.fromkeys(tables, 0)
+    for name, version in rows:
+        versions[names.get(name, name)] += version
+    return versions
+
+
+def make_etag(request: Request, versions: dict) -> str:
+    """Строгий ETag по URL запроса, арендатору и версиям таблиц, от которых зависит ответ"""
+    source = f"{request_tenant(request)}|{request.url.path}?{request.url.query}|" + ",".join(f"{name}={versions[name]}" for name in sorted(versions))
+    return '"' + hashlib.sha1(source.encode()).hexdigest() + '"'
+
+
+def not_modified(request: Optional[Request], response: Optional[Response], db: Session, *tables: str) -> Optional[Response]:
+    """Проверяет If-None-Match и возвращает 304, если данные таблиц не менялись.
+
+    Иначе выставляет заголовок ETag в ответ обработчика и возвращает None.
+    """
+    if request is None:
+        return None
+    versions = read_versions(db, *tables)
+    request.state.table_versions = versions
+    etag = make_etag(request, versions)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers={"ETag": etag})
+    if response is not None:
+        response.headers["ETag"] = etag
+    return None
+
+
+def versioned_key(request: Optional[Request], db: Session, key, *tables: str) -> tuple:
+    """Ключ кэша процесса с версиями таблиц.
+
+    Кэш у каждого воркера свой, и запись, изменившая данные в другом воркере, его не сбрасывает.
+    С версиями в ключе такие записи перестают находиться сразу после фиксации изменения.
+    Версии берутся из уже выполненной проверки not_modified или из кэша версий процесса,
+    поэтому попадание в кэш не обращается к БД.
+    Ключ включает арендатора сессии: кэш процесса общий для всех арендаторов.
+    """
+    versions = getattr(request.state, "table_versions", None) if request is not None else None
+    if versions is None or not set(tables) <= set(versions):
+        versions = read_versions(db, *tables)
+    return (tenant_of(db), key, *(versions[name] for name in tables))
@@ -0,0 +1,86 @@
+"""Транзакции записи: очереди записи SQLite и сессия эндпоинтов, изменяющих данные.
+
+Движки подключают begin_sqlite_transaction и end_sqlite_transaction в
+database.configure_engine, фабрики сессий записи создает database.Database.
+"""
+import os
+import threading
+
+from sqlalchemy import make_url
+from sqlalchemy.orm import Session
+
+# Очереди транзакций записи процесса для SQLite, по одной на файл БД. Без очереди за блокировку
+# файла конкурируют все соединения пула, SQLite будит ожидающих с нарастающими паузами, и при
+# десятках одновременных запросов часть из них не дожидается busy_timeout. С очередью от каждого
+# воркера за блокировку файла борется не больше одного соединения. Очередь общая для
+# синхронного и асинхронного движков одного файла
+write_queues: dict[str, threading.Lock] = {}
+write_queues_lock = threading.Lock()
+# Очередь ждем не дольше, чем SQLite ждет блокировку файла (прагма busy_timeout, см. database.py)
+WRITE_QUEUE_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "5000")) / 1000
+
+# Параметры выполнения для транзакций записи: в SQLite - BEGIN IMMEDIATE,
+# в PostgreSQL строки блокируются явно через SELECT ... FOR UPDATE
+WRITE_OPTIONS = {"sqlite_begin": "IMMEDIATE"}
+
+
+def write_queue(url):
+    """Очередь записи файла БД из url или None, если БД не SQLite"""
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        return None
+    with write_queues_lock:
+        return write_queues.setdefault(url.database or "", threading.Lock())
+
+
+def acquire_write_queue(url):
+    queue = write_queue(url)
+    if queue is not None and not queue.acquire(timeout=WRITE_QUEUE_TIMEOUT):
+        raise TimeoutError("Timed out waiting for the SQLite write queue")
+    return queue
+
+
+def release_write_queue(url):
+    queue = write_queue(url)
+    if queue is not None:
+        queue.release()
+
+
+def begin_sqlite_transaction(conn):
+    """Открывает транзакцию SQLite явно, с режимом из параметра выполнения sqlite_begin.
+
+    Сессии записи (get_write_db) начинают транзакцию с BEGIN IMMEDIATE: блокировка записи
+    берется до первого чтения, и конкурентные писатели, в том числе из других воркеров,
+    ждут ее по busy_timeout, а не получают ошибку при повышении блокировки посреди транзакции.
+    С параметром write_queue транзакция сначала встает в очередь записи процесса.
+    """
+    options = conn.get_execution_options()
+    if options.get("isolation_level") == "AUTOCOMMIT":
+        return
+    if options.get("write_queue"):
+        conn.info["write_queue"] = acquire_write_queue(conn.engine.url)
+    try:
+        conn.exec_driver_sql(f"BEGIN {options.get('sqlite_begin', 'DEFERRED')}")
+    except Exception:
+        end_sqlite_transaction(conn)
+        raise
+
+
+def end_sqlite_transaction(conn):
+    queue = conn.info.pop("write_queue", None)
+    if queue is not None:
+        queue.release()
+
+
+class WriteSession(Session):
+    """Сессия эндпоинтов записи.
+
+    Пока в info установлен флаг defer_commit (пакет операций /batch), commit обработчиков
+    только сбрасывает изменения в БД: фиксирует их один раз тот, кто установил флаг.
+    """
+
+    def commit(self):
+        if self.info.get("defer_commit"):
+            self.flush()
+            return
+        super().commit()
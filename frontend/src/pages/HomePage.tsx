@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { Goal } from '../types';
-import { goalService, transactionService } from '../services/api';
+import { REFRESH_INTERVAL, eventService, goalService, transactionService } from '../services/api';
 import { Link } from 'react-router-dom';
 import confetti from 'canvas-confetti';
 import { formatCurrency, parseCurrency } from '../utils';
@@ -11,7 +11,9 @@ const HomePage: React.FC = () => {
   const [amount, setAmount] = useState('');
   const [description, setDescription] = useState('');
 
-  // Загрузка текущей цели
+  // Загрузка текущей цели. Повторная загрузка по таймеру и при возврате на вкладку - запасной
+  // путь к событиям сервера: при нескольких воркерах событие о записи, обработанной другим
+  // воркером, в эту вкладку не приходит. Неизменившаяся цель стоит ответа 304 без тела (ETag)
   useEffect(() => {
     const fetchCurrentGoal = async () => {
       try {
@@ -27,6 +29,39 @@ const HomePage: React.FC = () => {
     };
 
     fetchCurrentGoal();
+
+    const refresh = () => {
+      if (document.visibilityState === 'visible') {
+        fetchCurrentGoal();
+      }
+    };
+    const timer = window.setInterval(refresh, REFRESH_INTERVAL);
+    document.addEventListener('visibilitychange', refresh);
+    window.addEventListener('focus', refresh);
+    return () => {
+      window.clearInterval(timer);
+      document.removeEventListener('visibilitychange', refresh);
+      window.removeEventListener('focus', refresh);
+    };
+  }, []);
+
+  // Баланс и данные цели обновляются по событиям сервера, в том числе из других вкладок и устройств
+  useEffect(() => {
+    return eventService.subscribe(event => {
+      setCurrentGoal(goal => {
+        if (!goal) return goal;
+        if (event.type === 'goal.balance' && event.goal_id === goal.id) {
+          return { ...goal, current_balance: event.current_balance };
+        }
+        if (event.type === 'goal.updated' && event.goal.id === goal.id) {
+          return event.goal;
+        }
+        if (event.type === 'goal.deleted' && event.goal_id === goal.id) {
+          return null;
+        }
+        return goal;
+      });
+    });
   }, []);
 
   // Запускаем анимацию конфетти при достижении цели
@@ -59,12 +94,9 @@ const HomePage: React.FC = () => {
         description: description || ''
       };
       
+      // Новый баланс цели придет событием goal.balance, повторно запрашивать цель не нужно
       await transactionService.createTransaction(transactionData);
       
-      // Обновляем цель после добавления транзакции
-      const updatedGoal = await goalService.getGoalById(currentGoal.id);
-      setCurrentGoal(updatedGoal);
-      
       // Сбрасываем форму
       setAmount('');
       setDescription('');
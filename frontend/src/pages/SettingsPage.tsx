@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { Settings, Goal } from '../types';
-import { settingsService, goalService } from '../services/api';
+import { BatchOperation, BatchResult, Settings, Goal } from '../types';
+import { settingsService, goalService, batchService } from '../services/api';
 import SettingsForm from '../components/SettingsForm';
 import GoalSettingsForm from '../components/GoalSettingsForm';
 
@@ -14,12 +14,19 @@ const SettingsPage: React.FC = () => {
   useEffect(() => {
     const fetchSettingsAndGoal = async () => {
       try {
-        // Fetch settings
-        const settingsData = await settingsService.getSettings();
-        setSettings(settingsData);
+        // Настройки и первая цель загружаются одним пакетным запросом
+        const { results } = await batchService.run([
+          { method: 'GET', path: '/settings/' },
+          { method: 'GET', path: '/goals/', query: { limit: 1 } },
+        ]);
+        const [settingsResult, goalsResult] = results as [BatchResult<Settings>, BatchResult<Goal[]>];
+        if (settingsResult.status !== 200 || goalsResult.status !== 200) {
+          throw new Error('Failed to load settings and goal');
+        }
+        setSettings(settingsResult.body);
         
         // Fetch the first goal for settings (in a real app, we might have a specific goal for settings)
-        const goals = await goalService.getAllGoals();
+        const goals = goalsResult.body;
         if (goals.length > 0) {
           setGoal(goals[0]);
         } else {
@@ -101,21 +108,32 @@ const SettingsPage: React.FC = () => {
     if (!goal) return;
     
     try {
-      if (goal.id > 0) {
+      const goalOperation: BatchOperation = goal.id > 0
         // Update existing goal
-        const updatedGoal = await goalService.updateGoal(goal.id, goal);
-        setGoal(updatedGoal);
-      } else {
+        ? { method: 'PUT', path: `/goals/${goal.id}`, body: goal }
         // Create new goal if it doesn't exist
-        const newGoal = await goalService.createGoal({
-          title: goal.title,
-          target_amount: goal.target_amount,
-          target_date: goal.target_date,
-          description: goal.description || '',
-          image_url: goal.image_url || '',
-          is_active: true
-        });
-        setGoal(newGoal);
+        : {
+            method: 'POST',
+            path: '/goals/',
+            body: {
+              title: goal.title,
+              target_amount: goal.target_amount,
+              target_date: goal.target_date,
+              description: goal.description || '',
+              image_url: goal.image_url || '',
+              is_active: true
+            },
+          };
+      
+      // Настройки и цель сохраняются одним запросом и одной транзакцией: либо все, либо ничего
+      const operations: BatchOperation[] = settings ? [{ method: 'PUT', path: '/settings/', body: settings }] : [];
+      const { committed, results } = await batchService.run([...operations, goalOperation], true);
+      if (!committed) {
+        throw new Error('Failed to save goal settings');
+      }
+      setGoal((results[results.length - 1] as BatchResult<Goal>).body);
+      if (settings) {
+        setSettings((results[0] as BatchResult<Settings>).body);
       }
       
       setSaveStatus('Goal settings saved successfully!');
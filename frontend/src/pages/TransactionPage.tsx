@@ -5,9 +5,18 @@ import { formatCurrency } from '../utils';
 import EditIcon from '../components/icons/EditIcon';
 import DeleteIcon from '../components/icons/DeleteIcon';
 
+const PAGE_SIZE = 100;
+// Пауза после ввода перед запросом поиска, мс
+const SEARCH_DELAY = 300;
+
 const TransactionPage: React.FC = () => {
   const [transactions, setTransactions] = useState<Transaction[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+ const [searchQuery, setSearchQuery] = useState('');
+ // Результаты поиска; null - показывается вся история
+ const [searchResults, setSearchResults] = useState<Transaction[] | null>(null);
  const [editingId, setEditingId] = useState<number | null>(null);
  const [editComment, setEditComment] = useState('');
  const [editAmount, setEditAmount] = useState<number>(0);
@@ -15,8 +24,9 @@ const TransactionPage: React.FC = () => {
  useEffect(() => {
     const fetchTransactions = async () => {
       try {
-        const data = await transactionService.getAllTransactions();
-        setTransactions(data);
+        const page = await transactionService.getTransactionsPage({ limit: PAGE_SIZE });
+        setTransactions(page.items);
+        setNextCursor(page.nextCursor);
       } catch (error) {
         console.error('Error fetching transactions:', error);
       } finally {
@@ -27,6 +37,43 @@ const TransactionPage: React.FC = () => {
     fetchTransactions();
   }, []);
 
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResults(null);
+      return;
+    }
+
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const results = await transactionService.searchTransactions(query, { sort: 'recent', limit: PAGE_SIZE });
+        if (!cancelled) setSearchResults(results);
+      } catch (error) {
+        console.error('Error searching transactions:', error);
+      }
+    }, SEARCH_DELAY);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery]);
+
+  const handleLoadMore = async () => {
+    if (!nextCursor) return;
+
+    setLoadingMore(true);
+    try {
+      const page = await transactionService.getTransactionsPage({ limit: PAGE_SIZE }, nextCursor);
+      setTransactions(prev => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error fetching transactions:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleEditClick = (transaction: Transaction) => {
     setEditingId(transaction.id);
     setEditComment(transaction.description);
@@ -46,6 +93,9 @@ const TransactionPage: React.FC = () => {
       setTransactions(prev =>
         prev.map(t => t.id === editingId ? updatedTransaction : t)
       );
+      setSearchResults(prev =>
+        prev && prev.map(t => t.id === editingId ? updatedTransaction : t)
+      );
       
       setEditingId(null);
       setEditComment('');
@@ -63,6 +113,7 @@ const TransactionPage: React.FC = () => {
     try {
       await transactionService.deleteTransaction(id);
       setTransactions(prev => prev.filter(t => t.id !== id));
+      setSearchResults(prev => prev && prev.filter(t => t.id !== id));
     } catch (error) {
       console.error('Error deleting transaction:', error);
     }
@@ -81,6 +132,8 @@ const TransactionPage: React.FC = () => {
     });
   };
 
+  const visibleTransactions = searchResults ?? transactions;
+
   if (loading) {
     return (
       <div className="flex justify-center items-center h-full">
@@ -95,6 +148,14 @@ const TransactionPage: React.FC = () => {
         
         <div className="bg-white dark:bg-gray-800 rounded-lg shadow-md p-6">
           <h2 className="text-2xl font-semibold text-gray-900 dark:text-white mb-4">История операций</h2>
+
+          <input
+            type="search"
+            value={searchQuery}
+            onChange={(e) => setSearchQuery(e.target.value)}
+            placeholder="Поиск по комментариям"
+            className="w-full mb-4 px-3 py-2 border border-gray-300 dark:border-gray-600 rounded-md bg-white dark:bg-gray-700 text-gray-900 dark:text-white focus:outline-none focus:ring-2 focus:ring-blue-500"
+          />
           
           <table className="min-w-full divide-y divide-gray-200 dark:divide-gray-700">
             <thead className="bg-gray-50 dark:bg-gray-700">
@@ -114,14 +175,14 @@ const TransactionPage: React.FC = () => {
               </tr>
             </thead>
             <tbody className="bg-white dark:bg-gray-800 divide-y divide-gray-200 dark:divide-gray-700">
-              {transactions.length === 0 ? (
+              {visibleTransactions.length === 0 ? (
                 <tr>
                   <td colSpan={4} className="px-6 py-4 text-center text-gray-500 dark:text-gray-400">
-                    Нет операций
+                    {searchResults ? 'Ничего не найдено' : 'Нет операций'}
                   </td>
                 </tr>
               ) : (
-                transactions.map((transaction) => (
+                visibleTransactions.map((transaction) => (
                   <tr key={transaction.id} className="hover:bg-gray-50 dark:hover:bg-gray-700">
                     <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900 dark:text-white">
                       {formatDate(transaction.created_at)}
@@ -153,6 +214,18 @@ const TransactionPage: React.FC = () => {
               )}
             </tbody>
           </table>
+
+          {nextCursor && !searchResults && (
+            <div className="flex justify-center mt-4">
+              <button
+                onClick={handleLoadMore}
+                disabled={loadingMore}
+                className="px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700 focus:outline-none focus:ring-2 focus:ring-blue-500 disabled:opacity-50"
+              >
+                {loadingMore ? 'Загрузка...' : 'Показать еще'}
+              </button>
+            </div>
+          )}
         </div>
         
         {editingId !== null && (
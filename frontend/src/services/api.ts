@@ -1,13 +1,89 @@
-import axios from 'axios';
-import { Goal, Transaction, Settings } from '../types';
+import axios, { AxiosRequestConfig, AxiosResponse } from 'axios';
+import {
+  BatchOperation,
+  BatchResponse,
+  Goal,
+  Transaction,
+  TransactionFilters,
+  TransactionSearchParams,
+  PaginatedTransactions,
+  ServerEvent,
+  Settings,
+} from '../types';
 
 // Определяем URL в зависимости от среды
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://127.0.0.1:8000';
 
+// Арендатор (пользователь или семья) в общей установке и его токен (python tenants.py token <tenant>);
+// без них сервер без TENANT_SECRET использует default
+const TENANT_ID = import.meta.env.VITE_TENANT_ID;
+const TENANT_TOKEN = import.meta.env.VITE_TENANT_TOKEN;
+
+const tenantHeaders: Record<string, string> = {};
+if (TENANT_ID) tenantHeaders['X-Tenant-ID'] = TENANT_ID;
+if (TENANT_TOKEN) tenantHeaders['X-Tenant-Token'] = TENANT_TOKEN;
+
+// Интервал повторной загрузки данных страниц в мс, запасной путь к событиям /events
+export const REFRESH_INTERVAL = Number(import.meta.env.VITE_REFRESH_INTERVAL) || 30000;
+
 const api = axios.create({
   baseURL: API_BASE_URL,
+  headers: tenantHeaders,
+  // 304 Not Modified - не ошибка: данные берутся из локального кэша ниже
+  validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+});
+
+// Последние ETag и данные GET-ответов по URL с параметрами для условных запросов
+const etagCache = new Map<string, { etag: string; data: unknown }>();
+
+const cacheKey = (url?: string, params?: unknown) => `${url}?${JSON.stringify(params ?? {})}`;
+
+api.interceptors.request.use((config) => {
+  if (config.method === 'get') {
+    const cached = etagCache.get(cacheKey(config.url, config.params));
+    if (cached) {
+      config.headers['If-None-Match'] = cached.etag;
+    }
+  }
+  return config;
 });
 
+api.interceptors.response.use((response) => {
+  if (response.config.method !== 'get') {
+    return response;
+  }
+  const key = cacheKey(response.config.url, response.config.params);
+  if (response.status === 304) {
+    const cached = etagCache.get(key);
+    if (cached) {
+      response.data = cached.data;
+    }
+  } else if (response.headers.etag) {
+    etagCache.set(key, { etag: response.headers.etag, data: response.data });
+  }
+  return response;
+});
+
+// Таймаут запроса записи в мс и число повторов записи, на которую не пришел ответ
+const WRITE_TIMEOUT = 10000;
+const WRITE_RETRIES = 2;
+
+// Запись с заголовком Idempotency-Key: ключ один на все повторы, поэтому повтор после таймаута
+// получает с сервера исходный ответ и не создает дубликат
+const idempotentRequest = async <T = void>(config: AxiosRequestConfig): Promise<AxiosResponse<T>> => {
+  const headers = { ...config.headers, 'Idempotency-Key': crypto.randomUUID() };
+  for (let attempt = 0; ; attempt++) {
+    try {
+      return await api.request<T>({ timeout: WRITE_TIMEOUT, ...config, headers });
+    } catch (error) {
+      // Запросы, на которые сервер ответил ошибкой, не повторяются
+      if (attempt >= WRITE_RETRIES || !axios.isAxiosError(error) || error.response) {
+        throw error;
+      }
+    }
+  }
+};
+
 // Goal services
 export const goalService = {
   getAllGoals: async (): Promise<Goal[]> => {
@@ -21,21 +97,21 @@ export const goalService = {
   },
 
   createGoal: async (goal: Omit<Goal, 'id' | 'current_balance' | 'created_at'>): Promise<Goal> => {
-    const response = await api.post('/goals/', goal);
+    const response = await idempotentRequest<Goal>({ method: 'post', url: '/goals/', data: goal });
     return response.data;
   },
 
   updateGoal: async (id: number, goal: Partial<Goal>): Promise<Goal> => {
-    const response = await api.put(`/goals/${id}`, goal);
+    const response = await idempotentRequest<Goal>({ method: 'put', url: `/goals/${id}`, data: goal });
     return response.data;
   },
 
   deleteGoal: async (id: number): Promise<void> => {
-    await api.delete(`/goals/${id}`);
+    await idempotentRequest({ method: 'delete', url: `/goals/${id}` });
   },
 
   resetGoalProgress: async (id: number): Promise<Goal> => {
-    const response = await api.post(`/goals/${id}/reset-progress`);
+    const response = await idempotentRequest<{ goal: Goal }>({ method: 'post', url: `/goals/${id}/reset-progress` });
     return response.data.goal;
   },
 };
@@ -47,6 +123,23 @@ export const transactionService = {
     return response.data;
   },
 
+  // Постраничная загрузка: курсор следующей страницы приходит в заголовке X-Next-Cursor
+  getTransactionsPage: async (filters: TransactionFilters = {}, cursor?: string | null): Promise<PaginatedTransactions> => {
+    const response = await api.get('/transactions/', {
+      params: { ...filters, cursor: cursor || undefined },
+    });
+    return {
+      items: response.data,
+      nextCursor: response.headers['x-next-cursor'] || null,
+    };
+  },
+
+  // Полнотекстовый поиск по описаниям: находит и другие формы слов, последнее слово - по началу
+  searchTransactions: async (query: string, params: TransactionSearchParams = {}): Promise<Transaction[]> => {
+    const response = await api.get('/search/transactions', { params: { ...params, q: query } });
+    return response.data;
+  },
+
   getTransactionById: async (id: number): Promise<Transaction> => {
     const response = await api.get(`/transactions/${id}`);
     return response.data;
@@ -55,17 +148,17 @@ export const transactionService = {
   createTransaction: async (
     transaction: Omit<Transaction, 'id' | 'created_at'>
   ): Promise<Transaction> => {
-    const response = await api.post('/transactions/', transaction);
+    const response = await idempotentRequest<Transaction>({ method: 'post', url: '/transactions/', data: transaction });
     return response.data;
   },
 
   updateTransaction: async (id: number, transaction: Partial<Transaction>): Promise<Transaction> => {
-    const response = await api.put(`/transactions/${id}`, transaction);
+    const response = await idempotentRequest<Transaction>({ method: 'put', url: `/transactions/${id}`, data: transaction });
     return response.data;
   },
 
   deleteTransaction: async (id: number): Promise<void> => {
-    await api.delete(`/transactions/${id}`);
+    await idempotentRequest({ method: 'delete', url: `/transactions/${id}` });
   },
 };
 
@@ -80,4 +173,38 @@ export const settingsService = {
     const response = await api.put('/settings/', settings);
     return response.data;
   },
-};
\ No newline at end of file
+};
+
+// Пакет операций: один HTTP-запрос и одна фиксация в БД вместо запроса на каждую операцию
+export const batchService = {
+  run: async (operations: BatchOperation[], atomic = false): Promise<BatchResponse> => {
+    const response = await idempotentRequest<BatchResponse>({ method: 'post', url: '/batch/', data: { operations, atomic } });
+    return response.data;
+  },
+};
+
+const SERVER_EVENT_TYPES: ServerEvent['type'][] = [
+  'goal.balance',
+  'goal.updated',
+  'goal.deleted',
+  'transaction.created',
+  'transaction.updated',
+  'transaction.deleted',
+  'transactions.imported',
+];
+
+// Server-Sent Events: изменения приходят с сервера вместо повторных запросов
+export const eventService = {
+  // Возвращает функцию отписки; EventSource сам переподключается при обрыве соединения
+  subscribe: (onEvent: (event: ServerEvent) => void): (() => void) => {
+    // EventSource не передает заголовки, поэтому арендатор и токен указываются параметрами запроса
+    const params = new URLSearchParams();
+    if (TENANT_ID) params.set('tenant', TENANT_ID);
+    if (TENANT_TOKEN) params.set('tenant_token', TENANT_TOKEN);
+    const query = params.toString() ? `?${params}` : '';
+    const source = new EventSource(`${API_BASE_URL}/events${query}`);
+    const listener = (message: MessageEvent) => onEvent(JSON.parse(message.data));
+    SERVER_EVENT_TYPES.forEach(type => source.addEventListener(type, listener));
+    return () => source.close();
+  },
+};
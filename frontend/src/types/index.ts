@@ -28,6 +28,36 @@ export interface Transaction {
   created_at: string; // ISO date string
 }
 
+export interface TransactionFilters {
+  goal_id?: number;
+  transaction_type?: 'deposit' | 'withdrawal';
+  date_from?: string; // ISO date string
+  date_to?: string; // ISO date string
+  limit?: number;
+}
+
+export interface TransactionSearchParams {
+  goal_id?: number;
+  transaction_type?: 'deposit' | 'withdrawal';
+  sort?: 'relevance' | 'recent';
+  skip?: number;
+  limit?: number;
+}
+
+export interface PaginatedTransactions {
+  items: Transaction[];
+  nextCursor: string | null;
+}
+
+// События сервера, приходящие по каналу /events
+export type ServerEvent =
+  | { type: 'goal.balance'; goal_id: number; current_balance: number }
+  | { type: 'goal.updated'; goal: Goal }
+  | { type: 'goal.deleted'; goal_id: number }
+  | { type: 'transaction.created' | 'transaction.updated'; transaction: Transaction }
+  | { type: 'transaction.deleted'; id: number; goal_id: number }
+  | { type: 'transactions.imported'; created: number; goal_ids: number[] };
+
 export interface Settings {
   id: number;
   theme: string;
@@ -35,4 +65,21 @@ export interface Settings {
  language: string;
  created_at: string; // ISO date string
   updated_at: string; // ISO date string
-}
\ No newline at end of file
+}
+// Пакет операций /batch: все операции выполняются за один запрос и одну транзакцию БД
+export interface BatchOperation {
+  method: 'GET' | 'POST' | 'PUT' | 'DELETE';
+  path: string;
+  query?: Record<string, unknown>;
+  body?: unknown;
+}
+
+export interface BatchResult<T = unknown> {
+  status: number;
+  body: T;
+}
+
+export interface BatchResponse {
+  committed: boolean;
+  results: BatchResult[];
+}
@@ -2,6 +2,9 @@
 
 interface ImportMetaEnv {
   readonly VITE_API_BASE_URL: string;
+  readonly VITE_TENANT_ID?: string;
+  readonly VITE_TENANT_TOKEN?: string;
+  readonly VITE_REFRESH_INTERVAL?: string;
   // другие переменные окружения, если они используются
 }
 